@@ -1,6 +1,12 @@
 """ pyramid_duh """
-from .params import argify
+from pyramid.settings import asbool
+
+from .argtypes import (Base64, DateTime, FloatArray, Hex, IntArray, List,
+                       RawBody, Set, Upload)
+from .cache import argify_cache, argify_coalesce, argify_etag
+from .params import argify, argify_class, Default, Lazy
 from .route import ISmartLookupResource, IStaticResource, IModelResource
+from .validators import Each, Length, OneOf, Range, Regex
 from .view import addslash
 
 __version__ = '0.1.2'
@@ -8,5 +14,14 @@ __version__ = '0.1.2'
 
 def includeme(config):
     """ Add request methods """
+    settings = config.get_settings()
+    config.include('pyramid_duh.body')
+    config.include('pyramid_duh.executor')
+    config.include('pyramid_duh.batch')
     config.include('pyramid_duh.params')
     config.include('pyramid_duh.view')
+    config.include('pyramid_duh.precompile')
+    if settings.get('pyramid_duh.profile.rate'):
+        config.include('pyramid_duh.profiling')
+    if asbool(settings.get('pyramid_duh.timing', False)):
+        config.include('pyramid_duh.timing')
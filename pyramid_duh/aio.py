@@ -0,0 +1,99 @@
+""" Support for ``async def`` views. Requires python 3.5+ """
+import asyncio
+import functools
+
+from pyramid.httpexceptions import HTTPBadRequest, HTTPException
+
+from .compat import isawaitable
+
+
+def coroutine_view(wrapper):
+    """
+    Turn a view wrapper that may return an awaitable into a coroutine function
+
+    This lets async-capable servers detect that the decorated view is a
+    coroutine function.
+
+    """
+    @functools.wraps(wrapper)
+    async def coroutine_wrapper(*args, **kwargs):
+        """ Await the result of the wrapped view if needed """
+        result = wrapper(*args, **kwargs)
+        if isawaitable(result):
+            result = await result
+        return result
+    return coroutine_wrapper
+
+
+async def call_handler(handler, request, scope):
+    """ Await any async arguments in the scope, then call the handler """
+    for name, value in list(scope.items()):
+        if isawaitable(value):
+            scope[name] = await value
+    result = handler(request, scope)
+    if isawaitable(result):
+        result = await result
+    return result
+
+
+async def resolve_param(name, value, validate=None):
+    """
+    Await a parameter from an async type converter and validate it
+
+    Errors are converted to :class:`~pyramid.httpexceptions.HTTPBadRequest`
+    the same way as synchronous converters.
+
+    """
+    try:
+        value = await value
+        if validate is not None and not validate(value):
+            raise HTTPBadRequest("Validation check on '%s' failed" % name)
+        return value
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPBadRequest("Badly formatted parameter '%s'" % name)
+
+
+async def then(awaitable, callback):
+    """ Await a value and pass it to a callback. Return the callback result """
+    return callback(await awaitable)
+
+
+class AsyncSingleFlight(object):
+
+    """
+    Coalesces concurrent calls that have the same key on an asyncio loop
+
+    The asyncio counterpart of :class:`~pyramid_duh.cache.SingleFlight`.
+
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    def call(self, key, fxn, *args, **kwargs):
+        """
+        Call a function, or share an identical call that is in progress
+
+        Returns an awaitable
+
+        """
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_await_result(fxn, *args, **kwargs))
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        # Don't let one cancelled caller cancel the call for everyone
+        return asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._flights)
+
+
+async def _await_result(fxn, *args, **kwargs):
+    """ Call a function and await the result if needed """
+    result = fxn(*args, **kwargs)
+    if isawaitable(result):
+        result = await result
+    return result
@@ -0,0 +1,568 @@
+""" Argument types for @argify and request.param() """
+import array
+import base64
+import binascii
+import io
+import json
+import mmap
+import tempfile
+
+import six
+from pyramid.httpexceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+
+from .dates import PARSE_CACHE, parse_datetime, to_utc
+from .params import NO_ARG, ParamType, _compile_param
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Room in the request body for the multipart headers and the other fields of
+# a form with an Upload
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadedFile(object):
+
+    """
+    A file upload
+
+    Attributes
+    ----------
+    filename : str
+        The filename sent by the client
+    content_type : str
+        The Content-Type of the upload
+    size : int
+        Size of the upload in bytes
+    file : file
+        The data. This is a :class:`io.BytesIO` if the upload is held in
+        memory, and a temporary file on disk otherwise.
+
+    """
+
+    def __init__(self, filename, content_type, file, size):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+        self.size = size
+
+    @property
+    def in_memory(self):
+        """ True if the upload is held in memory instead of on disk """
+        return isinstance(self.file, io.BytesIO)
+
+    def read(self, size=-1):
+        """ Read from the upload """
+        return self.file.read(size)
+
+    def seek(self, offset, whence=0):
+        """ Seek within the upload """
+        return self.file.seek(offset, whence)
+
+    def buffer(self):
+        """
+        Get the contents without copying them into a new bytes object
+
+        Returns
+        -------
+        buffer : :class:`memoryview` or :class:`mmap.mmap`
+            A view of the in-memory data, or a read-only memory map of the
+            file on disk
+
+        """
+        if self.in_memory:
+            if six.PY2:
+                return memoryview(self.file.getvalue())
+            return self.file.getbuffer()
+        if self.size == 0:
+            return memoryview(b'')
+        self.file.flush()
+        return mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """ Close the file and remove it from disk """
+        try:
+            self.file.close()
+        except BufferError:
+            # A buffer() is still in use. The memory will be freed with it.
+            pass
+
+    def __repr__(self):
+        return 'UploadedFile(%r, %d bytes)' % (self.filename, self.size)
+
+
+def _reusable_file(source):
+    """ Check if an uploaded file can be used without copying it """
+    if isinstance(source, io.BytesIO):
+        return True
+    try:
+        source.fileno()
+    except (AttributeError, EnvironmentError, ValueError):
+        return False
+    return hasattr(source, 'seek') and hasattr(source, 'tell')
+
+
+class Upload(ParamType):
+
+    """
+    Argument type for a multipart file upload
+
+    Requests with a Content-Length that is too large for ``max_size`` are
+    rejected before the body is parsed. After that, the file that the request
+    parser wrote the upload to is used as-is when it is a temporary file or a
+    :class:`io.BytesIO`. Otherwise, the upload is copied in chunks into a
+    buffer that is kept in memory up to ``threshold`` bytes and spooled to a
+    temporary file beyond that. The file is closed when the request finishes.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Respond with a 413 if the upload is larger than this many bytes
+    threshold : int, optional
+        Copied uploads larger than this many bytes are written to disk
+        (default 1MB)
+    chunk_size : int, optional
+        Number of bytes to copy at a time (default 64KB)
+
+    Notes
+    -----
+    .. code-block:: python
+
+        @argify(avatar=Upload(max_size=5 * 1024 * 1024))
+        def set_avatar(request, avatar):
+            image = Image.open(avatar.file)
+
+    The Content-Length check allows :data:`.FORM_OVERHEAD` bytes for the
+    multipart headers and the other fields of the form, on top of the
+    ``max_size`` of each upload.
+
+    """
+
+    def __init__(self, max_size=None, threshold=1024 * 1024,
+                 chunk_size=64 * 1024):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+
+    @property
+    def body_size(self):
+        """ The upload and the rest of the form must fit in the body """
+        if self.max_size is None:
+            return None
+        return self.max_size + FORM_OVERHEAD
+
+    def _too_large(self, name):
+        """ Build the error for an upload over ``max_size`` """
+        return HTTPRequestEntityTooLarge("Upload '%s' may be at most %d "
+                                         "bytes" % (name, self.max_size))
+
+    def _copy(self, source, name, check_size):
+        """ Copy the upload into a spooled buffer """
+        dest = io.BytesIO()
+        size = 0
+        try:
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if check_size and size > self.max_size:
+                    raise self._too_large(name)
+                if size > self.threshold and isinstance(dest, io.BytesIO):
+                    spooled = tempfile.TemporaryFile()
+                    spooled.write(dest.getvalue())
+                    dest = spooled
+                dest.write(chunk)
+        except:
+            dest.close()
+            raise
+        dest.seek(0)
+        return dest, size
+
+    def convert(self, request, name, arg):
+        source = getattr(arg, 'file', None)
+        if source is None:
+            raise HTTPBadRequest("Argument '%s' must be a file upload" % name)
+        length = getattr(request, 'content_length', None)
+        # The upload can't be larger than the whole body
+        check_size = self.max_size is not None and (not length or
+                                                    length > self.max_size)
+        if _reusable_file(source):
+            source.seek(0, 2)
+            size = source.tell()
+            source.seek(0)
+            if check_size and size > self.max_size:
+                raise self._too_large(name)
+            dest = source
+        else:
+            dest, size = self._copy(source, name, check_size)
+        upload = UploadedFile(getattr(arg, 'filename', None),
+                              getattr(arg, 'type', None), dest, size)
+        if hasattr(request, 'add_finished_callback'):
+            request.add_finished_callback(lambda _: upload.close())
+        return upload
+
+
+def _to_ascii(name, arg):
+    """ Get the ascii bytes of a text parameter """
+    if isinstance(arg, six.text_type):
+        return arg.encode('ascii')
+    elif isinstance(arg, six.binary_type):
+        return arg
+    raise TypeError("Argument '%s' must be a string" % name)
+
+
+class Base64(ParamType):
+
+    """
+    Argument type for base64-encoded binary data
+
+    Parameters
+    ----------
+    urlsafe : bool, optional
+        If True, decode the URL-safe alphabet (``-`` and ``_``) (default
+        False)
+    mutable : bool, optional
+        If True, return a :class:`bytearray`. Otherwise return a read-only
+        :class:`memoryview` over the decoded bytes. (default False)
+
+    """
+
+    def __init__(self, urlsafe=False, mutable=False):
+        self.urlsafe = urlsafe
+        self.mutable = mutable
+
+    @property
+    def pure(self):
+        """ Read-only views can be shared between requests """
+        return not self.mutable
+
+    def convert(self, request, name, arg):
+        data = _to_ascii(name, arg)
+        altchars = b'-_' if self.urlsafe else None
+        if six.PY2:
+            value = base64.b64decode(data, altchars)
+        else:
+            value = base64.b64decode(data, altchars, validate=True)
+        if self.mutable:
+            return bytearray(value)
+        return memoryview(value)
+
+
+class Hex(ParamType):
+
+    """
+    Argument type for hex-encoded binary data
+
+    Parameters
+    ----------
+    mutable : bool, optional
+        If True, return a :class:`bytearray`. Otherwise return a read-only
+        :class:`memoryview` over the decoded bytes. (default False)
+
+    """
+
+    def __init__(self, mutable=False):
+        self.mutable = mutable
+
+    @property
+    def pure(self):
+        """ Read-only views can be shared between requests """
+        return not self.mutable
+
+    def convert(self, request, name, arg):
+        if not isinstance(arg, six.string_types):
+            raise TypeError("Argument '%s' must be a string" % name)
+        if self.mutable:
+            # Decodes directly into the bytearray
+            return bytearray.fromhex(six.text_type(arg))
+        return memoryview(binascii.unhexlify(_to_ascii(name, arg)))
+
+
+class RawBody(ParamType):
+
+    """
+    Argument type that is a read-only view of the request body
+
+    The value is a :class:`memoryview` (or a :class:`mmap.mmap` if WebOb
+    buffered a large body to a temporary file) that does not copy the body.
+    The argument name does not have to match any parameter.
+
+    .. code-block:: python
+
+        @argify(data=RawBody())
+        def put_blob(request, key, data):
+            storage.write(key, data)
+
+    """
+    multi_param = True
+
+    def convert(self, request, name, arg):
+        make_body_seekable = getattr(request, 'make_body_seekable', None)
+        if make_body_seekable is not None:
+            make_body_seekable()
+            raw = request.body_file_raw
+            if isinstance(raw, io.BytesIO) and not six.PY2:
+                return raw.getbuffer()
+            try:
+                fileno = raw.fileno()
+            except (AttributeError, IOError, OSError, ValueError):
+                pass
+            else:
+                if request.content_length:
+                    return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        return memoryview(request.body)
+
+
+class _NumberArray(ParamType):
+
+    """ Base class for packed numeric arrays """
+    typecode = None
+    numpy_dtype = None
+    element = None
+
+    def __init__(self, min=None, max=None, unique=False, typecode=None,
+                 use_numpy=False):
+        if use_numpy and numpy is None:
+            raise ImportError("use_numpy=True requires numpy")
+        self.min = min
+        self.max = max
+        self.unique = unique
+        if typecode is not None:
+            self.typecode = typecode
+        self.use_numpy = use_numpy
+
+    def _parse(self, name, arg):
+        """ Get an iterable of the elements from a raw parameter """
+        if isinstance(arg, six.string_types):
+            arg = arg.strip()
+            if arg.startswith('['):
+                return json.loads(arg)
+            if not arg:
+                return []
+            return [self.element(v) for v in arg.split(',')]
+        elif isinstance(arg, (list, tuple)):
+            return arg
+        raise TypeError("Argument '%s' must be a list" % name)
+
+    def bind(self, request, params, name, default=NO_ARG, validate=None,
+             loads=True):
+        getall = getattr(params, 'getall', None)
+        if loads and getall is not None:
+            values = getall(name)
+            if len(values) > 1:
+                # Repeated form keys (ids=1&ids=2) each hold part of the list
+                try:
+                    arg = [v for value in values
+                           for v in self._parse(name, value)]
+                except (ValueError, TypeError):
+                    raise HTTPBadRequest("Badly formatted parameter '%s'" %
+                                         name)
+                params = {name: arg}
+        return super(_NumberArray, self).bind(request, params, name, default,
+                                              validate, loads)
+
+    def convert(self, request, name, arg):
+        values = self._parse(name, arg)
+        try:
+            if self.use_numpy:
+                value = numpy.array(values, dtype=self.numpy_dtype)
+                if value.ndim != 1:
+                    raise ValueError("Argument '%s' must be a flat list" %
+                                     name)
+            else:
+                value = array.array(self.typecode, values)
+        except OverflowError:
+            raise ValueError("Argument '%s' is out of range" % name)
+        if len(value) == 0:
+            return value
+        # min(), max(), and set() loop in C over the packed array
+        if self.use_numpy:
+            low, high = value.min(), value.max()
+        else:
+            low, high = min(value), max(value)
+        if self.min is not None and low < self.min:
+            raise HTTPBadRequest("Argument '%s' must be at least %s" %
+                                 (name, self.min))
+        if self.max is not None and high > self.max:
+            raise HTTPBadRequest("Argument '%s' must be at most %s" %
+                                 (name, self.max))
+        if self.unique:
+            if self.use_numpy:
+                count = len(numpy.unique(value))
+            else:
+                count = len(set(value))
+            if count != len(value):
+                raise HTTPBadRequest("Argument '%s' has duplicate values" %
+                                     name)
+        return value
+
+
+class IntArray(_NumberArray):
+
+    """
+    Argument type for a list of integers, stored as a packed array
+
+    The list may be sent as JSON, or in a form as a JSON string, a
+    comma-separated string (``ids=1,2,3``), or repeated keys
+    (``ids=1&ids=2``). The value is an :class:`array.array`, which uses a
+    fraction of the memory of a list of ints.
+
+    Parameters
+    ----------
+    min : int, optional
+        Minimum value of any element
+    max : int, optional
+        Maximum value of any element
+    unique : bool, optional
+        If True, reject lists with duplicate values (default False)
+    typecode : str, optional
+        The :mod:`array` typecode (default 'q', a signed 64-bit int)
+    use_numpy : bool, optional
+        If True, return a numpy array instead (default False)
+
+    Notes
+    -----
+    .. code-block:: python
+
+        @argify(ids=IntArray(min=1, unique=True))
+        def delete_posts(request, ids):
+            request.db.delete_posts(ids)
+
+    """
+    typecode = 'l' if six.PY2 else 'q'
+    numpy_dtype = 'int64'
+    element = int
+
+
+class FloatArray(_NumberArray):
+
+    """
+    Argument type for a list of floats, stored as a packed array
+
+    Accepts the same formats and parameters as :class:`.IntArray`. The default
+    typecode is 'd' (a double).
+
+    """
+    typecode = 'd'
+    numpy_dtype = 'float64'
+    element = float
+
+
+class List(ParamType):
+
+    """
+    Argument type for a list of values that are each converted
+
+    Form and query parameters may repeat the key (``?id=1&id=2``), or send a
+    single comma-separated value (``?id=1,2``) or JSON list (``?id=[1,2]``).
+    JSON bodies send a list. ``[int]`` is shorthand for ``List(int)``.
+
+    Parameters
+    ----------
+    type : object, optional
+        The type of each element. Accepts anything that :meth:`.argify` does.
+    sep : str, optional
+        Separator for a single form value (default ','). Pass None to only
+        split repeated keys.
+
+    """
+    container = list
+
+    def __init__(self, type=None, sep=','):
+        self.type = type
+        self.sep = sep
+        self._bind_element = None
+        if type not in (None, int, float):
+            # Dotted paths are resolved by the binder on first use
+            self._bind_element = _compile_param(type)
+
+    def _values(self, params, name, loads):
+        """ Get the raw elements and whether they need to be loaded """
+        getall = getattr(params, 'getall', None)
+        if not loads:
+            values = params[name]
+            if not isinstance(values, (list, tuple)):
+                raise TypeError("Argument '%s' must be a list" % name)
+            return values, False
+        values = getall(name) if getall is not None else [params[name]]
+        if len(values) == 1 and isinstance(values[0], six.string_types):
+            value = values[0].strip()
+            if value.startswith('['):
+                return json.loads(value), False
+            elif not value:
+                return [], False
+            elif self.sep is not None:
+                return value.split(self.sep), loads
+        return values, loads
+
+    def bind(self, request, params, name, default=NO_ARG, validate=None,
+             loads=True):
+        if name not in params:
+            if default is NO_ARG:
+                raise HTTPBadRequest("Missing argument '%s'" % name)
+            return default
+        try:
+            values, loads = self._values(params, name, loads)
+            bind = self._bind_element
+            if bind is not None:
+                item = {}
+                value = []
+                for v in values:
+                    item[name] = v
+                    value.append(bind(request, item, name, NO_ARG, None,
+                                      loads))
+                if self.container is not list:
+                    value = self.container(value)
+            elif self.type is None:
+                value = self.container(values)
+            else:
+                value = self.container(self.type(v) for v in values)
+        except (ValueError, TypeError):
+            raise HTTPBadRequest("Badly formatted parameter '%s'" % name)
+        if validate is not None and not validate(value):
+            raise HTTPBadRequest("Validation check on '%s' failed" % name)
+        return value
+
+
+class Set(List):
+
+    """
+    Argument type for a set of values that are each converted
+
+    Accepts the same formats and parameters as :class:`.List`
+
+    """
+    container = set
+
+
+class DateTime(ParamType):
+
+    """
+    Argument type for a datetime in UTC
+
+    Accepts unix timestamps and ISO 8601 strings (see
+    :meth:`~pyramid_duh.dates.parse_datetime`). Strings with an offset are
+    converted to UTC, and strings without one are assumed to be UTC.
+
+    Parameters
+    ----------
+    aware : bool, optional
+        If True, return an aware datetime with a UTC tzinfo. Otherwise return
+        a naive datetime. (default False)
+    cache : :class:`~pyramid_duh.cache.LRUCache`, optional
+        Cache of parsed strings that aren't strict ISO 8601. Pass None to
+        disable. (default is a cache shared by all date types)
+
+    """
+    pure = True
+
+    def __init__(self, aware=False, cache=PARSE_CACHE):
+        self.aware = aware
+        self.cache = cache
+
+    def convert(self, request, name, arg):
+        return to_utc(parse_datetime(arg, self.cache), self.aware)
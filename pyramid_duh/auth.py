@@ -1,4 +1,5 @@
 """ Utilities for auth """
+from .timing import timed
 
 
 class MixedAuthenticationPolicy(object):
@@ -24,10 +25,11 @@ class MixedAuthenticationPolicy(object):
         used related to the user (the user should not have been deleted);
         if a record associated with the current id does not exist in a
         persistent store, it should return ``None``."""
-        for policy in self._policies:
-            userid = policy.authenticated_userid(request)
-            if userid is not None:
-                return userid
+        with timed(request, 'auth'):
+            for policy in self._policies:
+                userid = policy.authenticated_userid(request)
+                if userid is not None:
+                    return userid
 
     def unauthenticated_userid(self, request):
         """ Return the *unauthenticated* userid.  This method performs the
@@ -35,10 +37,11 @@ class MixedAuthenticationPolicy(object):
         userid based only on data present in the request; it needn't (and
         shouldn't) check any persistent store to ensure that the user record
         related to the request userid exists."""
-        for policy in self._policies:
-            userid = policy.unauthenticated_userid(request)
-            if userid is not None:
-                return userid
+        with timed(request, 'auth'):
+            for policy in self._policies:
+                userid = policy.unauthenticated_userid(request)
+                if userid is not None:
+                    return userid
 
     def effective_principals(self, request):
         """ Return a sequence representing the effective principals
@@ -46,28 +49,31 @@ class MixedAuthenticationPolicy(object):
         user, including 'system' groups such as
         ``pyramid.security.Everyone`` and
         ``pyramid.security.Authenticated``. """
-        principals = set()
-        for policy in self._policies:
-            principals.update(policy.effective_principals(request))
-        return list(principals)
+        with timed(request, 'auth'):
+            principals = set()
+            for policy in self._policies:
+                principals.update(policy.effective_principals(request))
+            return list(principals)
 
     def remember(self, request, principal, **kw):
         """ Return a set of headers suitable for 'remembering' the
         principal named ``principal`` when set in a response.  An
         individual authentication policy and its consumers can decide
         on the composition and meaning of **kw. """
-        headers = []
-        for policy in self._policies:
-            headers.extend(policy.remember(request, principal, **kw))
-        return headers
+        with timed(request, 'auth'):
+            headers = []
+            for policy in self._policies:
+                headers.extend(policy.remember(request, principal, **kw))
+            return headers
 
     def forget(self, request):
         """ Return a set of headers suitable for 'forgetting' the
         current user on subsequent requests. """
-        headers = []
-        for policy in self._policies:
-            headers.extend(policy.forget(request))
-        return headers
+        with timed(request, 'auth'):
+            headers = []
+            for policy in self._policies:
+                headers.extend(policy.forget(request))
+            return headers
 
 
 def _add_authentication_policy(config, policy):
@@ -0,0 +1,209 @@
+""" Execute many @argify views in a single request """
+import copy
+import logging
+
+import six
+from pyramid.decorator import reify
+from pyramid.httpexceptions import HTTPBadRequest, HTTPException
+from pyramid.interfaces import IDefaultPermission
+from pyramid.response import Response
+from pyramid.security import NO_PERMISSION_REQUIRED
+from pyramid.settings import asbool
+
+from .compat import iscoroutinefunction
+from .executor import get_executor
+from .params import argify, call_with_params
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _run_entry(request, entry):
+    """
+    Run a single entry of a batch request and return the result
+
+    ``request`` should be the entry's own copy from :func:`._entry_request`,
+    so changes the view makes to ``request.response`` stay with the entry.
+
+    """
+    if not isinstance(entry, dict):
+        return {'status': 400, 'error': 'Batch entry must be an object'}
+    batch_views = getattr(request.registry, 'duh_batch_views', {})
+    name = entry.get('view', entry.get('path'))
+    view, permission = batch_views.get(name, (None, None))
+    if view is None:
+        return {'status': 404, 'error': "Unknown view %r" % (name,)}
+    if permission is None:
+        permission = request.registry.queryUtility(IDefaultPermission)
+    if permission is not None and permission != NO_PERMISSION_REQUIRED and \
+            not request.has_permission(permission, request.context):
+        return {'status': 403, 'error': 'Forbidden'}
+    params = entry.get('params', {})
+    if not isinstance(params, dict):
+        return {'status': 400, 'error': "'params' must be an object"}
+    try:
+        result = call_with_params(view, request.context, request, params)
+    except HTTPException as e:
+        return {'status': e.code, 'error': e.detail or e.title}
+    except Exception:
+        LOG.exception("Error running batch entry %r", name)
+        return {'status': 500, 'error': 'Internal server error'}
+    if isinstance(result, Response):
+        return {'status': result.status_int, 'body': result.text}
+    return {'status': request.response.status_int, 'body': result}
+
+
+def _entry_request(request):
+    """
+    Make a shallow copy of the request for a batch entry
+
+    The copy shares the environ and everything the router set on the
+    request, but reified attributes (``request.response``, and request
+    methods added with ``reify=True`` such as a db session) are created
+    again for the copy. This keeps entries from changing the response of the
+    batch request, and from sharing state between threads.
+
+    """
+    entry_request = copy.copy(request)
+    cls = type(request)
+    for attr in list(vars(entry_request)):
+        if isinstance(getattr(cls, attr, None), reify):
+            delattr(entry_request, attr)
+    return entry_request
+
+
+def make_batch_view(max_requests=100, executor=None):
+    """
+    Create a view that runs a batch of @argify views
+
+    Each entry gets its own shallow copy of the request (see
+    :func:`._entry_request`).
+
+    Parameters
+    ----------
+    max_requests : int, optional
+        Maximum number of entries allowed in one batch (default 100)
+    executor : str, optional
+        Name of a :class:`~pyramid_duh.executor.BoundedExecutor` to run the
+        entries on concurrently. If the executor is saturated, the remaining
+        entries run on the request thread.
+
+    """
+    @argify(requests=list)
+    def batch(request, requests):
+        """ Run each entry and return a list of the results """
+        if len(requests) > max_requests:
+            raise HTTPBadRequest("Batch may contain at most %d requests" %
+                                 max_requests)
+        if executor is None:
+            return [_run_entry(_entry_request(request), entry)
+                    for entry in requests]
+        pool = get_executor(request.registry, executor)
+        entry_requests = [_entry_request(request) for _ in requests]
+        futures = []
+        for entry, entry_request in six.moves.zip(requests, entry_requests):
+            try:
+                futures.append(pool.submit_call(entry_request, _run_entry,
+                                                entry_request, entry))
+            except HTTPException:
+                futures.append(None)
+        results = []
+        for entry, entry_request, future in six.moves.zip(
+                requests, entry_requests, futures):
+            if future is None:
+                results.append(_run_entry(entry_request, entry))
+            else:
+                results.append(future.result())
+        return results
+    return batch
+
+
+def add_batch_view(config, route_name='batch', pattern='/batch',
+                   max_requests=100, executor=None, **view_kwargs):
+    """
+    Config directive that adds a batch endpoint
+
+    The endpoint accepts a POST with a JSON body like this:
+
+    .. code-block:: javascript
+
+        {
+            "requests": [
+                {"view": "get_user", "params": {"userid": 1}},
+                {"view": "list_posts", "params": {"limit": 10}}
+            ]
+        }
+
+    And returns a list with one ``{"status": <code>, "body": <result>}`` or
+    ``{"status": <code>, "error": <message>}`` for each entry. Views must be
+    registered with :meth:`.add_batchable`.
+
+    Parameters
+    ----------
+    route_name : str, optional
+        Name of the route to add (default 'batch')
+    pattern : str, optional
+        URL pattern for the route (default '/batch')
+    max_requests : int, optional
+        Maximum number of entries allowed in one batch (default 100)
+    executor : str, optional
+        Name of an executor to run the entries on concurrently
+    **view_kwargs :
+        Passed to ``config.add_view``
+
+    """
+    config.add_route(route_name, pattern)
+    view_kwargs.setdefault('renderer', 'json')
+    view_kwargs.setdefault('request_method', 'POST')
+    config.add_view(make_batch_view(max_requests, executor),
+                    route_name=route_name, **view_kwargs)
+
+
+def add_batchable(config, name, view, permission=None):
+    """
+    Config directive that allows a view to be called from a batch request
+
+    Batch entries don't go through the view lookup, so the permission of the
+    normal view is not checked. Pass the same ``permission`` here.
+
+    Parameters
+    ----------
+    name : str
+        The name that batch entries use to refer to the view. This may also be
+        the path that clients normally use for the view.
+    view : callable
+        A function view (or dotted path to one) decorated with @argify
+    permission : str, optional
+        The permission the request must have on its context to call the view.
+        Entries without it get a 403. If not provided, the default permission
+        is used.
+
+    """
+    view = config.maybe_dotted(view)
+    if not hasattr(view, '__argify_call__'):
+        raise TypeError("Batch view %r must be decorated with @argify" % view)
+    if iscoroutinefunction(view):
+        raise TypeError("Batch view %r cannot be an async view" % view)
+    if not hasattr(config.registry, 'duh_batch_views'):
+        config.registry.duh_batch_views = {}
+    config.registry.duh_batch_views[name] = (view, permission)
+
+
+def includeme(config):
+    """
+    Add the batch directives
+
+    If ``pyramid_duh.batch`` is true, this also adds the batch endpoint with
+    the settings ``pyramid_duh.batch.pattern``,
+    ``pyramid_duh.batch.max_requests``, and ``pyramid_duh.batch.executor``.
+
+    """
+    config.add_directive('add_batch_view', add_batch_view)
+    config.add_directive('add_batchable', add_batchable)
+    settings = config.get_settings()
+    if asbool(settings.get('pyramid_duh.batch', False)):
+        config.add_batch_view(
+            pattern=settings.get('pyramid_duh.batch.pattern', '/batch'),
+            max_requests=int(settings.get('pyramid_duh.batch.max_requests',
+                                          100)),
+            executor=settings.get('pyramid_duh.batch.executor'))
@@ -0,0 +1,507 @@
+""" Utilities for decoding request bodies """
+import json
+import re
+from json.decoder import scanstring  # pylint: disable=E0611
+
+import six
+from pyramid.httpexceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Scalars that the json module accepts, including its NaN and Infinity
+_SCALAR = re.compile(r'true|false|null|NaN|-?Infinity|'
+                     r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+# The contents of a string with no escapes or control characters
+_CHARS = re.compile(r'[^"\\\x00-\x1f]*')
+_CONTAINERS = (dict, list, tuple)
+_SCALARS = frozenset(six.string_types + six.integer_types +
+                     (six.binary_type, float, bool, type(None)))
+MISSING = object()
+
+
+def _skip_ws(text, idx):
+    """ Get the index of the next non-whitespace character """
+    return _WHITESPACE.match(text, idx).end()
+
+
+def _skip_string(text, idx):
+    """ Find the end of the JSON string that starts at ``idx`` """
+    end = _CHARS.match(text, idx + 1).end()
+    if text[end:end + 1] == '"':
+        return end + 1
+    # Let the C decoder check the escape sequences and control characters
+    return scanstring(text, idx + 1)[1]
+
+
+def _skip_value(text, idx):
+    """
+    Find the end of the JSON value that starts at ``idx``
+
+    Strings without escape sequences and scalars are skipped without being
+    decoded. Containers are decoded and thrown away, because the C decoder is
+    faster than a python scanner that checks the whole grammar.
+
+    Raises
+    ------
+    exc : ValueError
+        If the value is malformed
+
+    """
+    char = text[idx:idx + 1]
+    if char == '"':
+        return _skip_string(text, idx)
+    elif char == '{' or char == '[':
+        return _DECODER.raw_decode(text, idx)[1]
+    match = _SCALAR.match(text, idx)
+    if match is None:
+        raise ValueError("Expected a value at %d" % idx)
+    return match.end()
+
+
+def scan_object(text):
+    """
+    Find the location of each top-level value in a JSON object
+
+    Only the keys are decoded. The values are skipped over.
+
+    Parameters
+    ----------
+    text : str
+        A JSON-encoded object
+
+    Returns
+    -------
+    spans : dict
+        Mapping of each key to the ``(start, end)`` index of its value
+
+    Raises
+    ------
+    exc : ValueError
+        If the text is not a valid JSON object
+
+    """
+    spans = {}
+    idx = _skip_ws(text, 0)
+    if text[idx:idx + 1] != '{':
+        raise ValueError("Expected a JSON object")
+    idx = _skip_ws(text, idx + 1)
+    if text[idx:idx + 1] == '}':
+        return spans
+    while True:
+        if text[idx:idx + 1] != '"':
+            raise ValueError("Expected a key at %d" % idx)
+        key, idx = scanstring(text, idx + 1)
+        idx = _skip_ws(text, idx)
+        if text[idx:idx + 1] != ':':
+            raise ValueError("Expected ':' at %d" % idx)
+        start = _skip_ws(text, idx + 1)
+        end = _skip_value(text, start)
+        spans[key] = (start, end)
+        idx = _skip_ws(text, end)
+        char = text[idx:idx + 1]
+        if char == ',':
+            idx = _skip_ws(text, idx + 1)
+        elif char == '}':
+            break
+        else:
+            raise ValueError("Expected ',' or '}' at %d" % idx)
+    if _skip_ws(text, idx + 1) != len(text):
+        raise ValueError("Extra data at %d" % (idx + 1))
+    return spans
+
+
+class JSONLimitError(ValueError):
+
+    """ Raised when a request body exceeds ``max_depth`` or ``max_keys`` """
+
+
+def _check_shape(value, max_depth=None, max_keys=None):
+    """
+    Check the nesting depth and number of keys of a decoded body
+
+    The containers are walked one level at a time. If only ``max_depth`` is
+    checked, this stops at the first level past the limit.
+
+    Raises
+    ------
+    exc : :class:`.JSONLimitError`
+        If the value exceeds one of the limits
+
+    """
+    containers = [value] if isinstance(value, _CONTAINERS) else []
+    depth = keys = 0
+    while containers:
+        depth += 1
+        if max_depth is not None and depth > max_depth:
+            raise JSONLimitError("Request body is nested more than %d levels "
+                                 "deep" % max_depth)
+        children = []
+        for item in containers:
+            if isinstance(item, dict):
+                keys += len(item)
+                item = item.values()
+            children += [child for child in item
+                         if type(child) not in _SCALARS and
+                         isinstance(child, _CONTAINERS)]
+        if max_keys is not None and keys > max_keys:
+            raise JSONLimitError("Request body has more than %d keys" %
+                                 max_keys)
+        containers = children
+
+
+class _KeyCounter(object):
+
+    """ ``object_pairs_hook`` that raises once it sees too many keys """
+
+    def __init__(self, max_keys, keys=0):
+        self.max_keys = max_keys
+        self.keys = keys
+
+    def __call__(self, pairs):
+        self.keys += len(pairs)
+        if self.keys > self.max_keys:
+            raise JSONLimitError("JSON body has more than %d keys" %
+                                 self.max_keys)
+        return dict(pairs)
+
+
+def _raw_decode(text, idx, max_depth=None, counter=None):
+    """ Decode the JSON value at ``idx`` and check the limits """
+    decoder = _DECODER
+    if counter is not None:
+        decoder = json.JSONDecoder(object_pairs_hook=counter)
+    try:
+        value, end = decoder.raw_decode(text, idx)
+    except RuntimeError:
+        # Hit the recursion limit
+        raise JSONLimitError("JSON body is nested too deeply")
+    if max_depth is not None:
+        _check_shape(value, max_depth)
+    return value, end
+
+
+class LazyJSONParams(object):
+
+    """
+    Read-only mapping over a JSON object that decodes values on demand
+
+    Only the top-level keys are found up front. Each value is decoded the
+    first time it is accessed, and the limits are checked as the values are
+    decoded.
+
+    Parameters
+    ----------
+    text : str
+        A JSON-encoded object
+    max_depth : int, optional
+        Maximum nesting depth of the object, counting the object itself
+    max_keys : int, optional
+        Maximum number of object keys, counting the top-level keys and the
+        keys in every decoded value
+
+    Raises
+    ------
+    exc : ValueError
+        If the text is not a valid JSON object
+    exc : :class:`.JSONLimitError`
+        If the object has more than ``max_keys`` top-level keys, or
+        ``max_depth`` is less than 1
+
+    Notes
+    -----
+    Accessing a value raises a
+    :class:`~pyramid.httpexceptions.HTTPBadRequest` if it is malformed or
+    exceeds the limits.
+
+    """
+
+    def __init__(self, text, max_depth=None, max_keys=None):
+        self._text = text
+        self._spans = scan_object(text)
+        self._values = {}
+        self._max_depth = None
+        if max_depth is not None:
+            if max_depth < 1:
+                raise JSONLimitError("JSON body is nested more than %d "
+                                     "levels deep" % max_depth)
+            self._max_depth = max_depth - 1
+        self._counter = None
+        if max_keys is not None:
+            if len(self._spans) > max_keys:
+                raise JSONLimitError("JSON body has more than %d keys" %
+                                     max_keys)
+            self._counter = _KeyCounter(max_keys, len(self._spans))
+
+    def __getitem__(self, key):
+        value = self._values.get(key, MISSING)
+        if value is MISSING:
+            start = self._spans[key][0]
+            try:
+                value = _raw_decode(self._text, start, self._max_depth,
+                                    self._counter)[0]
+            except JSONLimitError as e:
+                raise HTTPBadRequest(str(e))
+            except ValueError:
+                raise HTTPBadRequest("Malformed JSON body")
+            self._values[key] = value
+        return value
+
+    def get(self, key, default=None):
+        """ Get a value, or ``default`` if the key is missing """
+        if key not in self._spans:
+            return default
+        return self[key]
+
+    def __contains__(self, key):
+        return key in self._spans
+
+    def __iter__(self):
+        return iter(self._spans)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def keys(self):
+        """ List of the keys """
+        return list(self._spans)
+
+    def items(self):
+        """ List of ``(key, value)`` pairs. This decodes every value. """
+        return [(key, self[key]) for key in self._spans]
+
+    def iteritems(self):
+        """ Iterator over ``(key, value)`` pairs """
+        for key in self._spans:
+            yield key, self[key]
+
+
+def decode_json(text, max_depth=None, max_keys=None):
+    """
+    Decode a JSON document and check its shape
+
+    Parameters
+    ----------
+    text : str
+    max_depth : int, optional
+        Maximum nesting depth of objects and lists
+    max_keys : int, optional
+        Maximum number of object keys, counting nested objects
+
+    Raises
+    ------
+    exc : ValueError
+        If the document is malformed
+    exc : :class:`.JSONLimitError`
+        If the document exceeds one of the limits
+
+    """
+    # These counts are upper bounds, so most documents skip the checks
+    if max_depth is not None and \
+            text.count('{') + text.count('[') <= max_depth:
+        max_depth = None
+    counter = None
+    if max_keys is not None and text.count(':') > max_keys:
+        counter = _KeyCounter(max_keys)
+    idx = _skip_ws(text, 0)
+    value, end = _raw_decode(text, idx, max_depth, counter)
+    if _skip_ws(text, end) != len(text):
+        raise ValueError("Extra data at %d" % end)
+    return value
+
+
+def check_content_length(request, max_body):
+    """
+    Reject a request if the body is too large, before reading it
+
+    Raises
+    ------
+    exc : :class:`~pyramid.httpexceptions.HTTPRequestEntityTooLarge`
+        If the Content-Length is more than ``max_body`` bytes
+
+    """
+    length = getattr(request, 'content_length', None)
+    if length is not None and length > max_body:
+        raise HTTPRequestEntityTooLarge("Request body may be at most %d "
+                                        "bytes" % max_body)
+
+
+def body_text(request, max_body=None):
+    """
+    Get the body of a request as text
+
+    Parameters
+    ----------
+    request : :class:`~pyramid.request.Request`
+    max_body : int, optional
+        If provided, reject bodies larger than this many bytes. This catches
+        bodies that were sent without a Content-Length.
+
+    """
+    body = request.body
+    if isinstance(body, six.binary_type):
+        if max_body is not None and len(body) > max_body:
+            raise HTTPRequestEntityTooLarge("Request body may be at most %d "
+                                            "bytes" % max_body)
+        body = body.decode(getattr(request, 'charset', None) or 'utf-8')
+    return body
+
+
+def json_body(request, lazy=False, max_body=None, max_depth=None,
+              max_keys=None):
+    """
+    Decode the JSON body of a request after checking the limits
+
+    Parameters
+    ----------
+    request : :class:`~pyramid.request.Request`
+    lazy : bool, optional
+        If True, return a :class:`.LazyJSONParams` (default False)
+    max_body : int, optional
+        Maximum size of the body in bytes
+    max_depth : int, optional
+        Maximum nesting depth of the body
+    max_keys : int, optional
+        Maximum number of object keys in the body
+
+    Raises
+    ------
+    exc : :class:`~pyramid.httpexceptions.HTTPRequestEntityTooLarge`
+        If the body is larger than ``max_body``
+    exc : :class:`~pyramid.httpexceptions.HTTPBadRequest`
+        If the body is malformed or exceeds ``max_depth`` or ``max_keys``
+
+    """
+    if max_body is not None:
+        check_content_length(request, max_body)
+    if not lazy and max_body is None and max_depth is None and \
+            max_keys is None:
+        return request.json_body
+    text = body_text(request, max_body)
+    try:
+        if lazy:
+            return LazyJSONParams(text, max_depth, max_keys)
+        return decode_json(text, max_depth, max_keys)
+    except JSONLimitError as e:
+        raise HTTPBadRequest(str(e))
+    except ValueError:
+        raise HTTPBadRequest("Malformed JSON body")
+
+
+def decode_msgpack(body):
+    """ Decode a MessagePack body """
+    return msgpack.unpackb(body, raw=False)
+
+
+def decode_cbor(body):
+    """ Decode a CBOR body """
+    return cbor2.loads(body)
+
+
+# Decoders that are available for every app
+DEFAULT_DECODERS = {}
+if msgpack is not None:
+    DEFAULT_DECODERS['application/msgpack'] = decode_msgpack
+    DEFAULT_DECODERS['application/x-msgpack'] = decode_msgpack
+if cbor2 is not None:
+    DEFAULT_DECODERS['application/cbor'] = decode_cbor
+
+
+def get_body_decoder(request, content_type):
+    """
+    Get the body decoder for a content type
+
+    Decoders added with :meth:`.add_body_decoder` take precedence over the
+    :data:`.DEFAULT_DECODERS`.
+
+    Returns
+    -------
+    decoder : callable or None
+
+    """
+    registry = getattr(request, 'registry', None)
+    decoders = getattr(registry, 'duh_body_decoders', None)
+    if decoders and content_type in decoders:
+        return decoders[content_type]
+    return DEFAULT_DECODERS.get(content_type)
+
+
+def decoded_body(request, decoder, max_body=None, max_depth=None,
+                 max_keys=None):
+    """
+    Decode the body of a request with a body decoder
+
+    Parameters
+    ----------
+    request : :class:`~pyramid.request.Request`
+    decoder : callable
+        Function that takes the body bytes and returns a dict
+    max_body : int, optional
+        Maximum size of the body in bytes
+    max_depth : int, optional
+        Maximum nesting depth of the decoded body
+    max_keys : int, optional
+        Maximum number of keys in the decoded body, counting nested mappings
+
+    Raises
+    ------
+    exc : :class:`~pyramid.httpexceptions.HTTPRequestEntityTooLarge`
+        If the body is larger than ``max_body``
+    exc : :class:`~pyramid.httpexceptions.HTTPBadRequest`
+        If the body is malformed, is not a mapping, or exceeds ``max_depth``
+        or ``max_keys``
+
+    """
+    if max_body is not None:
+        check_content_length(request, max_body)
+    body = request.body
+    if max_body is not None and len(body) > max_body:
+        raise HTTPRequestEntityTooLarge("Request body may be at most %d "
+                                        "bytes" % max_body)
+    try:
+        params = decoder(body)
+    except ValueError:
+        raise HTTPBadRequest("Malformed request body")
+    if not isinstance(params, dict):
+        raise HTTPBadRequest("Request body must be a mapping")
+    if max_depth is not None or max_keys is not None:
+        try:
+            _check_shape(params, max_depth, max_keys)
+        except JSONLimitError as e:
+            raise HTTPBadRequest(str(e))
+    return params
+
+
+def add_body_decoder(config, content_type, decoder):
+    """
+    Config directive that adds a decoder for request bodies
+
+    Parameters
+    ----------
+    content_type : str
+        The Content-Type of the bodies to decode (e.g.
+        'application/msgpack')
+    decoder : callable
+        Function (or dotted path to one) that takes the body as bytes and
+        returns a dict. It should raise a ValueError if the body is
+        malformed. Pass ``None`` to disable a default decoder.
+
+    """
+    decoder = config.maybe_dotted(decoder)
+    if not hasattr(config.registry, 'duh_body_decoders'):
+        config.registry.duh_body_decoders = {}
+    config.registry.duh_body_decoders[content_type] = decoder
+
+
+def includeme(config):
+    """ Add the ``add_body_decoder`` directive """
+    config.add_directive('add_body_decoder', add_body_decoder)
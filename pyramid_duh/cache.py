@@ -0,0 +1,490 @@
+""" Caching of view results keyed by @argify arguments """
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import six
+from pyramid.httpexceptions import HTTPNotModified
+from pyramid.response import Response
+from pyramid.traversal import resource_path
+from six.moves import cPickle as pickle  # pylint: disable=F0401
+
+from .compat import getargspec, isawaitable, iscoroutinefunction
+from .params import wrap_view_call
+from .profiling import view_name
+from .schema import UNBOUND_ARGS
+
+
+MISSING = object()
+
+
+class LRUCache(object):
+
+    """
+    Thread-safe, in-process cache with a max size and optional TTL
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries. The least recently used entries are evicted
+        first. (default 1000)
+    ttl : float, optional
+        Default number of seconds an entry is valid for. ``None`` means
+        entries never expire. (default None)
+
+    """
+
+    def __init__(self, maxsize=1000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """ Get a value, or ``default`` if it is missing or expired """
+        with self._lock:
+            entry = self._data.pop(key, MISSING)
+            if entry is MISSING:
+                return default
+            expire, value = entry
+            if expire is not None and expire < time.time():
+                return default
+            self._data[key] = entry
+            return value
+
+    def set(self, key, value, ttl=MISSING):
+        """ Set a value, optionally with a TTL other than the default """
+        if ttl is MISSING:
+            ttl = self.ttl
+        expire = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expire, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """ Remove a value from the cache """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """ Remove all values from the cache """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PickleLRUCache(LRUCache):
+
+    """
+    Local stand-in for a shared cache such as memcached or redis
+
+    Keys are converted to strings and values are pickled, so this has the same
+    restrictions (and copy semantics) as a shared cache. Useful for
+    development and testing.
+
+    """
+
+    def get(self, key, default=None):
+        data = super(PickleLRUCache, self).get(repr(key), MISSING)
+        if data is MISSING:
+            return default
+        return pickle.loads(data)
+
+    def set(self, key, value, ttl=MISSING):
+        super(PickleLRUCache, self).set(repr(key), pickle.dumps(value, -1),
+                                        ttl)
+
+    def delete(self, key):
+        super(PickleLRUCache, self).delete(repr(key))
+
+
+def freeze(value):
+    """
+    Convert a value into a hashable form so it can be part of a key
+
+    Containers and scalars are tagged with their type, so values that compare
+    equal but are different types (``1``, ``1.0`` and ``True``, or a dict and
+    a list of pairs) have different keys.
+
+    """
+    if isinstance(value, dict):
+        items = sorted(six.iteritems(value), key=lambda item: item[0])
+        return ('dict', tuple((freeze(k), freeze(v)) for k, v in items))
+    elif isinstance(value, list):
+        return ('list', tuple(freeze(v) for v in value))
+    elif isinstance(value, tuple):
+        return ('tuple', tuple(freeze(v) for v in value))
+    elif isinstance(value, (set, frozenset)):
+        return ('set', frozenset(freeze(v) for v in value))
+    return (type(value), value)
+
+
+def _context_key(context):
+    """
+    Key for a traversal context
+
+    Raises
+    ------
+    exc : TypeError
+        If the context isn't location-aware, so it has no stable identity
+
+    """
+    if context is None:
+        return None
+    if not hasattr(context, '__name__'):
+        raise TypeError("Context %r is not location-aware" % context)
+    return resource_path(context)
+
+
+def _call_key(name, request, scope, vary):
+    """
+    Build a hashable key from the view name and bound arguments
+
+    Views that bind ``context`` (or ``self``, for view classes) are also keyed
+    on the :meth:`~pyramid.traversal.resource_path` of the context.
+
+    Returns None if the arguments cannot be hashed, or the context has no
+    path
+
+    """
+    try:
+        # Dicts with keys that can't be sorted (e.g. from a msgpack body)
+        # can't be frozen
+        args = freeze(dict((k, v) for k, v in six.iteritems(scope)
+                           if k not in UNBOUND_ARGS))
+        if 'context' in scope:
+            context = _context_key(scope['context'])
+        elif 'self' in scope:
+            context = _context_key(getattr(
+                scope['self'], 'context', getattr(request, 'context', None)))
+        else:
+            context = None
+    except TypeError:
+        return None
+    if vary == 'userid':
+        key = (name, context, args, request.authenticated_userid)
+    elif vary == 'principals':
+        key = (name, context, args,
+               tuple(sorted(request.effective_principals)))
+    else:
+        key = (name, context, args)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def argify_cache(ttl=30, maxsize=10000, backend=None, vary=None):
+    """
+    Cache the results of an @argify view, keyed by its arguments
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Number of seconds to cache results for (default 30)
+    maxsize : int, optional
+        Maximum number of cached results when using the default in-process
+        backend (default 10000)
+    backend : object, optional
+        Cache backend. Must have ``get(key, default)`` and ``set(key, value,
+        ttl)`` methods. Defaults to a :class:`.LRUCache`.
+    vary : {None, 'userid', 'principals'}, optional
+        If provided, also key the results on the ``authenticated_userid`` or
+        ``effective_principals`` of the request.
+
+    Notes
+    -----
+    This must be placed *above* the @argify decorator:
+
+    .. code-block:: python
+
+        @view_config(route_name='search', renderer='json')
+        @argify_cache(ttl=60, vary='userid')
+        @argify(limit=int)
+        def search(request, query, limit=20):
+            return {'results': run_search(query, limit)}
+
+    Only use this on views that are pure functions of their arguments. Results
+    that are :class:`~pyramid.response.Response` objects are never cached, and
+    neither are exceptions.
+
+    Views that take the ``context`` are keyed on its
+    :meth:`~pyramid.traversal.resource_path`. They are not cached if the
+    context isn't location-aware.
+
+    """
+    if vary not in (None, 'userid', 'principals'):
+        raise ValueError("Unknown value for vary: %r" % vary)
+    if backend is None:
+        backend = LRUCache(maxsize, ttl)
+
+    def handler_factory(handler, view):
+        """ Create the caching call handler """
+        name = view_name(view)
+
+        def cache_handler(request, scope):
+            """ Serve the result from the cache if possible """
+            key = _call_key(name, request, scope, vary)
+            if key is None:
+                return handler(request, scope)
+            result = backend.get(key, MISSING)
+            if result is MISSING:
+                def store(result):
+                    """ Put a result into the cache """
+                    if not isinstance(result, Response):
+                        backend.set(key, result, ttl)
+                    return result
+                result = handler(request, scope)
+                if isawaitable(result):
+                    from . import aio
+                    return aio.then(result, store)
+                return store(result)
+            return result
+        return cache_handler
+
+    def wrapper(view):
+        """ Add the cache handler to the view """
+        view = wrap_view_call(view, handler_factory)
+        view.__argify_cache__ = backend
+        return view
+    return wrapper
+
+
+def _etag_matches(request, etag):
+    """ Check if the If-None-Match header on a request matches an etag """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def argify_etag(version):
+    """
+    Respond with a 304 if the client already has the current version
+
+    Parameters
+    ----------
+    version : callable
+        A cheap function that returns the current version of the resource
+        (e.g. an ``updated_at`` timestamp). It is called with any of the
+        @argify arguments (and ``request``) that it accepts by name. If it
+        returns None, the view is called normally.
+
+    Notes
+    -----
+    This must be placed *above* the @argify decorator:
+
+    .. code-block:: python
+
+        def post_version(request, post_id):
+            return request.db.query(Post).get(post_id).updated_at
+
+        @view_config(route_name='post', renderer='json')
+        @argify_etag(post_version)
+        @argify(post_id=int)
+        def get_post(request, post_id):
+            return expensive_serialization(post_id)
+
+    The ETag is computed from the view name and the version. If the
+    ``If-None-Match`` header of a GET or HEAD request matches, the view body is
+    skipped and a :class:`~pyramid.httpexceptions.HTTPNotModified` is returned.
+    Otherwise the ETag is set on the response.
+
+    """
+    argspec = getargspec(version)
+    version_args = None if argspec.keywords is not None else argspec.args
+
+    def handler_factory(handler, view):
+        """ Create the etag call handler """
+        name = view_name(view)
+
+        def etag_handler(request, scope):
+            """ Short-circuit the view if the etag matches """
+            kwargs = dict(scope)
+            kwargs.setdefault('request', request)
+            if version_args is not None:
+                kwargs = dict((k, kwargs[k]) for k in version_args
+                              if k in kwargs)
+            current = version(**kwargs)
+            if current is None:
+                return handler(request, scope)
+            tag_data = repr((name, current)).encode('utf8')
+            etag = hashlib.md5(tag_data).hexdigest()
+            if (request.method in ('GET', 'HEAD') and
+                    _etag_matches(request, etag)):
+                response = HTTPNotModified()
+                response.etag = etag
+                return response
+
+            def set_etag(result):
+                """ Set the etag on the response """
+                if isinstance(result, Response):
+                    result.etag = etag
+                else:
+                    request.response.etag = etag
+                return result
+            result = handler(request, scope)
+            if isawaitable(result):
+                from . import aio
+                return aio.then(result, set_etag)
+            return set_etag(result)
+        return etag_handler
+
+    def wrapper(view):
+        """ Add the etag handler to the view """
+        return wrap_view_call(view, handler_factory)
+    return wrapper
+
+
+class _Flight(object):
+
+    """ A call that is in progress """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+
+    """
+    Coalesces concurrent calls that have the same key
+
+    The first caller for a key runs the function. Any other callers that
+    arrive while it is running wait for it to finish and receive the same
+    result (or exception).
+
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, fxn, *args, **kwargs):
+        """
+        Call a function, or wait for an identical call in progress
+
+        Parameters
+        ----------
+        key : object
+            Hashable key identifying the call
+        fxn : callable
+        *args :
+            Positional arguments for ``fxn``
+        **kwargs :
+            Keyword arguments for ``fxn``
+
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.exc_info is not None:
+                six.reraise(*flight.exc_info)
+            return flight.result
+        try:
+            flight.result = fxn(*args, **kwargs)
+            return flight.result
+        except:
+            flight.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def __len__(self):
+        return len(self._flights)
+
+
+def argify_coalesce(vary=None):
+    """
+    Coalesce concurrent calls to an @argify view that have identical arguments
+
+    Parameters
+    ----------
+    vary : {None, 'userid', 'principals'}, optional
+        If provided, only coalesce calls from the same ``authenticated_userid``
+        or ``effective_principals``
+
+    Notes
+    -----
+    This protects expensive views from a stampede of identical requests, for
+    example when a cache entry expires. Only one call runs, and every other
+    request that arrives while it is running gets the same result. This works
+    with threaded servers, and with ``async def`` views on an asyncio loop.
+
+    This must be placed *above* the @argify decorator. If you are also using
+    :meth:`.argify_cache`, put it above this decorator:
+
+    .. code-block:: python
+
+        @view_config(route_name='report', renderer='json')
+        @argify_cache(ttl=60)
+        @argify_coalesce()
+        @argify(year=int)
+        def report(request, year):
+            return build_expensive_report(year)
+
+    Calls are keyed like :meth:`.argify_cache`, so views that take the
+    ``context`` are only coalesced with calls on the same resource path.
+
+    The waiting requests receive the *same* result object, so the view must not
+    return anything that is modified afterwards. If the view returns a
+    :class:`~pyramid.response.Response`, the waiting requests will call the
+    view themselves.
+
+    """
+    if vary not in (None, 'userid', 'principals'):
+        raise ValueError("Unknown value for vary: %r" % vary)
+
+    def handler_factory(handler, view):
+        """ Create the coalescing call handler """
+        name = view_name(view)
+        is_coroutine = iscoroutinefunction(view)
+        if is_coroutine:
+            from . import aio
+            flights = aio.AsyncSingleFlight()
+        else:
+            flights = SingleFlight()
+
+        def coalesce_handler(request, scope):
+            """ Wait for an identical call if one is in progress """
+            key = _call_key(name, request, scope, vary)
+            if key is None:
+                return handler(request, scope)
+            if is_coroutine:
+                return flights.call(key, handler, request, scope)
+            leader = []
+
+            def run():
+                """ Run the view and note that this request was the leader """
+                leader.append(True)
+                return handler(request, scope)
+            result = flights.call(key, run)
+            if not leader and isinstance(result, Response):
+                return handler(request, scope)
+            return result
+        return coalesce_handler
+
+    def wrapper(view):
+        """ Add the coalescing handler to the view """
+        return wrap_view_call(view, handler_factory)
+    return wrapper
@@ -0,0 +1,47 @@
+""" Python 2/3 compatibility """
+import inspect
+from collections import namedtuple
+
+import six
+
+
+ArgSpec = namedtuple('ArgSpec', ['args', 'varargs', 'keywords', 'defaults'])
+
+
+if six.PY3:  # pragma: no cover
+    def getargspec(fxn):
+        """
+        Get the argspec of a function
+
+        Unlike ``inspect.getargspec``, this works with annotated functions and
+        on every version of python 3.
+
+        """
+        spec = inspect.getfullargspec(fxn)  # pylint: disable=E1101
+        return ArgSpec(spec.args, spec.varargs, spec.varkw, spec.defaults)
+
+    def iscoroutinefunction(fxn):
+        """ Check if a function is an ``async def`` coroutine function """
+        return getattr(inspect, 'iscoroutinefunction', lambda _: False)(fxn)
+
+    def isawaitable(obj):
+        """ Check if an object can be used in an ``await`` expression """
+        return getattr(inspect, 'isawaitable', lambda _: False)(obj)
+
+    def iscoroutine(obj):
+        """ Check if an object is a coroutine from an ``async def`` """
+        return getattr(inspect, 'iscoroutine', lambda _: False)(obj)
+else:  # pragma: no cover
+    getargspec = inspect.getargspec
+
+    def iscoroutinefunction(fxn):
+        """ Python 2 has no coroutine functions """
+        return False
+
+    def isawaitable(obj):
+        """ Python 2 has no awaitables """
+        return False
+
+    def iscoroutine(obj):
+        """ Python 2 has no coroutines """
+        return False
@@ -0,0 +1,144 @@
+""" Fast parsing of ISO 8601 dates and datetimes """
+import datetime
+import re
+
+import six
+
+from .cache import LRUCache
+
+try:
+    from datetime import timezone
+    UTC = timezone.utc
+except ImportError:  # pragma: no cover
+    timezone = UTC = None
+
+
+_EPOCH = re.compile(r'-?\d+(?:\.\d*)?$')
+_ISO_DATETIME = re.compile(
+    r'(\d{4})-(\d{1,2})-(\d{1,2})'
+    r'(?:[T ](\d{1,2}):(\d{1,2})(?::(\d{1,2})(?:[.,](\d{1,6})\d*)?)?)?'
+    r'\s*(Z|[+-]\d{2}(?::?\d{2})?)?$', re.I)
+_FROMISOFORMAT = hasattr(datetime.datetime, 'fromisoformat')
+# Python < 3.11 doesn't understand a trailing 'Z'
+try:
+    datetime.datetime.fromisoformat('2000-01-01T00:00:00Z')
+    _FROMISOFORMAT_Z = True
+except (AttributeError, ValueError):
+    _FROMISOFORMAT_Z = False
+
+# Only the slow path is cached. fromisoformat() is faster than a cache lookup.
+PARSE_CACHE = LRUCache(1024)
+
+
+def _parse_offset(tz):
+    """ Convert an ISO 8601 offset ('Z', '+05:30', '-08') to a timedelta """
+    if tz.upper() == 'Z':
+        return datetime.timedelta(0)
+    digits = tz[1:].replace(':', '')
+    offset = datetime.timedelta(hours=int(digits[:2]),
+                                minutes=int(digits[2:] or 0))
+    return -offset if tz[0] == '-' else offset
+
+
+def _parse_iso(value):
+    """ Parse a lenient ISO 8601 string with a regex """
+    match = _ISO_DATETIME.match(value)
+    if match is None:
+        raise ValueError("Invalid ISO 8601 datetime %r" % value)
+    year, month, day, hour, minute, second, fraction, tz = match.groups()
+    micro = int(fraction.ljust(6, '0')) if fraction else 0
+    dt = datetime.datetime(int(year), int(month), int(day), int(hour or 0),
+                           int(minute or 0), int(second or 0), micro)
+    if tz is None:
+        return dt
+    offset = _parse_offset(tz)
+    if timezone is None:  # pragma: no cover
+        return dt - offset
+    return dt.replace(tzinfo=timezone(offset))
+
+
+def to_utc(dt, aware=False):
+    """
+    Convert a datetime to UTC
+
+    Naive datetimes are assumed to already be in UTC.
+
+    Parameters
+    ----------
+    dt : :class:`~datetime.datetime`
+    aware : bool, optional
+        If True, return an aware datetime. Otherwise return a naive one.
+        (default False)
+
+    """
+    if dt.tzinfo is not None:
+        dt = (dt - dt.utcoffset()).replace(tzinfo=None)
+    if aware:
+        return dt.replace(tzinfo=UTC)
+    return dt
+
+
+def parse_datetime(value, cache=PARSE_CACHE):
+    """
+    Parse a unix timestamp or an ISO 8601 string into a datetime
+
+    Parameters
+    ----------
+    value : str or float
+    cache : :class:`~pyramid_duh.cache.LRUCache`, optional
+        Cache for strings that are not in the strict ISO 8601 format, such as
+        '2014-1-1 3:04'. Pass None to disable.
+
+    Returns
+    -------
+    dt : :class:`~datetime.datetime`
+        A naive datetime in UTC for unix timestamps. For strings, an aware
+        datetime if the string has an offset and a naive one otherwise.
+
+    Raises
+    ------
+    exc : ValueError
+        If the value can't be parsed
+
+    """
+    if isinstance(value, (float,) + six.integer_types):
+        return datetime.datetime.utcfromtimestamp(value)
+    if not isinstance(value, six.string_types):
+        raise TypeError("Cannot parse %r as a datetime" % (value,))
+    value = value.strip()
+    if _EPOCH.match(value):
+        return datetime.datetime.utcfromtimestamp(float(value))
+    if _FROMISOFORMAT:
+        iso = value
+        if not _FROMISOFORMAT_Z and value[-1:] in ('Z', 'z'):
+            iso = value[:-1] + '+00:00'
+        try:
+            return datetime.datetime.fromisoformat(iso)
+        except ValueError:
+            pass
+    if cache is None:
+        return _parse_iso(value)
+    dt = cache.get(value)
+    if dt is None:
+        dt = _parse_iso(value)
+        cache.set(value, dt)
+    return dt
+
+
+def parse_date(value, cache=PARSE_CACHE):
+    """
+    Parse a unix timestamp or an ISO 8601 string into a date
+
+    Accepts the same values as :meth:`.parse_datetime`. Any time component is
+    dropped.
+
+    """
+    if isinstance(value, (float,) + six.integer_types) or \
+            (isinstance(value, six.string_types) and _EPOCH.match(value)):
+        return datetime.datetime.utcfromtimestamp(int(float(value))).date()
+    if isinstance(value, six.string_types) and _FROMISOFORMAT:
+        try:
+            return datetime.date.fromisoformat(value.strip())
+        except ValueError:
+            pass
+    return parse_datetime(value, cache).date()
@@ -0,0 +1,157 @@
+""" Bounded thread pools for running blocking views """
+import threading
+
+from pyramid.httpexceptions import HTTPServiceUnavailable
+from pyramid.settings import aslist
+from pyramid.threadlocal import manager
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None
+
+
+class BoundedExecutor(object):
+
+    """
+    Thread pool that rejects work when it is saturated
+
+    Parameters
+    ----------
+    name : str
+    workers : int
+        Number of threads in the pool
+    queue_size : int, optional
+        Number of calls that may wait for a free thread. Once this many calls
+        are waiting, new calls are rejected with a 503. (default 0)
+
+    """
+
+    def __init__(self, name, workers, queue_size=0):
+        if ThreadPoolExecutor is None:  # pragma: no cover
+            raise ImportError("Thread pool executors require the 'futures' "
+                              "package on python 2")
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(workers)
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, fxn, *args, **kwargs):
+        """
+        Run a function on the pool
+
+        Returns
+        -------
+        future : :class:`concurrent.futures.Future`
+
+        Raises
+        ------
+        exc : :class:`~pyramid.httpexceptions.HTTPServiceUnavailable`
+            If all threads are busy and the queue is full
+
+        """
+        if not self._slots.acquire(False):
+            raise HTTPServiceUnavailable("Executor '%s' is saturated" %
+                                         self.name)
+        try:
+            future = self._pool.submit(fxn, *args, **kwargs)
+        except:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def submit_call(self, request, fxn, *args, **kwargs):
+        """
+        Run a function on the pool with the request threadlocals
+
+        ``get_current_request()`` and ``get_current_registry()`` will work as
+        expected on the pool thread.
+
+        Returns
+        -------
+        future : :class:`concurrent.futures.Future`
+
+        """
+        def run():
+            """ Run the function with the request threadlocals """
+            manager.push({'request': request, 'registry': request.registry})
+            try:
+                return fxn(*args, **kwargs)
+            finally:
+                manager.pop()
+        return self.submit(run)
+
+    def call(self, request, fxn):
+        """
+        Run a view function on the pool and wait for the result
+
+        Parameters
+        ----------
+        request : :class:`~pyramid.request.Request`
+        fxn : callable
+            Function that takes no arguments
+
+        """
+        return self.submit_call(request, fxn).result()
+
+    def shutdown(self, wait=True):
+        """ Shut down the thread pool """
+        self._pool.shutdown(wait)
+
+
+def get_executor(registry, name):
+    """
+    Get a named executor from the registry
+
+    Raises
+    ------
+    exc : KeyError
+        If no executor with that name has been configured
+
+    """
+    executors = getattr(registry, 'duh_executors', {})
+    try:
+        return executors[name]
+    except KeyError:
+        raise KeyError("No executor named '%s'. Configure it with "
+                       "config.add_executor() or the "
+                       "'pyramid_duh.executors' setting." % name)
+
+
+def add_executor(config, name, workers, queue_size=0):
+    """
+    Config directive that creates a named executor
+
+    Parameters
+    ----------
+    name : str
+    workers : int
+        Number of threads in the pool
+    queue_size : int, optional
+        Number of calls that may wait for a free thread (default 0)
+
+    """
+    if not hasattr(config.registry, 'duh_executors'):
+        config.registry.duh_executors = {}
+    config.registry.duh_executors[name] = BoundedExecutor(name, workers,
+                                                          queue_size)
+
+
+def includeme(config):
+    """
+    Add the ``add_executor`` directive and create the configured executors
+
+    Executors are configured with the ``pyramid_duh.executors`` setting, which
+    is a list of names. Each one can set
+    ``pyramid_duh.executor.<name>.workers`` (default 4) and
+    ``pyramid_duh.executor.<name>.queue`` (default 0).
+
+    """
+    config.add_directive('add_executor', add_executor)
+    settings = config.get_settings()
+    for name in aslist(settings.get('pyramid_duh.executors', '')):
+        prefix = 'pyramid_duh.executor.%s.' % name
+        config.add_executor(name, int(settings.get(prefix + 'workers', 4)),
+                            int(settings.get(prefix + 'queue', 0)))
@@ -1,9 +1,13 @@
 """ Utilities for request parameters """
 import datetime
+from collections import namedtuple
 
 import functools
 import inspect
 import json
+import keyword
+import math
+import operator
 import six
 from pyramid.httpexceptions import HTTPBadRequest, HTTPException
 from pyramid.interfaces import IRequest
@@ -14,8 +18,30 @@ from zope.interface.exceptions import DoesNotImplement
 from zope.interface.verify import verifyObject
 # pylint: enable=F0401,E0611
 
+from .body import (LazyJSONParams, check_content_length, decoded_body,
+                   get_body_decoder, json_body)
+from .compat import (getargspec, isawaitable, iscoroutine,
+                     iscoroutinefunction)
+from .executor import get_executor
+from .profiling import PROFILER, view_name
+from .schema import UNBOUND_ARGS, ViewSchema
+from .timing import timed
+from .validators import Validator, compile_validator, is_validator
+
 
 NO_ARG = object()
+# Keyword arguments to @argify that are options, not argument types
+ARGIFY_OPTIONS = ('executor', 'lazy_body', 'max_body', 'max_depth',
+                  'max_keys', 'cache_args')
+# Types whose converted values are immutable and only depend on the raw value
+PURE_TYPES = (None, bool, float, six.text_type, six.binary_type,
+              six.string_types, datetime, datetime.datetime, datetime.date,
+              datetime.timedelta) + six.integer_types
+# Options that limit the request body, with a global default from the settings
+BODY_LIMITS = ('max_body', 'max_depth', 'max_keys')
+# Maximum number of compiled params_many() plans to keep
+MAX_PARAM_PLANS = 1000
+_PARAM_PLANS = {}
 __resolver__ = DottedNameResolver(__name__)
 
 
@@ -54,13 +80,473 @@ def param(request, name, default=NO_ARG, type=None, validate=None):
                             loads)
 
 
-def _params_from_request(request):
+class Default(object):
+
+    """
+    An optional parameter for :meth:`.params_many`
+
+    Parameters
+    ----------
+    value : object
+        The value to use if the parameter is missing
+    type : object, optional
+        The type to convert the parameter to
+    validate : callable, optional
+        Callable test (or validators) for the parameter value
+
+    """
+
+    def __init__(self, value, type=None, validate=None):
+        self.value = value
+        self.type = type
+        self.validate = validate
+
+
+def _split_spec(type_spec):
+    """ Split a :meth:`.params_many` type into (type, validate, default) """
+    if isinstance(type_spec, Default):
+        return type_spec.type, type_spec.validate, type_spec.value
+    elif isinstance(type_spec, (tuple, list)) and len(type_spec) == 2:
+        return type_spec[0], type_spec[1], NO_ARG
+    return type_spec, None, NO_ARG
+
+
+def _plan_key(type_def):
+    """ Make the ``[type]`` shorthand hashable for the plan cache """
+    if isinstance(type_def, list):
+        return (list,) + tuple(_plan_key(t) for t in type_def)
+    return type_def
+
+
+def _plan_validator(validate, name):
+    """ Get the check for a validator passed to :meth:`.params_many` """
+    if isinstance(validate, Validator):
+        return validate.compiled(name)
+    elif isinstance(validate, (list, tuple)):
+        checks = [_plan_validator(v, name) for v in validate]
+        return lambda value: all(check(value) for check in checks)
+    return validate
+
+
+def _compile_plan(fields):
+    """
+    Compile the fields of a :meth:`.params_many` call
+
+    Parameters
+    ----------
+    fields : tuple
+        ``(name, type, required)`` for each field
+
+    Returns
+    -------
+    result : type
+        The namedtuple class of the result
+    binds : list
+        The bind function of each field
+    presence : list
+        Names of the required fields that read a parameter
+
+    """
+    binds = []
+    presence = []
+    for name, type_def, required in fields:
+        type_def = _normalize_type(type_def, name)
+        binds.append(_compile_param(type_def))
+        if required and _reads_param(type_def):
+            presence.append(name)
+    names = [field[0] for field in fields]
+    try:
+        result = namedtuple('Params', names)
+    except ValueError:
+        bad = [name for name in names if name.startswith('_') or
+               keyword.iskeyword(name)]
+        raise TypeError("params_many can't return parameters named %s, "
+                        "because they can't be namedtuple fields. Use "
+                        "param() for these instead." %
+                        ', '.join("'%s'" % name for name in bad))
+    return result, binds, presence
+
+
+def _param_plan(fields):
+    """
+    Get the compiled plan for a set of fields, reusing one if possible
+
+    The plan only depends on the names and types, so validators and defaults
+    don't need to be hashable or the same on every call.
+
+    """
+    key = tuple((name, _plan_key(type_def), required)
+                for name, type_def, required in fields)
+    try:
+        plan = _PARAM_PLANS.get(key)
+    except TypeError:
+        # Unhashable types are compiled for every call
+        return _compile_plan(fields)
+    if plan is None:
+        if len(_PARAM_PLANS) >= MAX_PARAM_PLANS:
+            _PARAM_PLANS.clear()
+        plan = _PARAM_PLANS[key] = _compile_plan(fields)
+    return plan
+
+
+def params_many(request, **types):
+    """
+    Access many parameters at once and perform type conversion.
+
+    The parameters are only pulled off the request once, and the conversion
+    of each set of types is compiled the first time it is used.
+
+    Parameters
+    ----------
+    request : :class:`~pyramid.request.Request`
+    **types :
+        Mapping of parameter names to types. A type may be anything accepted
+        by :meth:`.param`, a ``(type, validate)`` tuple, or a :class:`.Default`
+        for optional parameters.
+
+    Raises
+    ------
+    exc : :class:`~pyramid.httpexceptions.HTTPBadRequest`
+        If a required parameter is missing or malformed
+    exc : TypeError
+        If a name starts with an underscore or is a Python keyword, because it
+        can't be a namedtuple field
+
+    Returns
+    -------
+    params : namedtuple
+        The converted parameters, in the order they were passed in
+
+    Notes
+    -----
+    .. code-block:: python
+
+        args = request.params_many(username=str, tags=[str],
+                                   limit=Default(10, int))
+        args.limit
+
+    """
+    specs = [(name,) + _split_spec(type_spec)
+             for name, type_spec in six.iteritems(types)]
+    result, binds, presence = _param_plan(
+        [(name, type_def, default is NO_ARG)
+         for name, type_def, _, default in specs])
+    params, loads = _params_from_request(request, False,
+                                         _body_limits(request, {}))
+    if not isinstance(params, (dict, LazyJSONParams)):
+        if hasattr(params, 'getall'):
+            params = FormParams(params)
+        else:
+            params = dict(params)
+    for name in presence:
+        if name not in params:
+            raise HTTPBadRequest("Missing argument '%s'" % name)
+    return result(*[
+        bind(request, params, name, default,
+             None if validate is None else _plan_validator(validate, name),
+             loads)
+        for bind, (name, _, validate, default) in zip(binds, specs)])
+
+
+class ParamType(object):
+
+    """
+    Base class for argument types that convert the raw parameter value
+
+    Subclasses implement :meth:`.convert`. Unlike other types, the value is
+    never JSON decoded first, so form-encoded values arrive as strings and
+    file uploads arrive as the uploaded field.
+
+    Attributes
+    ----------
+    multi_param : bool
+        Set to True if the type reads the request instead of a single
+        parameter, so argify won't require a parameter with the argument name
+    pure : bool
+        Set to True if the converted value only depends on the raw value and
+        is immutable, so it can be shared between requests (see the
+        ``cache_args`` option of :meth:`.argify`)
+    body_size : int or None
+        The most bytes the argument can take up in the request body, or None
+        if it is unbounded. If an argument of an :meth:`.argify` view sets
+        this, requests with a larger Content-Length are rejected with a 413
+        before the body is parsed. (default 0)
+
+    """
+    multi_param = False
+    pure = False
+    body_size = 0
+
+    def convert(self, request, name, arg):
+        """
+        Convert a raw parameter value
+
+        Raise a ValueError or TypeError if the value is badly formatted, or an
+        :class:`~pyramid.httpexceptions.HTTPException` to set the response
+        yourself.
+
+        """
+        raise NotImplementedError
+
+    def bind(self, request, params, name, default=NO_ARG, validate=None,
+             loads=True):
+        """ Pull the parameter out of the params and convert it """
+        if self.multi_param:
+            arg = None
+        else:
+            try:
+                arg = params[name]
+            except KeyError:
+                if default is NO_ARG:
+                    raise HTTPBadRequest("Missing argument '%s'" % name)
+                return default
+        try:
+            value = self.convert(request, name, arg)
+        except (ValueError, TypeError):
+            raise HTTPBadRequest("Badly formatted parameter '%s'" % name)
+        if validate is not None and not validate(value):
+            raise HTTPBadRequest("Validation check on '%s' failed" % name)
+        return value
+
+
+class Lazy(ParamType):
+
+    """
+    Argument type that is only converted when the value is first used
+
+    Parameters
+    ----------
+    type : object
+        Any type that can be passed to :meth:`.param` or :meth:`.argify`
+
+    Notes
+    -----
+    Use this for types that are expensive to convert (for example, a
+    ``__from_json__`` that does a database lookup) in views that may return
+    before using them. The argument will be a :class:`.LazyProxy` that converts
+    the value on first access and then behaves like the converted value.
+
+    .. code-block:: python
+
+        @argify(post=Lazy(Post))
+        def edit_post(request, post, title):
+            if not request.has_permission('edit'):
+                raise HTTPForbidden()
+            post.title = title
+
+    Missing arguments are still detected before the view is called, but
+    conversion and validation errors are raised on first access.
+
+    """
+
+    def __init__(self, type):
+        self.type = type
+
+    def bind(self, request, params, name, default=NO_ARG, validate=None,
+             loads=True):
+        """ Create the lazy proxy for a parameter """
+        type = __resolver__.maybe_resolve(self.type)
+        if (getattr(type, '__argify__', False) or
+                getattr(type, 'multi_param', False) or
+                getattr(getattr(type, '__from_json__', None), '__argify__',
+                        False)):
+            return LazyProxy(functools.partial(
+                _param_from_dict, request, params, name, default, type,
+                validate, loads))
+        if name not in params:
+            if default is NO_ARG:
+                raise HTTPBadRequest("Missing argument '%s'" % name)
+            return default
+        # Snapshot the raw value, because argify consumes the params
+        raw = {name: params[name]}
+        return LazyProxy(functools.partial(
+            _param_from_dict, request, raw, name, NO_ARG, type, validate,
+            loads))
+
+
+def _proxy_method(name):
+    """ Create a method for LazyProxy that forwards to the real value """
+    def method(self, *args):
+        """ Forward to the resolved value """
+        return getattr(resolve_lazy(self), name)(*args)
+    method.__name__ = name
+    return method
+
+
+class LazyProxy(object):
+
+    """
+    Proxy that computes a value on first access and forwards to it
+
+    Attribute access, operators (including reflected and in-place operators),
+    comparisons, and conversions are forwarded to the value. Type checks such
+    as ``isinstance()`` and identity checks see the proxy, so use
+    :meth:`.resolve_lazy` to get the underlying value for those.
+
+    """
+    __slots__ = ('_factory', '_value')
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_value', NO_ARG)
+
+    def __getattr__(self, name):
+        return getattr(resolve_lazy(self), name)
+
+    def __setattr__(self, name, value):
+        setattr(resolve_lazy(self), name, value)
+
+    def __delattr__(self, name):
+        delattr(resolve_lazy(self), name)
+
+    def __nonzero__(self):
+        return bool(resolve_lazy(self))
+    __bool__ = __nonzero__
+
+    def __hash__(self):
+        return hash(resolve_lazy(self))
+
+    def __repr__(self):
+        if object.__getattribute__(self, '_value') is NO_ARG:
+            return '<LazyProxy (unresolved)>'
+        return repr(resolve_lazy(self))
+
+    def __json__(self, request):
+        value = resolve_lazy(self)
+        if hasattr(value, '__json__'):
+            return value.__json__(request)
+        return value
+
+
+def _proxy_operator(fxn):
+    """ Create a method for LazyProxy that calls a function on the value """
+    def method(self, *args):
+        """ Call the function with the resolved value and arguments """
+        return fxn(resolve_lazy(self), *[resolve_lazy(arg) for arg in args])
+    return method
+
+
+def _proxy_reflected(fxn):
+    """ Create a reflected operator method (e.g. __radd__) for LazyProxy """
+    def method(self, other):
+        """ Call the operator with the operands swapped """
+        return fxn(resolve_lazy(other), resolve_lazy(self))
+    return method
+
+
+for _name in ('__str__', '__unicode__', '__bytes__', '__format__',
+              '__len__', '__iter__', '__contains__', '__getitem__',
+              '__setitem__', '__delitem__', '__call__', '__int__',
+              '__float__', '__complex__', '__index__', '__enter__',
+              '__exit__'):
+    setattr(LazyProxy, _name, _proxy_method(_name))
+
+# Operators are forwarded with the operator functions so that both operands
+# may be proxies, and so the reflected operators work for any value
+_BINARY_OPERATORS = [
+    ('add', operator.add, operator.iadd),
+    ('sub', operator.sub, operator.isub),
+    ('mul', operator.mul, operator.imul),
+    ('truediv', operator.truediv, operator.itruediv),
+    ('floordiv', operator.floordiv, operator.ifloordiv),
+    ('mod', operator.mod, operator.imod),
+    ('pow', operator.pow, operator.ipow),
+    ('lshift', operator.lshift, operator.ilshift),
+    ('rshift', operator.rshift, operator.irshift),
+    ('and', operator.and_, operator.iand),
+    ('or', operator.or_, operator.ior),
+    ('xor', operator.xor, operator.ixor),
+    ('divmod', divmod, None),
+]
+if hasattr(operator, 'div'):  # pragma: no cover
+    _BINARY_OPERATORS.append(('div', operator.div, operator.idiv))
+if hasattr(operator, 'matmul'):  # pragma: no cover
+    _BINARY_OPERATORS.append(('matmul', operator.matmul, operator.imatmul))
+for _name, _op, _iop in _BINARY_OPERATORS:
+    setattr(LazyProxy, '__%s__' % _name, _proxy_operator(_op))
+    setattr(LazyProxy, '__r%s__' % _name, _proxy_reflected(_op))
+    if _iop is not None:
+        setattr(LazyProxy, '__i%s__' % _name, _proxy_operator(_iop))
+
+for _name, _op in (('eq', operator.eq), ('ne', operator.ne),
+                   ('lt', operator.lt), ('le', operator.le),
+                   ('gt', operator.gt), ('ge', operator.ge),
+                   ('neg', operator.neg), ('pos', operator.pos),
+                   ('abs', abs), ('invert', operator.invert),
+                   ('round', round), ('trunc', math.trunc),
+                   ('floor', math.floor), ('ceil', math.ceil),
+                   ('reversed', reversed)):
+    setattr(LazyProxy, '__%s__' % _name, _proxy_operator(_op))
+del _name, _op, _iop
+
+
+def resolve_lazy(value):
+    """
+    Get the real value from a :class:`.LazyProxy`
+
+    Values that are not lazy are returned unchanged.
+
+    """
+    if not isinstance(value, LazyProxy):
+        return value
+    resolved = object.__getattribute__(value, '_value')
+    if resolved is NO_ARG:
+        resolved = object.__getattribute__(value, '_factory')()
+        object.__setattr__(value, '_value', resolved)
+    return resolved
+
+
+class FormParams(dict):
+
+    """
+    Snapshot of form parameters that can still look up repeated keys
+
+    Lookups on the dict are fast, and :meth:`.getall` returns every value for
+    a key from the original :class:`~webob.multidict.MultiDict`.
+
+    """
+
+    def __init__(self, multidict):
+        super(FormParams, self).__init__(multidict)
+        self._multidict = multidict
+
+    def getall(self, key):
+        """ Get all values for a key """
+        return self._multidict.getall(key)
+
+
+def _normalize_type(type_spec, name=None):
+    """
+    Convert the ``[type]`` shorthand into a List type, and compile validators
+
+    """
+    if isinstance(type_spec, list) and len(type_spec) == 1:
+        from .argtypes import List
+        return List(type_spec[0])
+    elif isinstance(type_spec, (tuple, list)) and len(type_spec) == 2:
+        type_def, validate = type_spec
+        if isinstance(type_def, list):
+            type_def = _normalize_type(type_def)
+        if name is not None and is_validator(validate):
+            validate = compile_validator(validate, name)
+        return (type_def, validate)
+    return type_spec
+
+
+def _params_from_request(request, lazy_body=False, limits=None):
     """
     Pull the relevant parameters off the request.
 
     Parameters
     ----------
     request : :class:`~pyramid.request.Request`
+    lazy_body : bool, optional
+        If True, JSON bodies are returned as a
+        :class:`~pyramid_duh.body.LazyJSONParams` that only decodes the values
+        that are accessed (default False)
+    limits : dict, optional
+        Values for ``max_body``, ``max_depth``, and ``max_keys`` that are
+        checked before the body is decoded
 
     Returns
     -------
@@ -69,11 +555,302 @@ def _params_from_request(request):
         If true, any lists/dicts in the params need to be json decoded
 
     """
+    limits = limits or {}
     content_type = request.headers.get('Content-Type', '').split(';')[0]
     if content_type == 'application/json':
-        return request.json_body, False
+        return json_body(request, lazy_body, limits.get('max_body'),
+                         limits.get('max_depth'),
+                         limits.get('max_keys')), False
+    decoder = get_body_decoder(request, content_type)
+    if decoder is not None:
+        return decoded_body(request, decoder, limits.get('max_body'),
+                            limits.get('max_depth'),
+                            limits.get('max_keys')), False
+    max_body = limits.get('max_body')
+    if max_body is not None:
+        check_content_length(request, max_body)
+    params = request.params
+    max_keys = limits.get('max_keys')
+    if max_keys is not None and len(params) > max_keys:
+        raise HTTPBadRequest("Request has more than %d parameters" % max_keys)
+    return params, True
+
+
+def _body_limits(request, options, max_body=None):
+    """
+    Get the body limits for a view, falling back to the settings
+
+    ``max_body`` is the limit from the argument types (see
+    :func:`._types_body_size`), which applies on top of the others.
+
+    """
+    registry = getattr(request, 'registry', None)
+    defaults = getattr(registry, 'duh_body_limits', None) or {}
+    limits = {}
+    for name in BODY_LIMITS:
+        value = options[name] if name in options else defaults.get(name)
+        if value is not None:
+            limits[name] = value
+    if max_body is not None:
+        limits['max_body'] = min(limits.get('max_body', max_body), max_body)
+    return limits
+
+
+def _types_body_size(types):
+    """
+    Get the largest body that the argument types can be parsed from
+
+    Returns
+    -------
+    size : int or None
+        None if no type sets :attr:`~.ParamType.body_size`, or one of them
+        is unbounded
+
+    """
+    total = 0
+    for type_spec in types:
+        if isinstance(type_spec, (tuple, list)):
+            type_spec = type_spec[0]
+        if isinstance(type_spec, Lazy):
+            type_spec = type_spec.type
+        if isinstance(type_spec, ParamType):
+            if type_spec.body_size is None:
+                return None
+            total += type_spec.body_size
+    return total or None
+
+
+def _call_multi_param(fxn, request, params, loads):
+    """
+    Call an @argify'd type that consumes multiple parameters
+
+    The already-parsed parameters are passed through so the request body is
+    not decoded again.
+
+    """
+    if not hasattr(fxn, '__argify_call__'):
+        return fxn(request.context, request)
+    scope = {}
+    # Bound classmethod. Inject the 'cls' arg.
+    if inspect.ismethod(fxn) and fxn.__self__ is not None:
+        scope['cls'] = fxn.__self__
+    return fxn.__argify_call__(request.context, request, None, scope, params,
+                               loads)
+
+
+class AsyncParam(object):
+
+    """
+    Argument value from an async type converter
+
+    Awaiting it awaits the converter and validates the result (see
+    :meth:`~pyramid_duh.aio.resolve_param`). Only async views can await it.
+
+    """
+
+    def __init__(self, name, value, validate=None):
+        self.name = name
+        self.value = value
+        self.validate = validate
+
+    def __await__(self):
+        from . import aio
+        return aio.resolve_param(self.name, self.value,
+                                 self.validate).__await__()
+
+    def close(self):
+        """ Throw away the value without awaiting it """
+        close = getattr(self.value, 'close', None)
+        if close is not None:
+            close()
+
+
+def _converter(type):
+    """
+    Choose the conversion function for a type
+
+    Returns
+    -------
+    convert : callable
+        Called with ``(request, name, arg, loads)`` and returns the converted
+        value. It may raise any exception if the value is badly formatted.
+
+    """
+    if type is None:
+        return lambda request, name, arg, loads: arg
+    elif type is six.text_type or type is six.string_types:
+        def convert(request, name, arg, loads):
+            """ Check that the argument is a string """
+            if not isinstance(arg, six.string_types):
+                raise HTTPBadRequest("Argument '%s' is the wrong type!" %
+                                     name)
+            return arg
+    elif type is six.binary_type:
+        def convert(request, name, arg, loads):
+            """ Encode the argument as bytes """
+            # Binary body formats may already provide bytes
+            if isinstance(arg, six.binary_type):
+                return arg
+            return arg.encode("utf8")
+    elif type is list or type is dict:
+        def convert(request, name, arg, loads):
+            """ Decode a list or dict and check the type """
+            if loads:
+                arg = json.loads(arg)
+            if not isinstance(arg, type):
+                raise HTTPBadRequest("Argument '%s' is the wrong type!" %
+                                     name)
+            return arg
+    elif type is set:
+        def convert(request, name, arg, loads):
+            """ Decode a set """
+            if loads:
+                arg = json.loads(arg)
+            return set(arg)
+    elif type is datetime.datetime or type is datetime:
+        from .dates import parse_datetime, to_utc
+
+        def convert(request, name, arg, loads):
+            """ Parse a datetime """
+            if isinstance(arg, datetime.datetime):
+                return arg
+            return to_utc(parse_datetime(arg))
+    elif type is datetime.timedelta:
+        convert = lambda request, name, arg, loads: \
+            datetime.timedelta(seconds=float(arg))
+    elif type is datetime.date:
+        from .dates import parse_date
+        convert = lambda request, name, arg, loads: parse_date(arg)
+    elif type is bool:
+        convert = lambda request, name, arg, loads: asbool(arg)
+    elif type in six.integer_types or type is float:
+        convert = lambda request, name, arg, loads: type(arg)
+    elif hasattr(type, '__from_json__'):
+        argspec = getargspec(type.__from_json__)
+        args = list(argspec.args)
+        # Pop the leading 'cls' if this is a classmethod
+        if inspect.ismethod(type.__from_json__):
+            args.pop(0)
+        pass_request = not (len(args) == 1 and argspec.varargs is None)
+
+        def convert(request, name, arg, loads):
+            """ Decode the argument and call __from_json__ """
+            if loads:
+                arg = json.loads(arg)
+            if pass_request:
+                return type.__from_json__(request, arg)
+            return type.__from_json__(arg)
     else:
-        return request.params, True
+        def convert(request, name, arg, loads):
+            """ Decode the argument and call the type """
+            if loads:
+                arg = json.loads(arg)
+            return type(arg)
+    return convert
+
+
+def _compile_param(type):
+    """
+    Compile the function that pulls a parameter out of a dict and converts it
+
+    The work of inspecting the type is done once, instead of on every request.
+
+    Returns
+    -------
+    bind : callable
+        Called with ``(request, params, name, default, validate, loads)``
+
+    """
+    if isinstance(type, six.string_types):
+        # Dotted paths are resolved on first use, because they may not be
+        # importable when the view is decorated
+        compiled = []
+
+        def bind(request, params, name, default, validate, loads):
+            """ Resolve the type, then bind """
+            if not compiled:
+                compiled.append(_compile_param(
+                    __resolver__.maybe_resolve(type)))
+            return compiled[0](request, params, name, default, validate,
+                               loads)
+        return bind
+    if isinstance(type, list):
+        type = _normalize_type(type)
+    if isinstance(type, ParamType):
+        return type.bind
+    # If the type arg is wrapped with @argify, then it is a multi-param
+    # argument and retrieves its parameters directly
+    if type is not None:
+        multi = None
+        if getattr(type, '__argify__', False):
+            multi = type
+        elif getattr(getattr(type, '__from_json__', None), '__argify__',
+                     False):
+            multi = type.__from_json__
+        if multi is not None:
+            return lambda request, params, name, default, validate, loads: \
+                _call_multi_param(multi, request, params, loads)
+    convert = _converter(type)
+
+    def bind(request, params, name, default, validate, loads):
+        """ Pull a parameter out of a dict and convert it """
+        try:
+            arg = params[name]
+        except KeyError:
+            if default is NO_ARG:
+                raise HTTPBadRequest("Missing argument '%s'" % name)
+            else:
+                return default
+        try:
+            value = convert(request, name, arg, loads)
+            if isawaitable(value):
+                # Async type converter. The awaiting is done by async views.
+                return AsyncParam(name, value, validate)
+            if validate is not None:
+                if not validate(value):
+                    raise HTTPBadRequest("Validation check on '%s' failed" %
+                                         name)
+            return value
+        except Exception as e:
+            if isinstance(e, HTTPException):
+                raise
+            raise HTTPBadRequest("Badly formatted parameter '%s'" % name)
+    return bind
+
+
+def _compile_field(name, type_spec):
+    """ Compile an argify type spec into ``(name, bind, validate)`` """
+    if isinstance(type_spec, (tuple, list)):
+        type_def, validate = type_spec
+    else:
+        type_def, validate = type_spec, None
+    if isinstance(validate, Validator):
+        validate = validate.compiled(name)
+    return name, _compile_param(type_def), validate
+
+
+def _reads_param(type_def):
+    """ Check if a type reads the parameter with the same name """
+    if isinstance(type_def, (tuple, list)):
+        type_def = type_def[0]
+    if isinstance(type_def, Lazy):
+        type_def = type_def.type
+    return not (isinstance(type_def, six.string_types) or
+                getattr(type_def, 'multi_param', False) or
+                getattr(type_def, '__argify__', False) or
+                getattr(getattr(type_def, '__from_json__', None),
+                        '__argify__', False))
+
+
+def _is_pure(type_spec):
+    """ Check if the values of a type can be shared between requests """
+    if isinstance(type_spec, (tuple, list)):
+        type_spec = type_spec[0]
+    if isinstance(type_spec, ParamType):
+        return type_spec.pure
+    if type_spec in PURE_TYPES:
+        return True
+    return getattr(type_spec, '__argify_pure__', False)
 
 
 def _param_from_dict(request, params, name, default=NO_ARG, type=None,
@@ -102,79 +879,12 @@ def _param_from_dict(request, params, name, default=NO_ARG, type=None,
         If the parameter is missing and no default specified
 
     """
-    type = __resolver__.maybe_resolve(type)
-    # If the type arg is wrapped with @argify, then it is a multi-param
-    # argument and retrieves its parameters directly
-    if type is not None:
-        if getattr(type, '__argify__', False):
-            return type(request.context, request)
-        elif hasattr(type, '__from_json__'):
-            if getattr(type.__from_json__, '__argify__', False):
-                return type.__from_json__(request.context, request)
-
-    try:
-        arg = params[name]
-    except KeyError:
-        if default is NO_ARG:
-            raise HTTPBadRequest("Missing argument '%s'" % name)
-        else:
-            return default
-    try:
-        if type is None:
-            value = arg
-        elif type is six.text_type or type is six.string_types:
-            if not isinstance(arg, six.string_types):
-                raise HTTPBadRequest("Argument '%s' is the wrong type!" % name)
-            value = arg
-        elif type is six.binary_type:
-            value = arg.encode("utf8")
-        elif type is list or type is dict:
-            if loads:
-                arg = json.loads(arg)
-            if not isinstance(arg, type):
-                raise HTTPBadRequest("Argument '%s' is the wrong type!" % name)
-            value = arg
-        elif type is set:
-            if loads:
-                arg = json.loads(arg)
-            value = set(arg)
-        elif type is datetime.datetime or type is datetime:
-            value = datetime.datetime.utcfromtimestamp(float(arg))
-        elif type is datetime.timedelta:
-            value = datetime.timedelta(seconds=float(arg))
-        elif type is datetime.date:
-            if (isinstance(arg, six.integer_types) or
-                    isinstance(arg, float) or arg.isdigit()):
-                value = datetime.datetime.utcfromtimestamp(int(arg)).date()
-            else:
-                value = datetime.datetime.strptime(arg, '%Y-%m-%d').date()
-        elif type is bool:
-            value = asbool(arg)
-        elif type in six.integer_types or type is float:
-            value = type(arg)
-        else:
-            if loads:
-                arg = json.loads(arg)
-            if hasattr(type, '__from_json__'):
-                argspec = inspect.getargspec(type.__from_json__)
-                args = list(argspec.args)
-                # Pop the leading 'cls' if this is a classmethod
-                if inspect.ismethod(type.__from_json__):
-                    args.pop(0)
-                if len(args) == 1 and argspec.varargs is None:
-                    value = type.__from_json__(arg)
-                else:
-                    value = type.__from_json__(request, arg)
-            else:
-                value = type(arg)
-        if validate is not None:
-            if not validate(value):
-                raise HTTPBadRequest("Validation check on '%s' failed" % name)
-        return value
-    except Exception as e:
-        if isinstance(e, HTTPException):
-            raise
-        raise HTTPBadRequest("Badly formatted parameter '%s'" % name)
+    if isinstance(validate, Validator):
+        validate = validate.compiled(name)
+    elif isinstance(validate, (list, tuple)):
+        validate = compile_validator(validate, name)
+    return _compile_param(__resolver__.maybe_resolve(type))(
+        request, params, name, default, validate, loads)
 
 
 def argify(*args, **type_kwargs):
@@ -217,10 +927,50 @@ def argify(*args, **type_kwargs):
                 retval = myview(request, 5, var2='foobar')
                 self.assertEqual(retval, 'bar')
 
+    Some keyword arguments are options instead of argument types (unless the
+    view has an argument with the same name):
+
+    ==========  ===================================================
+    Option      Description
+    ==========  ===================================================
+    executor    Name of a :class:`~pyramid_duh.executor.BoundedExecutor`
+                to run the view body on (see
+                :meth:`~pyramid_duh.executor.add_executor`)
+    lazy_body   If True, only decode the top-level values of a JSON
+                body that the view uses (see
+                :class:`~pyramid_duh.body.LazyJSONParams`)
+    max_body    Respond with a 413 if the body is larger than this
+                many bytes
+    max_depth   Respond with a 400 if a JSON (or other decoded) body is
+                nested deeper than this
+    max_keys    Respond with a 400 if a JSON (or other decoded) body has
+                more than this many keys, or a form has more than this
+                many fields
+    cache_args  Cache the converted arguments of GET requests by query
+                string. True, or the max number of query strings to
+                cache. Every argument type must be pure (see
+                :class:`.ParamType`).
+    ==========  ===================================================
+
+    On python 3.5+ you may decorate ``async def`` views, and the result will
+    also be a coroutine function. Type converters (such as ``__from_json__``)
+    may return awaitables, which will be awaited before the view is called.
+
+    .. code-block:: python
+
+        class User(object):
+            @classmethod
+            async def __from_json__(cls, request, userid):
+                return await request.db.get_user(userid)
+
+        @argify(user=User)
+        async def get_user(request, user):
+            return user.__json__()
+
     """
     def wrapper(fxn):
         """ Function decorator """
-        argspec = inspect.getargspec(fxn)
+        argspec = getargspec(fxn)
         if argspec.defaults is not None:
             required = set(argspec.args[:-len(argspec.defaults)])
             optional = set(argspec.args[-len(argspec.defaults):])
@@ -228,85 +978,201 @@ def argify(*args, **type_kwargs):
             required = set(argspec.args)
             optional = ()
 
-        for type_arg in type_kwargs:
+        all_args = set(argspec.args)
+        types = dict((arg, _normalize_type(type_spec, arg))
+                     for arg, type_spec in six.iteritems(type_kwargs))
+        options = {}
+        for option in ARGIFY_OPTIONS:
+            if option in types and option not in argspec.args:
+                options[option] = types.pop(option)
+
+        for type_arg in types:
             if type_arg not in required and type_arg not in optional:
                 raise TypeError("Argument '%s' specified in argify, but not "
                                 "present in function definition" % type_arg)
+        name = view_name(fxn)
+        defaults = dict(zip(argspec.args[len(required):],
+                            argspec.defaults or ()))
+        schema = ViewSchema(name, argspec.args, defaults,
+                            dict((arg, type_kwargs[arg]) for arg in types),
+                            argspec.keywords is not None)
+        is_coroutine = iscoroutinefunction(fxn)
+        if is_coroutine:
+            from . import aio
+
+        executor = options.get('executor')
+        lazy_body = options.get('lazy_body', False)
+        body_size = _types_body_size(types.values())
+        # Compile the binding of each argument once, so each request only
+        # runs the conversions
+        special_args = [arg for arg in argspec.args
+                        if arg in ('context', 'request', 'self') and
+                        arg in required]
+        required_plan = [_compile_field(arg, types.get(arg))
+                         for arg in argspec.args if arg in required and
+                         arg not in ('context', 'request', 'self', 'cls')]
+        optional_plan = [_compile_field(arg, types.get(arg))
+                         for arg in argspec.args if arg in optional]
+        # Arguments that can be checked for presence before any of them are
+        # converted, so a missing one fails before any expensive work
+        presence_args = [arg for arg, _, _ in required_plan
+                         if _reads_param(types.get(arg))]
+        arg_cache = None
+        if options.get('cache_args'):
+            for arg, _, _ in required_plan + optional_plan:
+                if not _is_pure(types.get(arg)):
+                    raise TypeError("Cannot use cache_args on %s because the "
+                                    "type of '%s' is not pure" % (name, arg))
+            from .cache import LRUCache
+            maxsize = options['cache_args']
+            arg_cache = LRUCache(1000 if maxsize is True else maxsize)
+        if executor is None:
+            call_fxn = lambda request, scope: fxn(**scope)
+        elif is_coroutine:
+            raise TypeError("Cannot use an executor with async view %s" %
+                            name)
+        else:
+            def call_fxn(request, scope):
+                """ Run the view on a thread pool """
+                pool = get_executor(request.registry, executor)
+                return pool.call(request, functools.partial(fxn, **scope))
+
+        def bind_args(request, scope, params, loads):
+            """ Bind the request parameters into the scope """
+            if params is None:
+                params, loads = _params_from_request(
+                    request, lazy_body,
+                    _body_limits(request, options, body_size))
+            # Nested multi-param types share this dict, so the request
+            # parameters are only parsed and copied once.
+            if not isinstance(params, (dict, LazyJSONParams)):
+                if hasattr(params, 'getall'):
+                    params = FormParams(params)
+                else:
+                    params = dict(params)
+            for arg in presence_args:
+                if arg not in params and arg not in scope:
+                    raise HTTPBadRequest("Missing argument '%s'" % arg)
+            for arg, bind, validate in required_plan:
+                if arg not in scope:
+                    scope[arg] = bind(request, params, arg, NO_ARG, validate,
+                                      loads)
+            no_val = object()
+            for arg, bind, validate in optional_plan:
+                val = bind(request, params, arg, no_val, validate, loads)
+                if val is not no_val:
+                    scope[arg] = val
+            if argspec.keywords is not None:
+                for key, value in six.iteritems(params):
+                    if key not in all_args:
+                        scope[key] = value
+
+        def call_view(context, request, self, scope, params=None,
+                      loads=False):
+            """ Bind the request parameters and call the view """
+            with timed(request, 'argify'):
+                for arg in special_args:
+                    if arg in scope:
+                        continue
+                    if arg == 'context':
+                        scope['context'] = context
+                    elif arg == 'request':
+                        scope['request'] = request
+                    else:
+                        scope['self'] = self
+                if arg_cache is None or params is not None or \
+                        request.method not in ('GET', 'HEAD'):
+                    bind_args(request, scope, params, loads)
+                else:
+                    # The converted arguments only depend on the query string
+                    cached = arg_cache.get(request.query_string)
+                    if cached is None:
+                        bind_args(request, scope, params, loads)
+                        cached = dict((k, v) for k, v in six.iteritems(scope)
+                                      if k not in UNBOUND_ARGS)
+                        arg_cache.set(request.query_string, cached)
+                    else:
+                        scope.update(cached)
+            if is_coroutine:
+                return aio.call_handler(view.__argify_handler__, request,
+                                        scope)
+            for arg, value in six.iteritems(scope):
+                # Async converters and async multi-param types produce values
+                # that only async views can await
+                if type(value) is AsyncParam or iscoroutine(value):
+                    value.close()
+                    raise TypeError("Argument '%s' of %s is async, so the "
+                                    "view must be an async def" % (arg, name))
+            return view.__argify_handler__(request, scope)
+
+        compiled = []
+
+        def compile_plan():
+            """ Resolve the dotted path types now instead of on first use """
+            if compiled:
+                return
+            compiled.append(True)
+            for plan in (required_plan, optional_plan):
+                for i, (arg, bind, validate) in enumerate(plan):
+                    type_def = types.get(arg)
+                    if isinstance(type_def, tuple):
+                        type_def = type_def[0]
+                    if not isinstance(type_def, six.string_types):
+                        continue
+                    type_def = __resolver__.maybe_resolve(type_def)
+                    plan[i] = (arg, _compile_param(type_def), validate)
+                    if plan is required_plan and _reads_param(type_def):
+                        presence_args.append(arg)
+
+        # Decide how the view is called once, instead of on every request
+        inject_cls = 'cls' in required
+        is_method = 'self' in required
 
         @functools.wraps(fxn)
         def param_twiddler(*args, **kwargs):
             """ The actual wrapper function that pulls out the params """
             scope = {}
             self = None
+            view_args = args
             # If @argify is decorating a classmethod, inject the 'cls' arg
             # with no modification
-            if 'cls' in required:
-                args = list(args)
-                scope['cls'] = args.pop(0)
-                required.remove('cls')
-
-            if 'self' in required:
-                self = args[0]
-                if not hasattr(self, 'request'):
+            if inject_cls:
+                scope['cls'] = args[0]
+                view_args = args[1:]
+
+            if is_method:
+                self = view_args[0]
+                try:
+                    request = self.request
+                except AttributeError:
                     raise AttributeError("View class %s has no attribute "
                                          "'request'" % self)
-                request = self.request
                 context = getattr(self, 'context', None)
                 # Multiple args passed in, it's likely a unit test.
                 # Don't alter args at all.
-                if len(args) != 1 or len(kwargs) != 0:
+                if len(view_args) != 1 or kwargs:
                     return fxn(*args, **kwargs)
 
             # pyramid always calls with (context, request) arguments
             # If it doesn't, it's likely a unit test. Don't alter args at all.
-            elif not (len(args) == 2 and len(kwargs) == 0 and
-                      is_request(args[1])):
+            elif not (len(view_args) == 2 and not kwargs and
+                      is_request(view_args[1])):
                 return fxn(*args, **kwargs)
             else:
-                context, request = args[0], args[1]
+                context, request = view_args
 
-            params, loads = _params_from_request(request)
-            params = dict(params)
-            for arg in required:
-                type_spec = type_kwargs.get(arg)
-                if (isinstance(type_spec, tuple) or
-                        isinstance(type_spec, list)):
-                    type_def, validate = type_spec
-                else:
-                    type_def = type_spec
-                    validate = None
-
-                if arg == 'context':
-                    scope['context'] = context
-                elif arg == 'request':
-                    scope['request'] = request
-                elif arg == 'self':
-                    scope['self'] = self
-                else:
-                    scope[arg] = _param_from_dict(
-                        request, params, arg, NO_ARG,
-                        type_def, validate, loads=loads)
-                    params.pop(arg, None)
-            no_val = object()
-            for arg in optional:
-                type_spec = type_kwargs.get(arg)
-                if (isinstance(type_spec, tuple) or
-                        isinstance(type_spec, list)):
-                    type_def, validate = type_spec
-                else:
-                    type_def = type_spec
-                    validate = None
-                val = _param_from_dict(request, params, arg, no_val,
-                                       type_def, validate, loads)
-                params.pop(arg, None)
-                if val is not no_val:
-                    scope[arg] = val
-            if argspec.keywords is not None:
-                scope.update(params)
-            return fxn(**scope)
+            return PROFILER.call(name, call_view, context, request, self,
+                                 scope)
 
-        param_twiddler.__argify__ = True
-        return param_twiddler
+        view = param_twiddler
+        if is_coroutine:
+            view = aio.coroutine_view(param_twiddler)
+        view.__argify__ = True
+        view.__argify_handler__ = call_fxn
+        view.__argify_call__ = call_view
+        view.__argify_schema__ = schema
+        view.__argify_compile__ = compile_plan
+        return view
 
     wrapper.__argify__ = True
 
@@ -320,6 +1186,166 @@ def argify(*args, **type_kwargs):
         return wrapper
 
 
+def compile_view(view):
+    """
+    Finish compiling an @argify view ahead of the first request
+
+    Types that are dotted paths are normally resolved the first time they are
+    used. This resolves them now, so the first request doesn't pay for it.
+
+    Parameters
+    ----------
+    view : callable
+        A view function that has been decorated with :meth:`.argify`
+
+    Returns
+    -------
+    view : callable
+        The same view that was passed in
+
+    """
+    if not hasattr(view, '__argify_compile__'):
+        raise TypeError("%r must be decorated with @argify first" % view)
+    view.__argify_compile__()
+    return view
+
+
+def class_views(cls):
+    """
+    Find the @argify views of a class
+
+    Returns
+    -------
+    views : dict
+        Mapping of attribute names to views, including classmethods,
+        staticmethods, and methods inherited from a base class
+
+    """
+    views = {}
+    for klass in reversed(inspect.getmro(cls)):
+        for attr, value in six.iteritems(vars(klass)):
+            if isinstance(value, (classmethod, staticmethod)):
+                value = value.__func__
+            if hasattr(value, '__argify_compile__'):
+                views[attr] = value
+            else:
+                # A subclass may override an @argify method
+                views.pop(attr, None)
+    return views
+
+
+def argify_class(cls):
+    """
+    Class decorator that compiles all of the @argify views of a view class
+
+    Every method decorated with :meth:`.argify` (including classmethods and
+    staticmethods, and methods inherited from a base class) is compiled with
+    :meth:`.compile_view`. The views are stored in ``cls.__argify_views__``,
+    a dict of attribute names to views.
+
+    Notes
+    -----
+    .. code-block:: python
+
+        @argify_class
+        class UserViews(object):
+            def __init__(self, request):
+                self.request = request
+
+            @view_config(route_name='user', renderer='json')
+            @argify(user='myapp.models.User')
+            def get_user(self, user):
+                return user
+
+    """
+    views = class_views(cls)
+    for view in six.itervalues(views):
+        compile_view(view)
+    cls.__argify_views__ = views
+    return cls
+
+
+def call_with_params(view, context, request, params, loads=False):
+    """
+    Call an @argify view with explicit parameters instead of the request's
+
+    This binds the arguments exactly the way they would be bound from a
+    request, including type conversion, validation, and any handlers added
+    with :meth:`.wrap_view_call`.
+
+    Parameters
+    ----------
+    view : callable
+        A view function that has been decorated with :meth:`.argify`
+    context : object
+    request : :class:`~pyramid.request.Request`
+    params : dict
+        The parameters to bind the view arguments from
+    loads : bool, optional
+        If True, json decode list/dict data types (as with form-encoded
+        parameters). (default False)
+
+    """
+    if not hasattr(view, '__argify_call__'):
+        raise TypeError("%r must be decorated with @argify first" % view)
+    return view.__argify_call__(context, request, None, {}, params, loads)
+
+
+def wrap_view_call(view, handler_factory):
+    """
+    Add a handler around the call from an @argify view to the view function
+
+    This is how you extend @argify. Handlers receive the bound arguments
+    before the view body is run, and can choose to short-circuit the call.
+
+    Parameters
+    ----------
+    view : callable
+        A view function that has been decorated with :meth:`.argify`
+    handler_factory : callable
+        Will be called with ``(handler, view)``, where ``handler`` is the
+        next handler in the chain. It should return a new handler. Handlers
+        are called with ``(request, scope)``, where ``scope`` is the dict of
+        bound keyword arguments for the view function.
+
+    Returns
+    -------
+    view : callable
+        The same view that was passed in
+
+    Raises
+    ------
+    exc : TypeError
+        If the view has not been decorated with :meth:`.argify`
+
+    Notes
+    -----
+    Handlers are only invoked when pyramid calls the view. Unit tests that
+    call the view directly bypass them.
+
+    .. code-block:: python
+
+        def log_args_factory(handler, view):
+            def log_args(request, scope):
+                LOG.info("Calling %s with %s", view.__name__, scope)
+                return handler(request, scope)
+            return log_args
+
+        def log_args(view):
+            return wrap_view_call(view, log_args_factory)
+
+        @log_args
+        @argify(count=int)
+        def my_view(request, count):
+            ...
+
+    """
+    if not hasattr(view, '__argify_handler__'):
+        raise TypeError("%r must be decorated with @argify first" % view)
+    view.__argify_handler__ = handler_factory(view.__argify_handler__, view)
+    return view
+
+
 def is_request(obj):
     """ Check if an object looks like a request """
     try:
@@ -329,5 +1355,19 @@ def is_request(obj):
 
 
 def includeme(config):
-    """ Add parameter utilities """
+    """
+    Add parameter utilities
+
+    The settings ``pyramid_duh.max_body``, ``pyramid_duh.max_depth``, and
+    ``pyramid_duh.max_keys`` set the default body limits for @argify views.
+
+    """
     config.add_request_method(param, name='param')
+    config.add_request_method(params_many, name='params_many')
+    settings = config.get_settings()
+    limits = {}
+    for name in BODY_LIMITS:
+        value = settings.get('pyramid_duh.' + name)
+        if value is not None:
+            limits[name] = int(value)
+    config.registry.duh_body_limits = limits
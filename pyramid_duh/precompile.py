@@ -0,0 +1,147 @@
+""" Compile views and predicates when the app starts """
+import gc
+import inspect
+import logging
+import time
+
+from pyramid.events import ApplicationCreated
+from pyramid.settings import asbool
+
+from .params import class_views, compile_view
+from .view import SubpathPredicate
+
+
+LOG = logging.getLogger(__name__)
+# Run after the views and their introspectables have been registered
+PRECOMPILE_ORDER = 1000
+
+
+class PrecompileSummary(object):
+
+    """
+    Result of :meth:`.precompile`
+
+    Attributes
+    ----------
+    views : int
+        Number of @argify views that were compiled
+    predicates : int
+        Number of subpath predicates that were compiled
+    duration : float
+        Seconds spent compiling
+
+    """
+
+    def __init__(self):
+        self.views = 0
+        self.predicates = 0
+        self.duration = 0.0
+
+    def __str__(self):
+        return ("Precompiled %d argify views and %d subpath predicates in "
+                "%.1fms" % (self.views, self.predicates,
+                            1000 * self.duration))
+
+
+def _argify_views(view, attr=None):
+    """ Find the @argify views of a registered view callable """
+    if inspect.isclass(view):
+        views = class_views(view)
+        if attr is not None:
+            return [views[attr]] if attr in views else []
+        return list(views.values())
+    if attr is not None:
+        view = getattr(view, attr, None)
+    if hasattr(view, '__argify_compile__'):
+        return [view]
+    return []
+
+
+def precompile(registry):
+    """
+    Compile all of the registered @argify views and subpath predicates
+
+    Dotted path argument types are resolved, and subpath match specs are
+    parsed and compiled, so the first request to each view doesn't pay for
+    it. This needs the views to be registered with introspection enabled.
+
+    Parameters
+    ----------
+    registry : :class:`~pyramid.registry.Registry`
+
+    Returns
+    -------
+    summary : :class:`.PrecompileSummary`
+
+    """
+    summary = PrecompileSummary()
+    start = time.time()
+    introspector = getattr(registry, 'introspector', None)
+    intrs = introspector.get_category('views', ()) if introspector else ()
+    seen = set()
+    for entry in intrs:
+        intr = entry['introspectable']
+        for view in _argify_views(intr.get('callable'), intr.get('attr')):
+            if id(view) not in seen:
+                seen.add(id(view))
+                compile_view(view)
+                summary.views += 1
+        for predicate in intr.get('predicates') or ():
+            if isinstance(predicate, SubpathPredicate) and \
+                    id(predicate) not in seen:
+                seen.add(id(predicate))
+                predicate.compile()
+                summary.predicates += 1
+    summary.duration = time.time() - start
+    return summary
+
+
+def freeze_gc(event=None):
+    """
+    Collect garbage, then move every live object out of the garbage collector
+
+    Call this in the parent process of a preforking server, after the app is
+    created. The garbage collector writes to every object it tracks, which
+    copies the memory pages that the workers would otherwise share with the
+    parent. Frozen objects are never examined again.
+
+    Parameters
+    ----------
+    event : object, optional
+        Ignored, so this can be used as an event subscriber
+
+    Returns
+    -------
+    frozen : bool
+        False if this version of python doesn't have :func:`gc.freeze`
+
+    """
+    gc.collect()
+    if not hasattr(gc, 'freeze'):  # pragma: no cover
+        LOG.warning("gc.freeze() requires python 3.7 or later")
+        return False
+    gc.freeze()
+    LOG.info("Froze %d objects", gc.get_freeze_count())
+    return True
+
+
+def includeme(config):
+    """
+    Precompile the views when the configuration is committed
+
+    Set ``pyramid_duh.precompile = false`` to turn this off. If
+    ``pyramid_duh.gc_freeze`` is true, this also calls :meth:`.freeze_gc`
+    once the app is created.
+
+    """
+    settings = config.get_settings()
+    if asbool(settings.get('pyramid_duh.gc_freeze', False)):
+        config.add_subscriber(freeze_gc, ApplicationCreated)
+    if not asbool(settings.get('pyramid_duh.precompile', True)):
+        return
+    registry = config.registry
+
+    def precompile_action():
+        """ Precompile and log a summary """
+        LOG.info("%s", precompile(registry))
+    config.action(None, precompile_action, order=PRECOMPILE_ORDER)
@@ -0,0 +1,128 @@
+""" Sampled profiling of decorated views """
+import os
+import random
+import re
+import threading
+
+import cProfile
+import pstats
+
+
+class ViewProfiler(object):
+
+    """
+    Runs a sampled fraction of view calls under cProfile
+
+    Stats are aggregated per view and can be written out as pstats files with
+    :meth:`~.dump`.
+
+    Parameters
+    ----------
+    rate : float, optional
+        Fraction of calls to profile, between 0 and 1 (default 0)
+    directory : str, optional
+        Default directory to dump pstats files into
+
+    """
+
+    def __init__(self, rate=0.0, directory=None):
+        self.rate = rate
+        self.directory = directory
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def call(self, name, fxn, *args, **kwargs):
+        """
+        Call a function, profiling it if this call is sampled
+
+        Parameters
+        ----------
+        name : str
+            The name to aggregate the stats under
+        fxn : callable
+        *args :
+            Positional arguments for ``fxn``
+        **kwargs :
+            Keyword arguments for ``fxn``
+
+        """
+        if (not self.rate or random.random() >= self.rate or
+                getattr(self._local, 'active', False)):
+            return fxn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already running (possibly in another thread)
+            return fxn(*args, **kwargs)
+        self._local.active = True
+        try:
+            return fxn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self._local.active = False
+            self._add(name, profiler)
+
+    def _add(self, name, profiler):
+        """ Merge the results of a profiler run into the stats for a view """
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                self.stats[name] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+
+    def dump(self, directory=None, reset=False):
+        """
+        Write the aggregated stats to ``<directory>/<view name>.pstats``
+
+        Parameters
+        ----------
+        directory : str, optional
+            Directory to write to. Defaults to the configured directory.
+        reset : bool, optional
+            If True, discard the stats after writing them (default False)
+
+        Returns
+        -------
+        filenames : list
+
+        """
+        directory = directory or self.directory
+        if directory is None:
+            raise ValueError("No directory provided to dump profiles into")
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self._lock:
+            stats = self.stats
+            if reset:
+                self.stats = {}
+            filenames = []
+            for name, view_stats in stats.items():
+                filename = os.path.join(directory, re.sub(r'[^\w.-]', '_',
+                                                          name) + '.pstats')
+                view_stats.dump_stats(filename)
+                filenames.append(filename)
+        return filenames
+
+    def reset(self):
+        """ Discard all aggregated stats """
+        with self._lock:
+            self.stats = {}
+
+
+PROFILER = ViewProfiler()
+
+
+def view_name(fxn):
+    """ Get the name that profiling stats for a view are stored under """
+    return '%s.%s' % (fxn.__module__, getattr(fxn, '__qualname__',
+                                              fxn.__name__))
+
+
+def includeme(config):
+    """ Configure the view profiler from the settings """
+    settings = config.get_settings()
+    PROFILER.rate = float(settings.get('pyramid_duh.profile.rate', 0))
+    PROFILER.directory = settings.get('pyramid_duh.profile.dir')
@@ -1,6 +1,8 @@
 """ Utilities for traversal """
 from pyramid.httpexceptions import HTTPNotFound
 
+from .timing import timed
+
 
 class ISmartLookupResource(object):
 
@@ -28,15 +30,16 @@ class ISmartLookupResource(object):
     def __getattr__(self, name):
         if name.startswith('_'):
             raise AttributeError()
-        current = self.__parent__
-        while current is not None:
-            try:
-                return getattr(current, name)
-            except AttributeError:
-                # If this node was doing smart lookup, we don't need to
-                if isinstance(current, ISmartLookupResource):
-                    break
-                current = current.__parent__
+        with timed(None, 'lookup'):
+            current = self.__parent__
+            while current is not None:
+                try:
+                    return getattr(current, name)
+                except AttributeError:
+                    # If this node was doing smart lookup, we don't need to
+                    if isinstance(current, ISmartLookupResource):
+                        break
+                    current = current.__parent__
         raise AttributeError("'%s' not found on any parents of %s" %
                              (name, self))
 
@@ -0,0 +1,229 @@
+""" JSON Schema for the arguments of @argify views """
+import datetime
+import json
+
+import six
+from pyramid.path import DottedNameResolver
+
+from .validators import Each, Length, OneOf, Range, Regex
+
+
+__resolver__ = DottedNameResolver(__name__)
+UNBOUND_ARGS = ('context', 'request', 'self', 'cls')
+
+
+def _jsonable(value):
+    """ Check if a value can be put in a JSON document """
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _apply_validator(validator, schema):
+    """ Add the constraints from a validator to a schema """
+    is_array = schema.get('type') == 'array'
+    if isinstance(validator, Range):
+        if validator.min is not None:
+            schema['minimum'] = validator.min
+        if validator.max is not None:
+            schema['maximum'] = validator.max
+    elif isinstance(validator, Length):
+        prefix = 'Items' if is_array else 'Length'
+        if validator.min is not None:
+            schema['min' + prefix] = validator.min
+        if validator.max is not None:
+            schema['max' + prefix] = validator.max
+    elif isinstance(validator, Regex):
+        schema['pattern'] = '^(?:%s)$' % validator.pattern
+    elif isinstance(validator, OneOf):
+        if all(_jsonable(c) for c in validator.choices):
+            schema['enum'] = list(validator.choices)
+    elif isinstance(validator, Each):
+        items = schema.setdefault('items', {})
+        for check in validator.checks:
+            _apply_validator(check, items)
+
+
+def type_schema(type_spec):
+    """
+    Get the JSON Schema for an argify type spec
+
+    Parameters
+    ----------
+    type_spec : object
+        Anything that can be passed as a type to
+        :meth:`~pyramid_duh.params.argify`, including ``(type, validate)``
+
+    Returns
+    -------
+    schema : dict
+        Types that can't be described return an empty schema
+
+    """
+    from . import argtypes
+    from .params import Lazy
+    validate = None
+    if isinstance(type_spec, tuple) or (isinstance(type_spec, list) and
+                                        len(type_spec) == 2):
+        type_spec, validate = type_spec
+    type_def = __resolver__.maybe_resolve(type_spec)
+    if isinstance(type_def, list) and len(type_def) == 1:
+        type_def = argtypes.List(type_def[0])
+    if isinstance(type_def, Lazy):
+        return type_schema((type_def.type, validate))
+
+    if type_def is None:
+        schema = {}
+    elif type_def is bool:
+        schema = {'type': 'boolean'}
+    elif type_def in six.integer_types:
+        schema = {'type': 'integer'}
+    elif type_def is float:
+        schema = {'type': 'number'}
+    elif type_def in (six.text_type, six.string_types, six.binary_type):
+        schema = {'type': 'string'}
+    elif type_def is list:
+        schema = {'type': 'array'}
+    elif type_def is set:
+        schema = {'type': 'array', 'uniqueItems': True}
+    elif type_def is dict:
+        schema = {'type': 'object'}
+    elif type_def is datetime.datetime or type_def is datetime or \
+            isinstance(type_def, argtypes.DateTime):
+        schema = {'type': ['string', 'number'], 'format': 'date-time'}
+    elif type_def is datetime.date:
+        schema = {'type': ['string', 'number'], 'format': 'date'}
+    elif type_def is datetime.timedelta:
+        schema = {'type': 'number'}
+    elif isinstance(type_def, argtypes.List):
+        schema = {'type': 'array', 'items': type_schema(type_def.type)}
+        if isinstance(type_def, argtypes.Set):
+            schema['uniqueItems'] = True
+    elif isinstance(type_def, argtypes._NumberArray):
+        items = {'type': 'integer'
+                 if isinstance(type_def, argtypes.IntArray) else 'number'}
+        if type_def.min is not None:
+            items['minimum'] = type_def.min
+        if type_def.max is not None:
+            items['maximum'] = type_def.max
+        schema = {'type': 'array', 'items': items}
+        if type_def.unique:
+            schema['uniqueItems'] = True
+    elif isinstance(type_def, argtypes.Base64):
+        schema = {'type': 'string', 'contentEncoding': 'base64'}
+    elif isinstance(type_def, argtypes.Hex):
+        schema = {'type': 'string', 'pattern': '^([0-9a-fA-F]{2})*$'}
+    elif isinstance(type_def, (argtypes.Upload, argtypes.RawBody)):
+        schema = {'type': 'string', 'format': 'binary'}
+    else:
+        schema = {}
+
+    if validate is not None:
+        checks = validate if isinstance(validate, (list, tuple)) else \
+            [validate]
+        for check in checks:
+            _apply_validator(check, schema)
+    return schema
+
+
+def _multi_param_schema(type_spec):
+    """ Get the ViewSchema of a type that consumes multiple parameters """
+    if isinstance(type_spec, (tuple, list)):
+        type_spec = type_spec[0]
+    type_def = __resolver__.maybe_resolve(type_spec)
+    schema = getattr(type_def, '__argify_schema__', None)
+    if schema is None:
+        schema = getattr(getattr(type_def, '__from_json__', None),
+                         '__argify_schema__', None)
+    return schema
+
+
+class ViewSchema(object):
+
+    """
+    Description of the arguments that an @argify view binds
+
+    Parameters
+    ----------
+    name : str
+        Name of the view
+    args : list
+        Argument names, in order
+    defaults : dict
+        Default values of the optional arguments
+    types : dict
+        The type specs passed to @argify
+    kwargs : bool
+        True if the view accepts ``**kwargs``
+
+    """
+
+    def __init__(self, name, args, defaults, types, kwargs):
+        self.name = name
+        self.args = [arg for arg in args if arg not in UNBOUND_ARGS]
+        self.defaults = defaults
+        self.types = types
+        self.kwargs = kwargs
+
+    def _collect(self, properties, required):
+        """ Add the properties of this schema to a JSON Schema """
+        for arg in self.args:
+            type_spec = self.types.get(arg)
+            nested = _multi_param_schema(type_spec)
+            if nested is not None:
+                nested._collect(properties, required)
+                continue
+            schema = type_schema(type_spec)
+            if arg in self.defaults:
+                default = self.defaults[arg]
+                if default is not None and _jsonable(default):
+                    schema['default'] = default
+            elif arg not in required:
+                required.append(arg)
+            properties[arg] = schema
+
+    def json_schema(self):
+        """
+        Get a JSON Schema for the request parameters
+
+        Returns
+        -------
+        schema : dict
+
+        """
+        properties = {}
+        required = []
+        self._collect(properties, required)
+        schema = {
+            '$schema': 'http://json-schema.org/draft-07/schema#',
+            'title': self.name,
+            'type': 'object',
+            'properties': properties,
+            'additionalProperties': self.kwargs,
+        }
+        if required:
+            schema['required'] = required
+        return schema
+
+
+def json_schema(view):
+    """
+    Get the JSON Schema for the parameters of an @argify view
+
+    Parameters
+    ----------
+    view : callable
+        A view function that has been decorated with
+        :meth:`~pyramid_duh.params.argify`
+
+    Returns
+    -------
+    schema : dict
+
+    """
+    schema = getattr(view, '__argify_schema__', None)
+    if schema is None:
+        raise TypeError("%r must be decorated with @argify first" % view)
+    return schema.json_schema()
@@ -0,0 +1,158 @@
+""" Per-request timing of pyramid_duh utilities """
+import time
+
+from pyramid.path import DottedNameResolver
+from pyramid.settings import asbool
+from pyramid.threadlocal import get_current_request
+
+
+__resolver__ = DottedNameResolver(__name__)
+# Set once the timing tween is installed. Until then, timed() does nothing.
+ENABLED = False
+
+
+class Timings(object):
+
+    """
+    Accumulates the time spent in each pyramid_duh phase during a request
+
+    Attributes
+    ----------
+    phases : dict
+        Mapping of phase name to a list of ``[total_seconds, count]``
+
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.active = set()
+
+    def add(self, phase, elapsed):
+        """ Record ``elapsed`` seconds spent in ``phase`` """
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [elapsed, 1]
+        else:
+            entry[0] += elapsed
+            entry[1] += 1
+
+    def header_value(self):
+        """ Format the timings as the value of a ``Server-Timing`` header """
+        metrics = []
+        for phase in sorted(self.phases):
+            total, count = self.phases[phase]
+            metrics.append('duh-%s;dur=%.3f;desc="%d calls"' %
+                           (phase, total * 1000, count))
+        return ', '.join(metrics)
+
+
+class Timer(object):
+
+    """
+    Context manager that records the time spent in a block
+
+    Does nothing if the timing tween is not active for the request. Nested
+    blocks of the same phase are only counted once.
+
+    Parameters
+    ----------
+    request : :class:`~pyramid.request.Request` or None
+        If None, will use the current threadlocal request
+    phase : str
+        The name of the phase to record
+
+    """
+
+    def __init__(self, request, phase):
+        if request is None:
+            request = get_current_request()
+        self.timings = getattr(request, 'duh_timings', None)
+        self.phase = phase
+        self.start = None
+
+    def __enter__(self):
+        if self.timings is not None and self.phase not in self.timings.active:
+            self.timings.active.add(self.phase)
+            self.start = time.time()
+        return self
+
+    def __exit__(self, *_):
+        if self.start is not None:
+            self.timings.active.discard(self.phase)
+            self.timings.add(self.phase, time.time() - self.start)
+
+
+class _NotTimed(object):
+
+    """ Context manager that does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+NOT_TIMED = _NotTimed()
+
+
+def timed(request, phase):
+    """
+    Record the time spent in a block
+
+    If the timing tween is not installed, this returns a shared no-op context
+    manager without looking up the request.
+
+    Parameters
+    ----------
+    request : :class:`~pyramid.request.Request` or None
+        If None, will use the current threadlocal request
+    phase : str
+        The name of the phase to record
+
+    Returns
+    -------
+    timer : :class:`.Timer`
+
+    """
+    if not ENABLED:
+        return NOT_TIMED
+    return Timer(request, phase)
+
+
+def timing_tween_factory(handler, registry):
+    """
+    Tween that records pyramid_duh timings and emits them
+
+    The timings are added to the response in a ``Server-Timing`` header. If
+    ``pyramid_duh.timing.sink`` is set, it should be a dotted path to a
+    callable that will be passed ``(request, timings)`` at the end of every
+    request.
+
+    """
+    global ENABLED  # pylint: disable=W0603
+    ENABLED = True
+    settings = registry.settings or {}
+    sink = __resolver__.maybe_resolve(settings.get('pyramid_duh.timing.sink'))
+    emit_header = asbool(settings.get('pyramid_duh.timing.header', True))
+
+    def timing_tween(request):
+        """ Attach a :class:`.Timings` to the request """
+        timings = request.duh_timings = Timings()
+        try:
+            response = handler(request)
+            if emit_header and timings.phases:
+                response.headers.add('Server-Timing', timings.header_value())
+            return response
+        finally:
+            if sink is not None:
+                sink(request, timings)
+
+    return timing_tween
+
+
+def includeme(config):
+    """ Add the timing tween """
+    global ENABLED  # pylint: disable=W0603
+    ENABLED = True
+    config.add_tween('pyramid_duh.timing.timing_tween_factory')
@@ -0,0 +1,262 @@
+""" Declarative validators for @argify and request.param() """
+import re
+
+import six
+from pyramid.httpexceptions import HTTPBadRequest
+
+
+class Validator(object):
+
+    """
+    Base class for validators
+
+    Validators can be used anywhere a ``validate`` callable is accepted. When
+    they are passed to :meth:`~pyramid_duh.params.argify`, all of the
+    validators for an argument are compiled into a single function, and a
+    failure responds with a 400 that says which check failed.
+
+    """
+
+    def _compile(self, var, label, namespace):
+        """
+        Generate the source code for this check
+
+        Parameters
+        ----------
+        var : str
+            The name of the variable holding the value
+        label : str
+            Description of the value for error messages, such as
+            "Argument 'foo'"
+        namespace : dict
+            Constants used by the generated code. Add them with
+            :meth:`._const`.
+
+        Returns
+        -------
+        lines : list
+            Lines of python source that raise ``_error(message)`` if the value
+            is invalid
+
+        """
+        raise NotImplementedError
+
+    def compiled(self, name):
+        """ Get the compiled check for a parameter name """
+        cache = self.__dict__.setdefault('_compiled', {})
+        check = cache.get(name)
+        if check is None:
+            check = cache[name] = compile_validator(self, name)
+        return check
+
+    def __call__(self, value):
+        try:
+            return self.compiled('value')(value)
+        except HTTPBadRequest:
+            return False
+
+
+def _const(namespace, value):
+    """ Add a constant to the namespace of generated code """
+    key = '_c%d' % len(namespace)
+    namespace[key] = value
+    return key
+
+
+def _lower(label):
+    """ Lowercase the first letter of a label for use mid-sentence """
+    return label[:1].lower() + label[1:]
+
+
+def _fail(namespace, message):
+    """ Source code that raises a 400 with a message """
+    return 'raise _error(%s)' % _const(namespace, message)
+
+
+def _compile_check(check, var, label, namespace):
+    """ Generate source for a validator or a plain callable """
+    if isinstance(check, Validator):
+        return check._compile(var, label, namespace)
+    lines = ['if not %s(%s):' % (_const(namespace, check), var)]
+    lines.append('    ' + _fail(namespace, "Validation check on %s failed" %
+                                _lower(label)))
+    return lines
+
+
+class Range(Validator):
+
+    """
+    Check that a value is within a range (inclusive)
+
+    Parameters
+    ----------
+    min : object, optional
+    max : object, optional
+
+    """
+
+    def __init__(self, min=None, max=None):
+        self.min = min
+        self.max = max
+
+    def _compile(self, var, label, namespace):
+        lines = []
+        if self.min is not None:
+            lines.append('if %s < %s:' % (var, _const(namespace, self.min)))
+            lines.append('    ' + _fail(namespace, "%s must be at least %r" %
+                                        (label, self.min)))
+        if self.max is not None:
+            lines.append('if %s > %s:' % (var, _const(namespace, self.max)))
+            lines.append('    ' + _fail(namespace, "%s must be at most %r" %
+                                        (label, self.max)))
+        return lines
+
+
+class Length(Validator):
+
+    """
+    Check the length of a value (inclusive)
+
+    Parameters
+    ----------
+    min : int, optional
+    max : int, optional
+
+    """
+
+    def __init__(self, min=None, max=None):
+        self.min = min
+        self.max = max
+
+    def _compile(self, var, label, namespace):
+        length = '_len%d' % len(namespace)
+        namespace[length] = None
+        lines = ['%s = len(%s)' % (length, var)]
+        if self.min is not None:
+            lines.append('if %s < %d:' % (length, self.min))
+            lines.append('    ' + _fail(namespace, "%s must have a length of "
+                                        "at least %d" % (label, self.min)))
+        if self.max is not None:
+            lines.append('if %s > %d:' % (length, self.max))
+            lines.append('    ' + _fail(namespace, "%s must have a length of "
+                                        "at most %d" % (label, self.max)))
+        return lines
+
+
+class Regex(Validator):
+
+    """
+    Check that a string matches a regular expression
+
+    The whole string must match. The pattern is compiled once.
+
+    Parameters
+    ----------
+    pattern : str
+    flags : int, optional
+        Flags for :func:`re.compile`
+
+    """
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.regex = re.compile(r'(?:%s)\Z' % pattern, flags)
+
+    def _compile(self, var, label, namespace):
+        return [
+            'if %s.match(%s) is None:' % (_const(namespace, self.regex), var),
+            '    ' + _fail(namespace,
+                           "%s must match %r" % (label, self.pattern)),
+        ]
+
+
+class OneOf(Validator):
+
+    """
+    Check that a value is one of a set of choices
+
+    Parameters
+    ----------
+    choices : iterable
+
+    """
+
+    def __init__(self, choices):
+        self.choices = tuple(choices)
+        try:
+            self._lookup = frozenset(self.choices)
+        except TypeError:
+            self._lookup = self.choices
+
+    def _compile(self, var, label, namespace):
+        choices = ', '.join(repr(c) for c in self.choices)
+        return [
+            'if %s not in %s:' % (var, _const(namespace, self._lookup)),
+            '    ' + _fail(namespace,
+                           "%s must be one of %s" % (label, choices)),
+        ]
+
+
+class Each(Validator):
+
+    """
+    Run validators on every item of a list or set
+
+    Parameters
+    ----------
+    *checks :
+        Validators or callables to run on each item
+
+    """
+
+    def __init__(self, *checks):
+        self.checks = checks
+
+    def _compile(self, var, label, namespace):
+        item = '_item%d' % len(namespace)
+        namespace[item] = None
+        item_label = 'Items in %s' % _lower(label)
+        lines = ['for %s in %s:' % (item, var)]
+        for check in self.checks:
+            lines.extend('    ' + line for line in
+                         _compile_check(check, item, item_label, namespace))
+        return lines
+
+
+def compile_validator(checks, name):
+    """
+    Fuse validators into a single check function
+
+    Parameters
+    ----------
+    checks : object
+        A :class:`.Validator`, a plain callable, or a list of either
+    name : str
+        The name of the parameter, for error messages
+
+    Returns
+    -------
+    check : callable
+        Function that takes the value and returns True, or raises an
+        :class:`~pyramid.httpexceptions.HTTPBadRequest`
+
+    """
+    if not isinstance(checks, (list, tuple)):
+        checks = [checks]
+    namespace = {'_error': HTTPBadRequest}
+    label = "Argument '%s'" % name
+    lines = ['def check(value):']
+    for check in checks:
+        lines.extend('    ' + line for line in
+                     _compile_check(check, 'value', label, namespace))
+    lines.append('    return True')
+    code = compile('\n'.join(lines), '<validator %s>' % name, 'exec')
+    six.exec_(code, namespace)
+    return namespace['check']
+
+
+def is_validator(validate):
+    """ Check if a ``validate`` argument should be compiled """
+    if isinstance(validate, (list, tuple)):
+        return all(isinstance(v, Validator) or callable(v) for v in validate)
+    return isinstance(validate, Validator)
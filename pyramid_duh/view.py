@@ -3,11 +3,13 @@ import fnmatch
 import re
 
 import functools
-import inspect
 import six
 from pyramid.httpexceptions import HTTPFound
 
+from .compat import getargspec, iscoroutinefunction
 from .params import is_request
+from .profiling import PROFILER, view_name
+from .timing import timed
 
 
 def match(pattern, path, flags):
@@ -59,6 +61,46 @@ def match(pattern, path, flags):
         return fnmatch.fnmatchcase(path, pattern)
 
 
+def compile_match(pattern, flags):
+    """
+    Compile a pattern into a matcher function
+
+    Parameters
+    ----------
+    pattern : str
+        Glob or PCRE
+    flags : str
+        Match flags (see :meth:`.match`). The '?' flag is ignored.
+
+    Returns
+    -------
+    matcher : callable
+        Takes a path and returns the same result as :meth:`.match`
+
+    """
+    if 'r' in flags:
+        re_flags = 0
+        for char in flags:
+            if char == 'i':
+                re_flags |= re.I
+            elif char == 'a' and hasattr(re, 'A'):  # pragma: no cover
+                re_flags |= re.A  # pylint: disable=E1101
+        return re.compile('^%s$' % pattern, re_flags).match
+    regex = re.compile(fnmatch.translate(pattern))
+    # The translated glob may have groups of its own, so only return a bool
+    return lambda path: regex.match(path) is not None
+
+
+def _parse_spec(spec):
+    """ Split a match spec into ``(name, pattern, flags)`` """
+    pieces = spec.split('/', 2)
+    if len(pieces) == 1:
+        return None, pieces[0], ''
+    elif len(pieces) == 2:
+        return pieces[0], pieces[1], ''
+    return tuple(pieces)
+
+
 class SubpathPredicate(object):
 
     """
@@ -109,6 +151,7 @@ class SubpathPredicate(object):
             paths = (paths,)
         self.paths = paths
         self.config = config
+        self._matchers = None
 
     def text(self):
         """ Display name """
@@ -116,28 +159,49 @@ class SubpathPredicate(object):
 
     phash = text
 
+    def compile(self):
+        """
+        Parse the match specs and compile the patterns
+
+        This is done on the first request if it hasn't been done already.
+
+        Returns
+        -------
+        matchers : list
+            List of ``(name, matcher, optional)``
+
+        """
+        matchers = []
+        for spec in self.paths:
+            name, pattern, flags = _parse_spec(spec)
+            matchers.append((name, compile_match(pattern, flags),
+                             '?' in flags))
+        self._matchers = matchers
+        return matchers
+
     def __call__(self, context, request):
-        named_subpaths = {}
-        if len(request.subpath) > len(self.paths):
+        with timed(request, 'subpath'):
+            return self._match(request)
+
+    def _match(self, request):
+        """ Check the request subpath against the match specs """
+        matchers = self._matchers
+        if matchers is None:
+            matchers = self.compile()
+        subpath = request.subpath
+        if len(subpath) > len(matchers):
             return False
-        for i in range(len(self.paths)):
-            spec = self.paths[i]
-            pieces = spec.split('/', 2)
-            if len(pieces) == 1:
-                name, pattern, flags = None, pieces[0], ''
-            elif len(pieces) == 2:
-                name, pattern, flags = pieces[0], pieces[1], ''
-            else:
-                name, pattern, flags = pieces
-
-            if i < len(request.subpath):
-                path = request.subpath[i]
-            else:
-                path = None
-            result = match(pattern, path, flags)
+        named_subpaths = {}
+        for i, (name, matcher, optional) in enumerate(matchers):
+            if i >= len(subpath):
+                if not optional:
+                    return False
+                continue
+            path = subpath[i]
+            result = matcher(path)
             if not result:
                 return False
-            if name and path is not None:
+            if name:
                 named_subpaths[name] = path
             if hasattr(result, 'groupdict'):
                 named_subpaths.update(result.groupdict())
@@ -162,7 +226,8 @@ def addslash(fxn):
             return 'cool data'
 
     """
-    argspec = inspect.getargspec(fxn)
+    argspec = getargspec(fxn)
+    name = view_name(fxn)
 
     @functools.wraps(fxn)
     def slash_redirect(*args, **kwargs):
@@ -176,13 +241,16 @@ def addslash(fxn):
                     new_url += '?' + request.query_string
                 return HTTPFound(location=new_url)
             if len(argspec.args) == 1 and argspec.varargs is None:
-                return fxn(request)
+                return PROFILER.call(name, fxn, request)
             else:
-                return fxn(*args)
+                return PROFILER.call(name, fxn, *args)
         else:
             # Otherwise, it's likely a unit test. Don't change anything.
             return fxn(*args, **kwargs)
 
+    if iscoroutinefunction(fxn):
+        from . import aio
+        return aio.coroutine_view(slash_redirect)
     return slash_redirect
 
 
@@ -0,0 +1,74 @@
+""" Async views for testing. Only importable on python 3.5+ """
+import asyncio
+
+from pyramid_duh.cache import argify_cache, argify_coalesce
+from pyramid_duh.params import argify
+from pyramid_duh.view import addslash
+
+
+CALLS = []
+
+
+class AsyncUser(object):
+
+    """ Type with an async __from_json__ """
+
+    def __init__(self, userid):
+        self.userid = userid
+
+    @classmethod
+    async def __from_json__(cls, request, arg):
+        await asyncio.sleep(0)
+        return cls(int(arg))
+
+
+@argify(num=int)
+async def double(request, num):
+    await asyncio.sleep(0)
+    return num * 2
+
+
+@argify(user=AsyncUser)
+async def get_user(request, user):
+    return user.userid
+
+
+@argify(user=(AsyncUser, lambda u: u.userid > 0))
+async def get_positive_user(request, user):
+    return user.userid
+
+
+@argify
+async def fetch_login(request, name):
+    await asyncio.sleep(0)
+    return 'user:' + name
+
+
+@argify(login=fetch_login)
+async def multi_param(request, login):
+    return login
+
+
+@addslash
+async def slash_view(request):
+    return 'slash'
+
+
+@argify_cache()
+@argify(num=int)
+async def cached(request, num):
+    CALLS.append(num)
+    return num
+
+
+@argify_coalesce()
+@argify(num=int)
+async def coalesced(request, num):
+    CALLS.append(num)
+    await asyncio.sleep(0.01)
+    return num
+
+
+@argify(user=AsyncUser)
+def sync_get_user(request, user):
+    return user
@@ -0,0 +1,135 @@
+""" Tests for async view support """
+import sys
+
+from pyramid.httpexceptions import HTTPBadRequest, HTTPFound
+from pyramid.testing import DummyRequest
+
+from pyramid_duh.compat import getargspec, iscoroutinefunction
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Requires python 3.5+")
+class TestAsyncViews(unittest.TestCase):
+
+    """ Tests for @argify and @addslash on async def views """
+
+    def setUp(self):
+        super(TestAsyncViews, self).setUp()
+        import asyncio
+        from tests import async_views
+        self.views = async_views
+        self.views.CALLS[:] = []
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.asyncio = asyncio
+
+    def tearDown(self):
+        super(TestAsyncViews, self).tearDown()
+        self.asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _run(self, coro):
+        """ Run a coroutine to completion """
+        return self.loop.run_until_complete(coro)
+
+    def _request(self, **params):
+        """ Create a request with params """
+        request = DummyRequest()
+        request.params = params
+        return request
+
+    def test_coroutine_function(self):
+        """ Decorated async views are still coroutine functions """
+        self.assertTrue(iscoroutinefunction(self.views.double))
+        self.assertTrue(iscoroutinefunction(self.views.slash_view))
+
+    def test_argify(self):
+        """ argify binds arguments for async views """
+        ret = self._run(self.views.double(None, self._request(num='2')))
+        self.assertEqual(ret, 4)
+
+    def test_unit_test(self):
+        """ Calling async views directly passes arguments through """
+        ret = self._run(self.views.double(DummyRequest(), 3))
+        self.assertEqual(ret, 6)
+
+    def test_async_converter(self):
+        """ Async __from_json__ converters are awaited """
+        ret = self._run(self.views.get_user(None, self._request(user='4')))
+        self.assertEqual(ret, 4)
+
+    def test_async_converter_validate(self):
+        """ Async converter values are validated after they are awaited """
+        request = self._request(user='-1')
+        with self.assertRaises(HTTPBadRequest):
+            self._run(self.views.get_positive_user(None, request))
+
+    def test_async_converter_error(self):
+        """ Errors in async converters become a 400 """
+        request = self._request(user='abc')
+        with self.assertRaises(HTTPBadRequest):
+            self._run(self.views.get_user(None, request))
+
+    def test_async_multi_param(self):
+        """ Async @argify'd types can be used as multi-param types """
+        ret = self._run(self.views.multi_param(None,
+                                               self._request(name='foo')))
+        self.assertEqual(ret, 'user:foo')
+
+    def test_async_converter_sync_view(self):
+        """ Sync views can't use async converters """
+        import warnings
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with self.assertRaises(TypeError):
+                self.views.sync_get_user(None, self._request(user='4'))
+        self.assertEqual(caught, [])
+
+    def test_addslash(self):
+        """ addslash redirects from async views """
+        request = DummyRequest()
+        request.path_url = '/noslash'
+        ret = self._run(self.views.slash_view(None, request))
+        self.assertTrue(isinstance(ret, HTTPFound))
+
+    def test_addslash_call(self):
+        """ addslash calls async views """
+        request = DummyRequest()
+        request.path_url = '/'
+        ret = self._run(self.views.slash_view(None, request))
+        self.assertEqual(ret, 'slash')
+
+    def test_cache(self):
+        """ argify_cache caches the awaited result of async views """
+        self._run(self.views.cached(None, self._request(num='1')))
+        ret = self._run(self.views.cached(None, self._request(num='1')))
+        self.assertEqual(ret, 1)
+        self.assertEqual(self.views.CALLS, [1])
+
+    def test_coalesce(self):
+        """ argify_coalesce coalesces concurrent async calls """
+        calls = [self.views.coalesced(None, self._request(num='1'))
+                 for _ in range(5)]
+        ret = self._run(self.asyncio.gather(*calls))
+        self.assertEqual(ret, [1] * 5)
+        self.assertEqual(self.views.CALLS, [1])
+
+
+class TestCompat(unittest.TestCase):
+
+    """ Tests for compatibility functions """
+
+    def test_getargspec(self):
+        """ getargspec returns args, varargs, keywords, and defaults """
+        def fxn(a, b=1, *args, **kwargs):  # pragma: no cover
+            pass
+        spec = getargspec(fxn)
+        self.assertEqual(spec.args, ['a', 'b'])
+        self.assertEqual(spec.varargs, 'args')
+        self.assertEqual(spec.keywords, 'kwargs')
+        self.assertEqual(spec.defaults, (1,))
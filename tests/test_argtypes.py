@@ -0,0 +1,449 @@
+""" Tests for argument types """
+import array
+import base64
+import datetime
+import io
+import json
+from decimal import Decimal
+
+from mock import patch
+from pyramid.httpexceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+from pyramid.request import Request
+from pyramid.testing import DummyRequest
+from webob.multidict import MultiDict
+
+from pyramid_duh import argtypes
+from pyramid_duh.argtypes import (Base64, DateTime, FloatArray, Hex, IntArray,
+                                  List, RawBody, Set, Upload)
+from pyramid_duh.dates import UTC
+from pyramid_duh.params import argify, param
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class FieldStorage(object):
+
+    """ Stand-in for a multipart file field """
+
+    def __init__(self, data, filename='test.txt', type='text/plain',
+                 stream=False):
+        self.file = io.BytesIO(data)
+        if stream:
+            self.file = io.BufferedReader(self.file)
+        self.filename = filename
+        self.type = type
+
+
+class TestUpload(unittest.TestCase):
+
+    """ Tests for the Upload argument type """
+
+    def _request(self, data, **kwargs):
+        """ Create a request with a file upload """
+        request = DummyRequest()
+        request.params = {'upload': FieldStorage(data, **kwargs)}
+        return request
+
+    def _call(self, request, upload_type):
+        """ Run a view that binds an upload """
+        @argify(upload=upload_type)
+        def myview(request, upload):
+            return upload
+        return myview(None, request)
+
+    def test_in_memory(self):
+        """ Small uploads are kept in memory """
+        request = self._request(b'hello', filename='a.txt')
+        upload = self._call(request, Upload(threshold=10))
+        self.assertTrue(upload.in_memory)
+        self.assertEqual(upload.filename, 'a.txt')
+        self.assertEqual(upload.content_type, 'text/plain')
+        self.assertEqual(upload.size, 5)
+        self.assertEqual(upload.read(), b'hello')
+        self.assertEqual(bytes(upload.buffer()), b'hello')
+
+    def _multipart(self, data):
+        """ Create a real request with a multipart file upload """
+        body = (b'--X\r\nContent-Disposition: form-data; name="upload"; '
+                b'filename="a.txt"\r\n\r\n' + data + b'\r\n--X--\r\n')
+        return Request.blank('/', method='POST', body=body,
+                             content_type='multipart/form-data; boundary=X')
+
+    def test_reuse_file(self):
+        """ The file that the upload was parsed into is not copied """
+        request = self._request(b'hello')
+        field = request.params['upload']
+        upload = self._call(request, Upload())
+        self.assertTrue(upload.file is field.file)
+        self.assertEqual(upload.size, 5)
+
+    def test_reuse_temp_file(self):
+        """ Uploads parsed into a temporary file stay on disk """
+        data = b'abcdefgh' * 1000
+        request = self._multipart(data)
+        upload = self._call(request, Upload(max_size=len(data)))
+        self.assertTrue(upload.file is request.params['upload'].file)
+        self.assertFalse(upload.in_memory)
+        self.assertEqual(upload.size, len(data))
+        self.assertEqual(upload.read(), data)
+        buf = upload.buffer()
+        self.assertEqual(buf[:], data)
+        buf.close()
+        upload.close()
+
+    def test_spool_to_disk(self):
+        """ Copied uploads larger than the threshold are written to disk """
+        data = b'abcdefgh' * 100
+        request = self._request(data, stream=True)
+        upload = self._call(request, Upload(threshold=100, chunk_size=64))
+        self.assertFalse(upload.in_memory)
+        self.assertEqual(upload.size, len(data))
+        self.assertEqual(upload.read(), data)
+        buf = upload.buffer()
+        self.assertEqual(buf[:], data)
+        buf.close()
+        upload.close()
+
+    def test_max_size(self):
+        """ Uploads larger than max_size raise a 413 """
+        for stream in (False, True):
+            request = self._request(b'x' * 100, stream=stream)
+            self.assertRaises(HTTPRequestEntityTooLarge, self._call, request,
+                              Upload(max_size=50, chunk_size=16))
+
+    def test_max_size_content_length(self):
+        """ The upload is not counted if the whole body is small enough """
+        request = self._request(b'x' * 100, stream=True)
+        request.content_length = 200
+        upload = self._call(request, Upload(max_size=500))
+        self.assertEqual(upload.size, 100)
+
+    def test_reject_before_parse(self):
+        """ Large bodies are rejected before the form is parsed """
+        request = self._multipart(b'x' * (argtypes.FORM_OVERHEAD + 200))
+        self.assertRaises(HTTPRequestEntityTooLarge, self._call, request,
+                          Upload(max_size=100))
+        self.assertFalse('webob._parsed_post_vars' in request.environ)
+
+    def test_unbounded_body_size(self):
+        """ An upload with no max_size doesn't limit the body """
+        @argify(small=Upload(max_size=10), big=Upload())
+        def myview(request, small, big):
+            return small.size, big.size
+        request = DummyRequest()
+        request.content_length = 10 * argtypes.FORM_OVERHEAD
+        request.params = {'small': FieldStorage(b'x'),
+                          'big': FieldStorage(b'x' * 100)}
+        self.assertEqual(myview(None, request), (1, 100))
+
+    def test_not_upload(self):
+        """ Parameters that are not file uploads raise a 400 """
+        request = DummyRequest()
+        request.params = {'upload': 'abc'}
+        self.assertRaises(HTTPBadRequest, self._call, request, Upload())
+
+    def test_missing(self):
+        """ Missing uploads raise a 400 """
+        request = DummyRequest()
+        self.assertRaises(HTTPBadRequest, self._call, request, Upload())
+
+    def test_close_on_finish(self):
+        """ The upload is closed when the request finishes """
+        request = self._request(b'hello')
+        upload = self._call(request, Upload())
+        request._process_finished_callbacks()
+        self.assertTrue(upload.file.closed)
+
+
+class TestBinary(unittest.TestCase):
+
+    """ Tests for binary argument types """
+
+    def _call(self, params, arg_type):
+        """ Run a view that binds 'data' """
+        request = DummyRequest()
+        request.params = params
+
+        @argify(data=arg_type)
+        def myview(request, data):
+            return data
+        return myview(None, request)
+
+    def test_base64(self):
+        """ Base64 decodes into a memoryview """
+        data = self._call({'data': base64.b64encode(b'\x00\xff').decode()},
+                          Base64())
+        self.assertTrue(isinstance(data, memoryview))
+        self.assertEqual(data.tobytes(), b'\x00\xff')
+
+    def test_base64_mutable(self):
+        """ Base64 can decode into a bytearray """
+        data = self._call({'data': 'aGVsbG8='}, Base64(mutable=True))
+        self.assertEqual(data, bytearray(b'hello'))
+
+    def test_base64_urlsafe(self):
+        """ Base64 can decode the URL-safe alphabet """
+        encoded = base64.urlsafe_b64encode(b'\xfb\xff').decode()
+        data = self._call({'data': encoded}, Base64(urlsafe=True))
+        self.assertEqual(data.tobytes(), b'\xfb\xff')
+
+    def test_base64_bad(self):
+        """ Invalid base64 raises a 400 """
+        self.assertRaises(HTTPBadRequest, self._call, {'data': 'a$b'},
+                          Base64())
+
+    def test_hex(self):
+        """ Hex decodes into a memoryview """
+        data = self._call({'data': '00ff'}, Hex())
+        self.assertEqual(data.tobytes(), b'\x00\xff')
+
+    def test_hex_mutable(self):
+        """ Hex can decode into a bytearray """
+        data = self._call({'data': '00ff'}, Hex(mutable=True))
+        self.assertEqual(data, bytearray(b'\x00\xff'))
+
+    def test_hex_bad(self):
+        """ Invalid hex raises a 400 """
+        self.assertRaises(HTTPBadRequest, self._call, {'data': 'zz'}, Hex())
+
+    def test_raw_body(self):
+        """ RawBody is a view of the request body """
+        body = json.dumps({'key': 'a'}).encode('utf-8')
+        request = Request.blank('/', method='POST', body=body)
+        request.content_type = 'application/octet-stream'
+        request.registry = DummyRequest().registry
+
+        @argify(data=RawBody())
+        def myview(request, data):
+            return data
+        data = myview(None, request)
+        self.assertEqual(bytes(data), body)
+
+    def test_raw_body_dummy(self):
+        """ RawBody works with requests that only have a body """
+        request = DummyRequest()
+        request.body = b'abc'
+
+        @argify(data=RawBody())
+        def myview(request, data):
+            return data
+        self.assertEqual(myview(None, request).tobytes(), b'abc')
+
+
+class TestArrays(unittest.TestCase):
+
+    """ Tests for packed array argument types """
+
+    def _call(self, data, arg_type, json_body=False):
+        """ Run a view that binds 'ids' """
+        request = DummyRequest()
+        if json_body:
+            request.headers = {'Content-Type': 'application/json'}
+            request.json_body = {'ids': data}
+        elif isinstance(data, MultiDict):
+            request.params = data
+        else:
+            request.params = {'ids': data}
+
+        @argify(ids=arg_type)
+        def myview(request, ids):
+            return ids
+        return myview(None, request)
+
+    def test_json(self):
+        """ IntArray converts a JSON list """
+        ids = self._call([1, 2, 3], IntArray(), True)
+        self.assertTrue(isinstance(ids, array.array))
+        self.assertEqual(list(ids), [1, 2, 3])
+
+    def test_form_json(self):
+        """ IntArray converts a JSON string from a form """
+        self.assertEqual(list(self._call('[1, 2]', IntArray())), [1, 2])
+
+    def test_comma_separated(self):
+        """ IntArray converts a comma-separated string """
+        self.assertEqual(list(self._call('1,2, 3', IntArray())), [1, 2, 3])
+
+    def test_empty(self):
+        """ An empty string is an empty array """
+        self.assertEqual(list(self._call('', IntArray(min=1))), [])
+
+    def test_float(self):
+        """ FloatArray converts floats """
+        values = self._call('1.5,2', FloatArray())
+        self.assertEqual(list(values), [1.5, 2.0])
+
+    def test_bad_element(self):
+        """ Elements of the wrong type raise a 400 """
+        self.assertRaises(HTTPBadRequest, self._call, [1, 'a'], IntArray(),
+                          True)
+        self.assertRaises(HTTPBadRequest, self._call, [1, 1.5], IntArray(),
+                          True)
+
+    def test_overflow(self):
+        """ Elements that don't fit in the typecode raise a 400 """
+        self.assertRaises(HTTPBadRequest, self._call, [2 ** 70], IntArray(),
+                          True)
+
+    def test_range(self):
+        """ Elements outside of the range raise a 400 """
+        arg_type = IntArray(min=1, max=10)
+        self.assertEqual(list(self._call('1,10', arg_type)), [1, 10])
+        self.assertRaises(HTTPBadRequest, self._call, '0,5', arg_type)
+        self.assertRaises(HTTPBadRequest, self._call, '5,11', arg_type)
+
+    def test_unique(self):
+        """ Duplicate elements raise a 400 if unique=True """
+        self.assertRaises(HTTPBadRequest, self._call, '1,2,1',
+                          IntArray(unique=True))
+
+    def test_repeated_keys(self):
+        """ Repeated form keys are all converted """
+        params = MultiDict([('ids', '1'), ('ids', '2,3'), ('other', 'a')])
+        self.assertEqual(list(self._call(params, IntArray())), [1, 2, 3])
+        params = MultiDict([('ids', '1'), ('ids', 'a')])
+        self.assertRaises(HTTPBadRequest, self._call, params, IntArray())
+
+    def test_repeated_keys_unique(self):
+        """ Checks apply to the values from every repeated key """
+        params = MultiDict([('ids', '1'), ('ids', '1')])
+        self.assertRaises(HTTPBadRequest, self._call, params,
+                          IntArray(unique=True))
+
+    @unittest.skipIf(argtypes.numpy is None, "numpy is not installed")
+    def test_numpy(self):
+        """ Arrays can be numpy arrays """
+        ids = self._call('1,2,3', IntArray(unique=True, use_numpy=True))
+        self.assertTrue(isinstance(ids, argtypes.numpy.ndarray))
+        self.assertRaises(HTTPBadRequest, self._call, '1,2,1',
+                          IntArray(unique=True, use_numpy=True))
+
+
+class TestLists(unittest.TestCase):
+
+    """ Tests for List and Set argument types """
+
+    def _call(self, params, arg_type):
+        """ Run a view that binds 'ids' """
+        request = DummyRequest()
+        request.params = params
+
+        @argify(ids=arg_type)
+        def myview(request, ids):
+            return ids
+        return myview(None, request)
+
+    def test_repeated_keys(self):
+        """ Repeated form keys are converted to a list """
+        params = MultiDict([('ids', '1'), ('ids', '2'), ('other', 'a')])
+        self.assertEqual(self._call(params, [int]), [1, 2])
+
+    def test_single_key(self):
+        """ A single form value is a list with one element """
+        self.assertEqual(self._call(MultiDict(ids='3'), [int]), [3])
+
+    def test_comma_separated(self):
+        """ A single form value is split on commas """
+        self.assertEqual(self._call(MultiDict(ids='1,2'), List(int)), [1, 2])
+
+    def test_no_sep(self):
+        """ Splitting on commas can be disabled """
+        self.assertEqual(self._call(MultiDict(ids='a,b'), List(sep=None)),
+                         ['a,b'])
+
+    def test_json_string(self):
+        """ A single form value may be a JSON list """
+        self.assertEqual(self._call(MultiDict(ids='[1, 2]'), [int]), [1, 2])
+
+    def test_plain_dict(self):
+        """ Params without getall() are split on commas """
+        self.assertEqual(self._call({'ids': '1,2'}, [int]), [1, 2])
+
+    def test_set(self):
+        """ Set converts to a set """
+        params = MultiDict([('ids', '1'), ('ids', '1'), ('ids', '2')])
+        self.assertEqual(self._call(params, Set(int)), set([1, 2]))
+
+    def test_json_body(self):
+        """ Lists from a JSON body have their elements converted """
+        request = DummyRequest()
+        request.headers = {'Content-Type': 'application/json'}
+        request.json_body = {'ids': ['1', '2']}
+
+        @argify(ids=[int])
+        def myview(request, ids):
+            return ids
+        self.assertEqual(myview(None, request), [1, 2])
+
+    def test_custom_element(self):
+        """ Elements can be any argify type """
+        params = MultiDict([('ids', '0a'), ('ids', 'ff')])
+        values = self._call(params, [Hex(mutable=True)])
+        self.assertEqual(values, [bytearray(b'\x0a'), bytearray(b'\xff')])
+
+    def test_compile_once(self):
+        """ The element binder is compiled once, not for every element """
+        list_type = List(Decimal)
+        params = MultiDict([('ids', '1'), ('ids', '2')])
+        with patch('pyramid_duh.params._converter') as converter:
+            self.assertEqual(self._call(params, list_type),
+                             [Decimal(1), Decimal(2)])
+        self.assertFalse(converter.called)
+
+    def test_dotted_element(self):
+        """ Dotted element types are resolved on first use """
+        list_type = List('decimal.Decimal')
+        self.assertEqual(self._call(MultiDict(ids='1,2'), list_type),
+                         [Decimal(1), Decimal(2)])
+
+    def test_bad_element(self):
+        """ Badly formatted elements raise a 400 """
+        self.assertRaises(HTTPBadRequest, self._call,
+                          MultiDict(ids='1,a'), [int])
+
+    def test_validate(self):
+        """ Lists can be combined with a validation check """
+        params = MultiDict([('ids', '1'), ('ids', '2')])
+        self.assertEqual(self._call(params, ([int], lambda x: len(x) == 2)),
+                         [1, 2])
+        self.assertRaises(HTTPBadRequest, self._call, params,
+                          ([int], lambda x: len(x) == 3))
+
+    def test_param(self):
+        """ request.param() accepts the list shorthand """
+        request = DummyRequest()
+        request.params = MultiDict([('ids', '1'), ('ids', '2')])
+        self.assertEqual(param(request, 'ids', type=[int]), [1, 2])
+
+
+class TestDateTime(unittest.TestCase):
+
+    """ Tests for the DateTime argument type """
+
+    def _call(self, value, arg_type):
+        """ Run a view that binds 'ts' """
+        request = DummyRequest()
+        request.params = {'ts': value}
+
+        @argify(ts=arg_type)
+        def myview(request, ts):
+            return ts
+        return myview(None, request)
+
+    def test_naive(self):
+        """ DateTime converts to naive UTC """
+        self.assertEqual(self._call('2014-01-13T04:05:06+01:00', DateTime()),
+                         datetime.datetime(2014, 1, 13, 3, 5, 6))
+
+    def test_aware(self):
+        """ DateTime can convert to aware UTC """
+        self.assertEqual(self._call('2014-01-13T04:05:06', DateTime(True)),
+                         datetime.datetime(2014, 1, 13, 4, 5, 6, tzinfo=UTC))
+
+    def test_bad(self):
+        """ Invalid datetimes raise a 400 """
+        self.assertRaises(HTTPBadRequest, self._call, 'now', DateTime())
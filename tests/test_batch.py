@@ -0,0 +1,178 @@
+""" Tests for batch requests """
+from pyramid.config import Configurator
+from pyramid.httpexceptions import HTTPBadRequest, HTTPForbidden
+from pyramid.response import Response
+from pyramid.testing import DummyRequest
+
+import pyramid_duh
+from pyramid_duh.batch import _entry_request, make_batch_view
+from pyramid_duh.params import argify, call_with_params
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+@argify(num=int)
+def double(request, num):
+    """ Double a number """
+    return num * 2
+
+
+@argify
+def forbidden(request):
+    """ Always forbidden """
+    raise HTTPForbidden("Nope")
+
+
+@argify
+def broken(request):
+    """ Always raises an error """
+    raise ValueError("Oops")
+
+
+@argify
+def plain(request, text):
+    """ Return a Response """
+    return Response(text)
+
+
+@argify
+def created(request):
+    """ Set the status and a header on the response """
+    request.response.status_code = 201
+    request.response.headers['X-Entry'] = '1'
+    return 'ok'
+
+
+class TestBatch(unittest.TestCase):
+
+    """ Tests for the batch view """
+
+    def setUp(self):
+        super(TestBatch, self).setUp()
+        self.config = Configurator()
+        pyramid_duh.includeme(self.config)
+        self.config.add_batchable('double', double)
+        self.config.add_batchable('/forbidden', forbidden)
+        self.config.add_batchable('broken', broken)
+        self.config.add_batchable('plain', plain)
+        self.config.add_batchable('created', created)
+        self.config.add_executor('batch', 2)
+
+    def tearDown(self):
+        super(TestBatch, self).tearDown()
+        self.config.registry.duh_executors['batch'].shutdown()
+
+    def _request(self, requests):
+        """ Create a batch request with a list of entries """
+        request = DummyRequest()
+        request.registry = self.config.registry
+        request.headers = {'Content-Type': 'application/json'}
+        request.json_body = {'requests': requests}
+        return request
+
+    def _call(self, requests, **kwargs):
+        """ Call the batch view with a list of entries """
+        return make_batch_view(**kwargs)(None, self._request(requests))
+
+    def test_batch(self):
+        """ Each entry is bound and run """
+        ret = self._call([
+            {'view': 'double', 'params': {'num': 1}},
+            {'view': 'double', 'params': {'num': 4}},
+        ])
+        self.assertEqual(ret, [{'status': 200, 'body': 2},
+                               {'status': 200, 'body': 8}])
+
+    def test_path(self):
+        """ Entries can refer to views by path """
+        ret = self._call([{'path': '/forbidden'}])
+        self.assertEqual(ret, [{'status': 403, 'error': 'Nope'}])
+
+    def test_bad_params(self):
+        """ Bad parameters are a 400 for that entry """
+        ret = self._call([{'view': 'double', 'params': {'num': 'a'}}])
+        self.assertEqual(ret[0]['status'], 400)
+
+    def test_unknown_view(self):
+        """ Unknown views are a 404 for that entry """
+        ret = self._call([{'view': 'foo'}])
+        self.assertEqual(ret[0]['status'], 404)
+
+    def test_error(self):
+        """ Exceptions are a 500 for that entry """
+        ret = self._call([{'view': 'broken'}])
+        self.assertEqual(ret[0]['status'], 500)
+
+    def test_response(self):
+        """ Response objects are converted to a status and body """
+        ret = self._call([{'view': 'plain', 'params': {'text': 'foo'}}])
+        self.assertEqual(ret, [{'status': 200, 'body': 'foo'}])
+
+    def test_entry_response(self):
+        """ Entries set the status on their own response """
+        for executor in (None, 'batch'):
+            request = self._request([{'view': 'created'}])
+            ret = make_batch_view(executor=executor)(None, request)
+            self.assertEqual(ret, [{'status': 201, 'body': 'ok'}])
+            self.assertEqual(request.response.status_code, 200)
+            self.assertFalse('X-Entry' in request.response.headers)
+
+    def test_max_requests(self):
+        """ Batches over the max size are rejected """
+        with self.assertRaises(HTTPBadRequest):
+            self._call([{'view': 'double'}] * 3, max_requests=2)
+
+    def test_executor(self):
+        """ Entries can be run concurrently on an executor """
+        entries = [{'view': 'double', 'params': {'num': i}} for i in range(5)]
+        ret = self._call(entries, executor='batch')
+        self.assertEqual([r['body'] for r in ret], [0, 2, 4, 6, 8])
+
+    def test_permission(self):
+        """ Entries without the view permission are a 403 """
+        self.config.add_batchable('secret', double, permission='admin')
+        self.config.testing_securitypolicy(permissive=False)
+        ret = self._call([{'view': 'secret', 'params': {'num': 1}},
+                          {'view': 'double', 'params': {'num': 1}}])
+        self.assertEqual(ret, [{'status': 403, 'error': 'Forbidden'},
+                               {'status': 200, 'body': 2}])
+
+    def test_permission_allowed(self):
+        """ Entries with the view permission are run """
+        self.config.add_batchable('secret', double, permission='admin')
+        self.config.testing_securitypolicy(permissive=True)
+        ret = self._call([{'view': 'secret', 'params': {'num': 1}}])
+        self.assertEqual(ret, [{'status': 200, 'body': 2}])
+
+    def test_default_permission(self):
+        """ The default permission applies to batch entries """
+        self.config.set_default_permission('view')
+        self.config.testing_securitypolicy(permissive=False)
+        self.config.commit()
+        ret = self._call([{'view': 'double', 'params': {'num': 1}}])
+        self.assertEqual(ret[0]['status'], 403)
+
+    def test_entry_request(self):
+        """ Pool entries get a copy of the request without reified values """
+        request = DummyRequest()
+        request.registry = self.config.registry
+        response = request.response
+        copied = _entry_request(request)
+        self.assertTrue(copied.registry is request.registry)
+        self.assertFalse(copied.response is response)
+        self.assertTrue(request.response is response)
+
+    def test_requires_argify(self):
+        """ Batchable views must be decorated with @argify """
+        self.assertRaises(TypeError, self.config.add_batchable, 'foo',
+                          lambda request: None)
+
+    def test_call_with_params(self):
+        """ call_with_params binds arguments from the params """
+        request = DummyRequest()
+        self.assertEqual(call_with_params(double, None, request, {'num': 3}),
+                         6)
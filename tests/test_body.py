@@ -0,0 +1,489 @@
+""" Tests for body decoding utilities """
+import json
+
+from mock import MagicMock
+from pyramid.httpexceptions import HTTPBadRequest, HTTPRequestEntityTooLarge
+from pyramid.request import Request
+from pyramid.testing import DummyRequest
+
+from pyramid_duh import body
+from pyramid_duh.body import (JSONLimitError, LazyJSONParams, add_body_decoder,
+                              decode_json, scan_object)
+from pyramid_duh.params import argify, includeme, param
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class TestScanObject(unittest.TestCase):
+
+    """ Tests for scanning the top level of a JSON object """
+
+    def _spans(self, text):
+        """ Scan the text and return the raw value text for each key """
+        return dict((key, text[start:end]) for key, (start, end) in
+                    scan_object(text).items())
+
+    def test_scalars(self):
+        """ Find the spans of scalar values """
+        text = '{"a": 1, "b": -2.5e3, "c": true, "d": null, "e": "str"}'
+        self.assertEqual(self._spans(text), {
+            'a': '1',
+            'b': '-2.5e3',
+            'c': 'true',
+            'd': 'null',
+            'e': '"str"',
+        })
+
+    def test_nested(self):
+        """ Skip over nested containers """
+        text = '{"a": {"b": [1, {"c": "}]"}]}, "d": [[], {}]}'
+        self.assertEqual(self._spans(text), {
+            'a': '{"b": [1, {"c": "}]"}]}',
+            'd': '[[], {}]',
+        })
+
+    def test_escapes(self):
+        """ Handle escaped quotes in strings and keys """
+        text = r'{"a\"b": "x\"}y\\", "c": 1}'
+        self.assertEqual(self._spans(text), {
+            'a"b': r'"x\"}y\\"',
+            'c': '1',
+        })
+
+    def test_whitespace(self):
+        """ Whitespace is allowed everywhere """
+        text = ' {\n "a" :\t[ 1 , 2 ] ,\n"b":{} \n} \n'
+        self.assertEqual(self._spans(text), {'a': '[ 1 , 2 ]', 'b': '{}'})
+
+    def test_empty(self):
+        """ Empty objects have no keys """
+        self.assertEqual(scan_object(' {} '), {})
+
+    def test_malformed(self):
+        """ Malformed JSON raises a ValueError """
+        for text in ('[1, 2]', '{"a": 1', '{"a" 1}', '{"a": [1}',
+                     '{"a": "b}', '{"a": 1,}', '{"a": 1} x', '{a: 1}'):
+            self.assertRaises(ValueError, scan_object, text)
+
+    def test_bad_scalars(self):
+        """ Skipped scalars must be valid JSON tokens """
+        for text in ('{"a": 1, "b": garbage}', '{"a": tru}', '{"a": 01}',
+                     '{"a": 1.}', '{"a": -}', '{"a": nulls}'):
+            self.assertRaises(ValueError, scan_object, text)
+
+    def test_bad_containers(self):
+        """ Skipped containers are checked like the rest of the body """
+        prefix = '1, ' * 200
+        for value in ('[%s1 2 3]', '[%seeee]', '[%snul]', '{1: 2}',
+                      '[%s"\\q"]', '[%s1]]', '[%s1'):
+            text = '{"a": 1, "x": %s}' % (value.replace('%s', prefix))
+            self.assertRaises(ValueError, scan_object, text)
+
+    def test_bad_strings(self):
+        """ Skipped strings can't contain control characters """
+        self.assertRaises(ValueError, scan_object, '{"a": "b\nc"}')
+        self.assertRaises(ValueError, scan_object, '{"a": "b\\q"}')
+
+    def test_same_as_decode(self):
+        """ Bodies are accepted by the scanner if json accepts them """
+        for text in ('{"a": NaN, "b": -Infinity}', '{"a": "\\u00e9\\""}',
+                     '{"a": [1, {"b": "]"}], "c": -0.5e-3}',
+                     '{"a": [1 2]}', '{"a": "\t"}', '{"a": +1}',
+                     '{"a": .5}', '{"a": -NaN}'):
+            try:
+                json.loads(text)
+            except ValueError:
+                self.assertRaises(ValueError, scan_object, text)
+            else:
+                self.assertEqual(set(scan_object(text)),
+                                 set(json.loads(text)))
+
+
+class TestLazyJSONParams(unittest.TestCase):
+
+    """ Tests for the lazy JSON mapping """
+
+    def test_decode(self):
+        """ Values are decoded on access """
+        params = LazyJSONParams('{"a": [1, 2], "b": {"c": "d"}}')
+        self.assertEqual(params['a'], [1, 2])
+        self.assertEqual(params['b'], {'c': 'd'})
+        self.assertTrue('a' in params)
+        self.assertFalse('z' in params)
+        self.assertEqual(params.get('z', 5), 5)
+        self.assertEqual(sorted(params.keys()), ['a', 'b'])
+
+    def test_memoize(self):
+        """ Decoded values are memoized """
+        params = LazyJSONParams('{"a": [1, 2]}')
+        self.assertTrue(params['a'] is params['a'])
+
+    def test_missing(self):
+        """ Missing keys raise a KeyError """
+        params = LazyJSONParams('{"a": 1}')
+        self.assertRaises(KeyError, lambda: params['b'])
+
+
+class TestLazyBody(unittest.TestCase):
+
+    """ Tests for @argify(lazy_body=True) """
+
+    def _request(self, data):
+        """ Create a request with a JSON body """
+        request = DummyRequest()
+        request.headers = {'Content-Type': 'application/json'}
+        request.body = data if isinstance(data, bytes) else \
+            json.dumps(data).encode('utf-8')
+        return request
+
+    def test_lazy_body(self):
+        """ Arguments are decoded from the lazy body """
+        @argify(lazy_body=True, ids=list)
+        def myview(request, name, ids, flag=False):
+            return name, ids, flag
+        request = self._request({'name': 'a', 'ids': [1, 2],
+                                 'blob': ['x'] * 100})
+        self.assertEqual(myview(None, request), ('a', [1, 2], False))
+
+    def test_lazy_kwargs(self):
+        """ Leftover keys are decoded for **kwargs """
+        @argify(lazy_body=True)
+        def myview(request, name, **kwargs):
+            return kwargs
+        request = self._request({'name': 'a', 'other': {'b': 1}})
+        self.assertEqual(myview(None, request), {'other': {'b': 1}})
+
+    def test_lazy_missing(self):
+        """ Missing arguments raise a 400 """
+        @argify(lazy_body=True)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request({'other': 1})
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+
+    def test_malformed(self):
+        """ Malformed bodies raise a 400 """
+        @argify(lazy_body=True)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request(b'{"name": ')
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+
+    def test_malformed_skipped(self):
+        """ Malformed values in skipped keys raise a 400 """
+        @argify(lazy_body=True)
+        def myview(request, name):  # pragma: no cover
+            return name
+        for other in (b'garbage', b'[' + b'1, ' * 200 + b'1 2 3]'):
+            request = self._request(b'{"name": "a", "other": ' + other + b'}')
+            self.assertRaises(HTTPBadRequest, myview, None, request)
+
+
+class TestDecodeJson(unittest.TestCase):
+
+    """ Tests for decoding JSON and checking its shape """
+
+    def test_decode(self):
+        """ Documents within the limits are decoded """
+        data = {'a': [[{'b': 1}]], 'c': []}
+        self.assertEqual(decode_json(json.dumps(data), 4, 3), data)
+
+    def test_depth(self):
+        """ Documents nested too deeply raise a JSONLimitError """
+        text = json.dumps({'a': [[{'b': 1}]], 'c': []})
+        decode_json(text, max_depth=4)
+        self.assertRaises(JSONLimitError, decode_json, text, max_depth=3)
+
+    def test_recursion_limit(self):
+        """ Documents too deep for the decoder raise a JSONLimitError """
+        text = '[' * 100000 + ']' * 100000
+        self.assertRaises(JSONLimitError, decode_json, text, max_depth=10)
+
+    def test_keys(self):
+        """ Documents with too many keys raise a JSONLimitError """
+        text = json.dumps({'a': {'b': 1, 'c': 2}, 'd': 3})
+        decode_json(text, max_keys=4)
+        self.assertRaises(JSONLimitError, decode_json, text, max_keys=3)
+
+    def test_ignore_strings(self):
+        """ Structural characters inside strings are not counted """
+        text = json.dumps({'a': '[[{{::', 'b': '\\"[{:'})
+        decode_json(text, max_depth=1, max_keys=2)
+
+    def test_malformed(self):
+        """ Malformed documents raise a ValueError """
+        for text in ('{"a": }', '{"a": 1} x', '{"a": [1, 2'):
+            self.assertRaises(ValueError, decode_json, text, 2, 2)
+
+    def test_lazy_depth(self):
+        """ Lazy values are checked for depth when they are decoded """
+        params = LazyJSONParams('{"a": [1], "b": [[1]]}', max_depth=2)
+        self.assertEqual(params['a'], [1])
+        self.assertRaises(HTTPBadRequest, params.__getitem__, 'b')
+
+    def test_lazy_keys(self):
+        """ Keys in lazy values count towards the limit """
+        text = '{"a": {"b": 1}, "c": {"d": 1, "e": 2}}'
+        self.assertRaises(JSONLimitError, LazyJSONParams, text, max_keys=1)
+        params = LazyJSONParams(text, max_keys=4)
+        self.assertEqual(params['a'], {'b': 1})
+        self.assertRaises(HTTPBadRequest, params.__getitem__, 'c')
+
+
+class TestBodyLimits(unittest.TestCase):
+
+    """ Tests for rejecting request bodies before decoding them """
+
+    def _request(self, data, content_type='application/json'):
+        """ Create a request with a JSON body """
+        request = DummyRequest()
+        request.headers = {'Content-Type': content_type}
+        request.body = json.dumps(data).encode('utf-8')
+        request.content_length = len(request.body)
+        request.json_body = data
+        return request
+
+    def test_max_body(self):
+        """ Bodies with a large Content-Length are rejected with a 413 """
+        @argify(max_body=10)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request({'name': 'a' * 10})
+        self.assertRaises(HTTPRequestEntityTooLarge, myview, None, request)
+
+    def test_max_body_no_length(self):
+        """ Bodies with no Content-Length are still checked """
+        @argify(max_body=10)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request({'name': 'a' * 10})
+        request.content_length = None
+        self.assertRaises(HTTPRequestEntityTooLarge, myview, None, request)
+
+    def test_max_depth(self):
+        """ Deeply nested bodies are rejected """
+        @argify(max_depth=2)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request({'name': 'a', 'b': [[[1]]]})
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+
+    def test_max_keys(self):
+        """ Bodies with too many keys are rejected """
+        @argify(max_keys=2)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request({'name': 'a', 'b': 1, 'c': 2})
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+
+    def test_max_keys_form(self):
+        """ Forms with too many fields are rejected """
+        @argify(max_keys=2)
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = DummyRequest()
+        request.params = {'name': 'a', 'b': '1', 'c': '2'}
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+
+    def test_within_limits(self):
+        """ Bodies within the limits are bound normally """
+        @argify(max_body=100, max_depth=2, max_keys=3, ids=list)
+        def myview(request, name, ids):
+            return name, ids
+        request = self._request({'name': 'a', 'ids': [1, 2]})
+        self.assertEqual(myview(None, request), ('a', [1, 2]))
+
+    def test_global_limits(self):
+        """ Limits from the settings apply to every view """
+        @argify
+        def myview(request, name):  # pragma: no cover
+            return name
+        request = self._request({'name': 'a' * 10})
+        request.registry.duh_body_limits = {'max_body': 10}
+        try:
+            self.assertRaises(HTTPRequestEntityTooLarge, myview, None,
+                              request)
+        finally:
+            del request.registry.duh_body_limits
+
+    def test_view_overrides_global(self):
+        """ Per-view limits override the settings """
+        @argify(max_body=None)
+        def myview(request, name):
+            return name
+        request = self._request({'name': 'a' * 10})
+        request.registry.duh_body_limits = {'max_body': 10}
+        try:
+            self.assertEqual(myview(None, request), 'a' * 10)
+        finally:
+            del request.registry.duh_body_limits
+
+    def test_include_settings(self):
+        """ Including pyramid_duh.params reads the limits from the settings """
+        config = MagicMock()
+        config.get_settings.return_value = {'pyramid_duh.max_body': '1024'}
+        includeme(config)
+        self.assertEqual(config.registry.duh_body_limits, {'max_body': 1024})
+
+    def test_no_registry(self):
+        """ Requests with no registry use no limits """
+        @argify
+        def myview(request, name):
+            return name
+        request = Request.blank('/', method='POST',
+                                content_type='application/json',
+                                body=b'{"name": "a"}')
+        self.assertEqual(myview(None, request), 'a')
+
+    def test_missing_before_convert(self):
+        """ Missing arguments are detected before any are converted """
+        converted = []
+
+        def convert(value):
+            """ Record the conversion """
+            converted.append(value)
+            return value
+
+        @argify(first=convert)
+        def myview(request, first, second):  # pragma: no cover
+            return first, second
+        request = self._request({'first': 'a'})
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+        self.assertEqual(converted, [])
+
+
+def decode_test(data):
+    """ Test decoder that returns bytes values """
+    params = json.loads(data.decode('utf-8'))
+    if isinstance(params, dict):
+        params['raw'] = b'\x00\x01'
+    return params
+
+
+class TestBodyDecoders(unittest.TestCase):
+
+    """ Tests for pluggable body decoders """
+
+    def setUp(self):
+        super(TestBodyDecoders, self).setUp()
+        self.request = DummyRequest()
+        self.request.headers = {'Content-Type': 'application/x-test'}
+        self.request.registry.duh_body_decoders = {
+            'application/x-test': decode_test,
+        }
+
+    def tearDown(self):
+        super(TestBodyDecoders, self).tearDown()
+        del self.request.registry.duh_body_decoders
+
+    def test_argify(self):
+        """ @argify binds arguments from a decoded body """
+        @argify(ids=list, raw=bytes)
+        def myview(request, ids, raw):
+            return ids, raw
+        self.request.body = b'{"ids": [1, 2]}'
+        self.assertEqual(myview(None, self.request), ([1, 2], b'\x00\x01'))
+
+    def test_param(self):
+        """ request.param() uses the decoded body """
+        self.request.body = b'{"data": {"a": 1}}'
+        self.assertEqual(param(self.request, 'data', type=dict), {'a': 1})
+
+    def test_malformed(self):
+        """ Bodies the decoder can't read raise a 400 """
+        self.request.body = b'{"data"'
+        self.assertRaises(HTTPBadRequest, param, self.request, 'data')
+
+    def test_not_mapping(self):
+        """ Bodies that aren't mappings raise a 400 """
+        self.request.body = b'[1, 2]'
+        self.assertRaises(HTTPBadRequest, param, self.request, 'data')
+
+    def test_max_body(self):
+        """ Decoded bodies respect max_body """
+        @argify(max_body=10)
+        def myview(request, data):  # pragma: no cover
+            return data
+        self.request.body = b'{"data": "abcdefghijk"}'
+        self.assertRaises(HTTPRequestEntityTooLarge, myview, None,
+                          self.request)
+
+    def test_max_keys(self):
+        """ Decoded bodies respect max_keys """
+        @argify(max_keys=2)
+        def myview(request, data):  # pragma: no cover
+            return data
+        self.request.body = b'{"data": {"a": 1, "b": 2}}'
+        self.assertRaises(HTTPBadRequest, myview, None, self.request)
+
+    def test_max_depth(self):
+        """ Decoded bodies respect max_depth """
+        @argify(max_depth=2)
+        def myview(request, data):  # pragma: no cover
+            return data
+        self.request.body = b'{"data": [[1]]}'
+        self.assertRaises(HTTPBadRequest, myview, None, self.request)
+
+    def test_global_limits(self):
+        """ Decoded bodies respect the limits from the settings """
+        self.request.registry.duh_body_limits = {'max_keys': 2}
+        self.addCleanup(delattr, self.request.registry, 'duh_body_limits')
+        @argify
+        def myview(request, data):  # pragma: no cover
+            return data
+        self.request.body = b'{"data": 1, "a": 2, "b": 3, "c": 4}'
+        self.assertRaises(HTTPBadRequest, myview, None, self.request)
+
+    def test_within_limits(self):
+        """ Decoded bodies within the limits are bound normally """
+        @argify(max_depth=2, max_keys=3)
+        def myview(request, data):
+            return data
+        self.request.body = b'{"data": [1, 2]}'
+        self.assertEqual(myview(None, self.request), [1, 2])
+
+    def test_add_body_decoder(self):
+        """ The config directive adds a decoder to the registry """
+        config = MagicMock()
+        config.registry = MagicMock(spec=[])
+        config.maybe_dotted.side_effect = lambda x: x
+        add_body_decoder(config, 'application/x-other', decode_test)
+        self.assertEqual(config.registry.duh_body_decoders,
+                         {'application/x-other': decode_test})
+
+    def test_no_registry(self):
+        """ Requests with no registry only use the default decoders """
+        @argify
+        def myview(request, name):
+            return name
+        request = Request.blank('/?name=a')
+        self.assertEqual(myview(None, request), 'a')
+        self.assertEqual(param(request, 'name'), 'a')
+
+    @unittest.skipIf(body.msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        """ MessagePack bodies are decoded by default """
+        request = DummyRequest()
+        request.headers = {'Content-Type': 'application/msgpack'}
+        request.body = body.msgpack.packb({'ids': [1, 2]})
+
+        @argify(ids=list)
+        def myview(request, ids):
+            return ids
+        self.assertEqual(myview(None, request), [1, 2])
+
+    @unittest.skipIf(body.cbor2 is None, "cbor2 is not installed")
+    def test_cbor(self):
+        """ CBOR bodies are decoded by default """
+        request = DummyRequest()
+        request.headers = {'Content-Type': 'application/cbor'}
+        request.body = body.cbor2.dumps({'ids': [1, 2]})
+
+        @argify(ids=list)
+        def myview(request, ids):
+            return ids
+        self.assertEqual(myview(None, request), [1, 2])
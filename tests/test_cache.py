@@ -0,0 +1,444 @@
+""" Tests for view result caching """
+import threading
+import time
+
+from mock import patch
+from pyramid.httpexceptions import HTTPNotModified
+from pyramid.response import Response
+from pyramid.testing import DummyRequest
+
+from pyramid_duh.cache import (LRUCache, PickleLRUCache, SingleFlight,
+                               argify_cache, argify_coalesce, argify_etag,
+                               freeze)
+from pyramid_duh.params import argify, wrap_view_call
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class TestLRUCache(unittest.TestCase):
+
+    """ Tests for the in-process cache backend """
+
+    def test_get_set(self):
+        """ Can retrieve values that were set """
+        cache = LRUCache()
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_missing(self):
+        """ Missing values return the default """
+        cache = LRUCache()
+        self.assertEqual(cache.get('a', 'foo'), 'foo')
+
+    def test_evict(self):
+        """ Least recently used values are evicted """
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(len(cache), 2)
+
+    @patch('pyramid_duh.cache.time')
+    def test_expire(self, time):
+        """ Values expire after the TTL """
+        time.time.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.set('a', 1)
+        time.time.return_value = 111
+        self.assertEqual(cache.get('a'), None)
+
+    def test_pickle(self):
+        """ Pickling cache returns copies of values """
+        cache = PickleLRUCache()
+        value = {'a': [1, 2]}
+        cache.set(('key', 1), value)
+        self.assertEqual(cache.get(('key', 1)), value)
+        self.assertFalse(cache.get(('key', 1)) is value)
+
+    def test_freeze(self):
+        """ Freezing makes nested data structures hashable """
+        frozen = freeze({'a': [1, {'b': set([2])}]})
+        hash(frozen)
+        self.assertEqual(frozen, freeze({'a': [1, {'b': set([2])}]}))
+
+    def test_freeze_types(self):
+        """ Frozen values keep their types """
+        self.assertNotEqual(freeze({'a': 1}), freeze([['a', 1]]))
+        self.assertNotEqual(freeze(1), freeze(True))
+        self.assertNotEqual(freeze([1]), freeze((1,)))
+
+
+class UserRequest(DummyRequest):
+
+    """ Request with a settable userid """
+    authenticated_userid = None
+
+
+class Resource(object):
+
+    """ Location-aware traversal context """
+
+    def __init__(self, name, parent):
+        self.__name__ = name
+        self.__parent__ = parent
+
+
+class Context(object):
+
+    """ Context that isn't location-aware """
+
+    def __init__(self, num):
+        self.num = num
+
+
+# pylint: disable=E1120
+class TestArgifyCache(unittest.TestCase):
+
+    """ Tests for @argify_cache """
+
+    def setUp(self):
+        super(TestArgifyCache, self).setUp()
+        self.calls = []
+
+    def _request(self, **params):
+        """ Create a request with params """
+        request = DummyRequest()
+        request.params = params
+        return request
+
+    def test_cache(self):
+        """ Repeated calls with the same args are served from the cache """
+        @argify_cache()
+        @argify(num=int)
+        def myview(request, num):
+            self.calls.append(num)
+            return {'num': num}
+        self.assertEqual(myview(None, self._request(num='1')), {'num': 1})
+        self.assertEqual(myview(None, self._request(num='1')), {'num': 1})
+        self.assertEqual(self.calls, [1])
+
+    def test_cache_miss(self):
+        """ Different args are cached separately """
+        @argify_cache()
+        @argify(num=int)
+        def myview(request, num):
+            self.calls.append(num)
+            return num
+        myview(None, self._request(num='1'))
+        myview(None, self._request(num='2'))
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_unhashable(self):
+        """ Unhashable arguments are frozen into the key """
+        @argify_cache()
+        @argify(data=dict)
+        def myview(request, data):
+            self.calls.append(data)
+        myview(None, self._request(data='{"a": [1]}'))
+        myview(None, self._request(data='{"a": [1]}'))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_unsortable_keys(self):
+        """ Dicts with mixed key types are called without the cache """
+        @argify_cache()
+        @argify(data=dict)
+        def myview(request, data):
+            self.calls.append(data)
+            return len(data)
+        # Binary body formats allow non-string keys
+        request = DummyRequest()
+        request.headers = {'Content-Type': 'application/json'}
+        request.json_body = {'data': {1: 'a', 'b': 2}}
+        self.assertEqual(myview(None, request), 2)
+        self.assertEqual(myview(None, request), 2)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_type_collisions(self):
+        """ Equal values with different types don't share a key """
+        @argify_cache()
+        @argify
+        def myview(request, data):
+            self.calls.append(data)
+            return data
+        for data in (1, True, 1.0, {'a': 1}, [['a', 1]]):
+            request = DummyRequest()
+            request.headers = {'Content-Type': 'application/json'}
+            request.json_body = {'data': data}
+            self.assertEqual(repr(myview(None, request)), repr(data))
+        self.assertEqual(len(self.calls), 5)
+
+    def test_context(self):
+        """ Views that take the context are cached per context """
+        @argify_cache()
+        @argify
+        def myview(context, request):
+            self.calls.append(context.__name__)
+            return context.__name__
+        root = Resource(None, None)
+        for name in ('a', 'b', 'a'):
+            context = Resource(name, root)
+            self.assertEqual(myview(context, self._request()), name)
+        self.assertEqual(self.calls, ['a', 'b'])
+
+    def test_context_not_location_aware(self):
+        """ Views on contexts without a resource path are not cached """
+        @argify_cache()
+        @argify
+        def myview(context, request):
+            self.calls.append(context.num)
+            return context.num
+        self.assertEqual(myview(Context(1), self._request()), 1)
+        self.assertEqual(myview(Context(2), self._request()), 2)
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_no_cache_response(self):
+        """ Response objects are not cached """
+        @argify_cache()
+        @argify
+        def myview(request):
+            self.calls.append(True)
+            return Response()
+        myview(None, self._request())
+        myview(None, self._request())
+        self.assertEqual(len(self.calls), 2)
+
+    def test_vary_userid(self):
+        """ Can cache results per-user """
+        @argify_cache(vary='userid')
+        @argify
+        def myview(request):
+            self.calls.append(request.authenticated_userid)
+        request = UserRequest()
+        request.authenticated_userid = 'a'
+        myview(None, request)
+        myview(None, request)
+        request = UserRequest()
+        request.authenticated_userid = 'b'
+        myview(None, request)
+        self.assertEqual(self.calls, ['a', 'b'])
+
+    def test_unit_test(self):
+        """ Unit tests that call the view directly bypass the cache """
+        @argify_cache()
+        @argify(num=int)
+        def myview(request, num):
+            self.calls.append(num)
+        request = DummyRequest()
+        myview(request, 1)
+        myview(request, 1)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_requires_argify(self):
+        """ Decorated view must be argify'd """
+        def myview(request):  # pragma: no cover
+            pass
+        self.assertRaises(TypeError, argify_cache(), myview)
+
+    def test_bad_vary(self):
+        """ Unknown vary value raises error """
+        self.assertRaises(ValueError, argify_cache, vary='foo')
+
+    def test_wrap_view_call(self):
+        """ Handlers added with wrap_view_call receive the bound args """
+        def handler_factory(handler, view):
+            def handler_wrapper(request, scope):
+                self.calls.append(scope['num'])
+                return handler(request, scope)
+            return handler_wrapper
+
+        @argify(num=int)
+        def myview(request, num):
+            return num * 2
+        wrap_view_call(myview, handler_factory)
+        self.assertEqual(myview(None, self._request(num='2')), 4)
+        self.assertEqual(self.calls, [2])
+
+
+class TestArgifyEtag(unittest.TestCase):
+
+    """ Tests for @argify_etag """
+
+    def setUp(self):
+        super(TestArgifyEtag, self).setUp()
+        self.calls = []
+
+        def version(post_id):
+            return 'v%d' % post_id
+
+        @argify_etag(version)
+        @argify(post_id=int)
+        def myview(request, post_id):
+            self.calls.append(post_id)
+            return {'id': post_id}
+        self.view = myview
+
+    def _request(self, etag=None):
+        """ Create a request """
+        request = DummyRequest()
+        request.params = {'post_id': '1'}
+        if etag is not None:
+            request.headers['If-None-Match'] = etag
+        return request
+
+    def test_set_etag(self):
+        """ The etag is set on the response """
+        request = self._request()
+        self.assertEqual(self.view(None, request), {'id': 1})
+        self.assertTrue(request.response.etag)
+
+    def test_not_modified(self):
+        """ If the etag matches, return a 304 without calling the view """
+        request = self._request()
+        self.view(None, request)
+        etag = request.response.etag
+        ret = self.view(None, self._request('"%s"' % etag))
+        self.assertTrue(isinstance(ret, HTTPNotModified))
+        self.assertEqual(ret.etag, etag)
+        self.assertEqual(self.calls, [1])
+
+    def test_weak_etag(self):
+        """ Weak etags in If-None-Match also match """
+        request = self._request()
+        self.view(None, request)
+        etag = 'W/"foo", W/"%s"' % request.response.etag
+        ret = self.view(None, self._request(etag))
+        self.assertTrue(isinstance(ret, HTTPNotModified))
+
+    def test_modified(self):
+        """ If the etag doesn't match, call the view """
+        ret = self.view(None, self._request('"abc"'))
+        self.assertEqual(ret, {'id': 1})
+
+    def test_post(self):
+        """ Non-GET requests always call the view """
+        request = self._request()
+        self.view(None, request)
+        request = self._request('"%s"' % request.response.etag)
+        request.method = 'POST'
+        self.assertEqual(self.view(None, request), {'id': 1})
+
+    def test_no_version(self):
+        """ If the version is None, call the view with no etag """
+        @argify_etag(lambda request: None)
+        @argify
+        def myview(request):
+            return 'foo'
+        request = self._request()
+        self.assertEqual(myview(None, request), 'foo')
+        self.assertEqual(request.response.etag, None)
+
+    def test_response_etag(self):
+        """ If the view returns a Response, set the etag on that """
+        @argify_etag(lambda **kwargs: 1)
+        @argify
+        def myview(request):
+            return Response()
+        ret = myview(None, self._request())
+        self.assertTrue(ret.etag)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    """ Tests for coalescing concurrent calls """
+
+    def _run_concurrent(self, flights, key, fxn, count=5):
+        """ Run many calls at once while the first one is blocked """
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def blocking():
+            started.set()
+            release.wait()
+            return fxn()
+
+        def call(target):
+            try:
+                results.append(flights.call(key, target))
+            except ValueError as e:
+                results.append(e)
+        leader = threading.Thread(target=call, args=(blocking,))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=call, args=(fxn,))
+                     for _ in range(count - 1)]
+        for thread in followers:
+            thread.start()
+        # Give the followers time to start waiting on the leader
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+        return results
+
+    def test_coalesce(self):
+        """ Concurrent calls with the same key only run once """
+        calls = []
+
+        def fxn():
+            calls.append(True)
+            return 'result'
+        results = self._run_concurrent(SingleFlight(), 'key', fxn)
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_exception(self):
+        """ Exceptions are propagated to all waiting callers """
+        def fxn():
+            raise ValueError('fail')
+        results = self._run_concurrent(SingleFlight(), 'key', fxn)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_cleanup(self):
+        """ Finished calls are removed """
+        flights = SingleFlight()
+        self.assertEqual(flights.call('key', lambda: 1), 1)
+        self.assertEqual(flights.call('key', lambda: 2), 2)
+        self.assertEqual(len(flights), 0)
+
+    def test_argify_coalesce(self):
+        """ argify_coalesce passes through the view result """
+        @argify_coalesce()
+        @argify(num=int)
+        def myview(request, num):
+            return num
+        request = DummyRequest()
+        request.params = {'num': '3'}
+        self.assertEqual(myview(None, request), 3)
+
+    def test_coalesce_context(self):
+        """ Calls on different contexts are not coalesced """
+        started = threading.Event()
+        release = threading.Event()
+
+        @argify_coalesce()
+        @argify
+        def myview(context, request):
+            if context.__name__ == 'a':
+                started.set()
+                release.wait(1)
+            return context.__name__
+        root = Resource(None, None)
+        results = []
+        leader = threading.Thread(target=lambda: results.append(
+            myview(Resource('a', root), DummyRequest())))
+        leader.start()
+        started.wait()
+        try:
+            self.assertEqual(myview(Resource('b', root), DummyRequest()), 'b')
+        finally:
+            release.set()
+            leader.join()
+        self.assertEqual(results, ['a'])
+
+    def test_bad_vary(self):
+        """ Unknown vary value raises error """
+        self.assertRaises(ValueError, argify_coalesce, vary='foo')
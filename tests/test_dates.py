@@ -0,0 +1,76 @@
+""" Tests for date parsing """
+import datetime
+
+from pyramid_duh.cache import LRUCache
+from pyramid_duh.dates import UTC, parse_date, parse_datetime, to_utc
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class TestParseDatetime(unittest.TestCase):
+
+    """ Tests for parsing datetimes """
+
+    def test_epoch(self):
+        """ Unix timestamps are parsed as UTC """
+        self.assertEqual(parse_datetime(1389571200),
+                         datetime.datetime(2014, 1, 13))
+        self.assertEqual(parse_datetime('1389571200.5'),
+                         datetime.datetime(2014, 1, 13, 0, 0, 0, 500000))
+
+    def test_iso(self):
+        """ Strict ISO 8601 strings are parsed """
+        self.assertEqual(parse_datetime('2014-01-13T04:05:06'),
+                         datetime.datetime(2014, 1, 13, 4, 5, 6))
+
+    def test_zulu(self):
+        """ A trailing 'Z' is UTC """
+        dt = parse_datetime('2014-01-13T04:05:06Z')
+        self.assertEqual(to_utc(dt), datetime.datetime(2014, 1, 13, 4, 5, 6))
+
+    def test_offset(self):
+        """ Offsets are converted by to_utc """
+        dt = parse_datetime('2014-01-13T04:05:06-08:00')
+        self.assertEqual(to_utc(dt), datetime.datetime(2014, 1, 13, 12, 5, 6))
+        self.assertEqual(to_utc(dt, True),
+                         datetime.datetime(2014, 1, 13, 12, 5, 6,
+                                           tzinfo=UTC))
+
+    def test_lenient(self):
+        """ Strings without zero-padding are parsed """
+        self.assertEqual(parse_datetime('2014-1-3 4:05:06.25+0130'),
+                         datetime.datetime(2014, 1, 3, 4, 5, 6, 250000,
+                                           tzinfo=datetime.timezone(
+                                               datetime.timedelta(
+                                                   hours=1, minutes=30))))
+
+    def test_cache(self):
+        """ Lenient strings are cached """
+        cache = LRUCache(10)
+        dt = parse_datetime('2014-1-3', cache)
+        self.assertEqual(cache.get('2014-1-3'), dt)
+
+    def test_bad(self):
+        """ Invalid strings raise a ValueError """
+        self.assertRaises(ValueError, parse_datetime, 'yesterday')
+
+
+class TestParseDate(unittest.TestCase):
+
+    """ Tests for parsing dates """
+
+    def test_iso(self):
+        """ ISO 8601 dates are parsed """
+        self.assertEqual(parse_date('2014-01-13'), datetime.date(2014, 1, 13))
+
+    def test_lenient(self):
+        """ Dates without zero-padding are parsed """
+        self.assertEqual(parse_date('2014-1-3'), datetime.date(2014, 1, 3))
+
+    def test_epoch(self):
+        """ Unix timestamps are parsed """
+        self.assertEqual(parse_date(1389571200), datetime.date(2014, 1, 13))
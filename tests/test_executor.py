@@ -0,0 +1,111 @@
+""" Tests for thread pool executors """
+import threading
+
+from pyramid.config import Configurator
+from pyramid.httpexceptions import HTTPServiceUnavailable
+from pyramid.testing import DummyRequest
+from pyramid.threadlocal import get_current_request
+
+import pyramid_duh
+from pyramid_duh.executor import BoundedExecutor, get_executor
+from pyramid_duh.params import argify
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class TestBoundedExecutor(unittest.TestCase):
+
+    """ Tests for the BoundedExecutor """
+
+    def setUp(self):
+        super(TestBoundedExecutor, self).setUp()
+        self.executor = BoundedExecutor('test', 1, 1)
+
+    def tearDown(self):
+        super(TestBoundedExecutor, self).tearDown()
+        self.executor.shutdown()
+
+    def test_submit(self):
+        """ Functions are run on the pool """
+        future = self.executor.submit(threading.current_thread)
+        self.assertNotEqual(future.result(), threading.current_thread())
+
+    def test_reject(self):
+        """ If the pool and queue are full, raise a 503 """
+        release = threading.Event()
+        self.executor.submit(release.wait)
+        self.executor.submit(release.wait)
+        with self.assertRaises(HTTPServiceUnavailable):
+            self.executor.submit(release.wait)
+        release.set()
+
+    def test_release(self):
+        """ Finished calls free up a slot """
+        for _ in range(5):
+            self.executor.submit(lambda: None).result()
+
+    def test_threadlocals(self):
+        """ Calling a view pushes the request threadlocals """
+        request = DummyRequest()
+        ret = self.executor.call(request, get_current_request)
+        self.assertTrue(ret is request)
+
+
+class TestExecutorConfig(unittest.TestCase):
+
+    """ Tests for configuring executors and using them with @argify """
+
+    def setUp(self):
+        super(TestExecutorConfig, self).setUp()
+        self.config = Configurator(settings={
+            'pyramid_duh.executors': 'io',
+            'pyramid_duh.executor.io.workers': '2',
+            'pyramid_duh.executor.io.queue': '3',
+        })
+        pyramid_duh.includeme(self.config)
+
+    def tearDown(self):
+        super(TestExecutorConfig, self).tearDown()
+        for executor in self.config.registry.duh_executors.values():
+            executor.shutdown()
+
+    def test_settings(self):
+        """ Executors are created from the settings """
+        executor = get_executor(self.config.registry, 'io')
+        self.assertEqual(executor.workers, 2)
+        self.assertEqual(executor.queue_size, 3)
+
+    def test_directive(self):
+        """ Executors can be created with a config directive """
+        self.config.add_executor('reports', 1)
+        executor = get_executor(self.config.registry, 'reports')
+        self.assertEqual(executor.workers, 1)
+
+    def test_missing(self):
+        """ Looking up a missing executor raises a KeyError """
+        self.assertRaises(KeyError, get_executor, self.config.registry, 'foo')
+
+    def test_argify(self):
+        """ @argify(executor=...) runs the view on the pool """
+        @argify(executor='io', num=int)
+        def myview(request, num):
+            return num, threading.current_thread()
+        request = DummyRequest()
+        request.registry = self.config.registry
+        request.params = {'num': '1'}
+        num, thread = myview(None, request)
+        self.assertEqual(num, 1)
+        self.assertNotEqual(thread, threading.current_thread())
+
+    def test_argify_arg_named_executor(self):
+        """ If the view has an 'executor' argument, it is a type instead """
+        @argify(executor=int)
+        def myview(request, executor):
+            return executor
+        request = DummyRequest()
+        request.params = {'executor': '1'}
+        self.assertEqual(myview(None, request), 1)
@@ -13,7 +13,9 @@ from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.testing import DummyRequest
 
 import pyramid_duh
-from pyramid_duh.params import argify, param, includeme
+from pyramid_duh.params import (argify, argify_class, compile_view, param,
+                                params_many, includeme, Default, Lazy,
+                                LazyProxy, ParamType, resolve_lazy)
 
 
 try:
@@ -206,6 +208,13 @@ class TestParam(unittest.TestCase):
         field = param(request, 'field', type=datetime)
         self.assertEquals(calendar.timegm(field.utctimetuple()), now)
 
+    def test_datetime_iso(self):
+        """ Pull ISO 8601 datetime off of request object """
+        request = DummyRequest()
+        request.params = {'field': '2014-01-01T12:00:00-02:00'}
+        field = param(request, 'field', type=datetime)
+        self.assertEquals(field, datetime.datetime(2014, 1, 1, 14))
+
     def test_timedelta_param(self):
         """ Pull timedelta off of request object """
         request = DummyRequest()
@@ -326,7 +335,9 @@ class TestParam(unittest.TestCase):
         """ Including pyramid_duh.params should add param() as a req method """
         config = MagicMock()
         includeme(config)
-        config.add_request_method.assert_called_with(param, name='param')
+        config.add_request_method.assert_any_call(param, name='param')
+        config.add_request_method.assert_any_call(params_many,
+                                                  name='params_many')
 
     @patch('pyramid.config.Configurator.add_request_method')
     def test_include_root(self, add_request_method):
@@ -565,6 +576,20 @@ class TestArgify(unittest.TestCase):
         with self.assertRaises(AttributeError):
             vc.myview('foobar')
 
+    def test_classmethod_view_repeat(self):
+        """ @argify classmethods can be called for many requests """
+        class MyView(object):
+
+            @classmethod
+            @argify(field=int)
+            def myview(cls, request, field):
+                return cls, field
+
+        for i in range(3):
+            request = DummyRequest()
+            request.params = {'field': str(i)}
+            self.assertEqual(MyView.myview(object(), request), (MyView, i))
+
     def test_dotted_path(self):
         """ Argify type can be a dotted path to a type """
 
@@ -717,3 +742,426 @@ class TestArgify(unittest.TestCase):
         user = User(1, 'a')
         val = myview(request, user)
         self.assertTrue(val is user)
+
+    def test_multi_param_parse_once(self):
+        """ Nested multi-param types don't decode the request body again """
+        @argify(userid=int)
+        def user_factory(userid):
+            return userid
+
+        @argify(user=user_factory)
+        def post_factory(postid, user):
+            return postid, user
+
+        @argify(post=post_factory, user=user_factory)
+        def myview(request, post, user):
+            return post, user
+
+        request = CountingRequest()
+        request.headers = {'Content-Type': 'application/json'}
+        request.body_data = {'userid': 1, 'postid': 'a'}
+        val = myview(object(), request)
+        self.assertEqual(val, (('a', 1), 1))
+        self.assertEqual(request.decode_count, 1)
+
+    def test_multi_param_classmethod_repeat(self):
+        """ Multi-param classmethods can be used for many requests """
+        class User(object):
+
+            def __init__(self, userid):
+                self.userid = userid
+
+            @classmethod
+            @argify(userid=int)
+            def __from_json__(cls, userid):
+                return cls(userid)
+
+        @argify(user=User)
+        def myview(request, user):
+            return user.userid
+
+        for i in range(3):
+            request = DummyRequest()
+            request.params = {'userid': str(i)}
+            self.assertEqual(myview(object(), request), i)
+
+
+class CountingRequest(DummyRequest):
+
+    """ Request that counts how many times the json body is decoded """
+    decode_count = 0
+    body_data = None
+
+    @property
+    def json_body(self):
+        """ Decode the body """
+        self.decode_count += 1
+        return dict(self.body_data)
+
+
+class LazyContainer(object):
+
+    """ Container that counts how many times it is converted """
+    conversions = []
+
+    def __init__(self, value):
+        self.value = value
+
+    @classmethod
+    def __from_json__(cls, data):
+        cls.conversions.append(data)
+        return cls(data)
+
+
+# pylint: disable=E1120
+class TestLazy(unittest.TestCase):
+
+    """ Tests for Lazy argument types """
+
+    def setUp(self):
+        super(TestLazy, self).setUp()
+        LazyContainer.conversions = []
+        self.request = DummyRequest()
+        self.request.params = {'field': '"abc"', 'num': '4'}
+
+    def test_not_converted(self):
+        """ Lazy arguments are not converted if they are not used """
+        @argify(field=Lazy(LazyContainer))
+        def myview(request, field):
+            return 'early'
+        self.assertEqual(myview(None, self.request), 'early')
+        self.assertEqual(LazyContainer.conversions, [])
+
+    def test_converted_once(self):
+        """ Lazy arguments are converted on first access and memoized """
+        @argify(field=Lazy(LazyContainer))
+        def myview(request, field):
+            return field.value + field.value
+        self.assertEqual(myview(None, self.request), 'abcabc')
+        self.assertEqual(LazyContainer.conversions, ['abc'])
+
+    def test_resolve(self):
+        """ resolve_lazy returns the underlying value """
+        @argify(field=Lazy(LazyContainer))
+        def myview(request, field):
+            return field
+        ret = myview(None, self.request)
+        self.assertTrue(isinstance(ret, LazyProxy))
+        self.assertTrue(isinstance(resolve_lazy(ret), LazyContainer))
+
+    def test_proxy_operators(self):
+        """ Lazy proxies forward operators to the value """
+        @argify(num=Lazy(int))
+        def myview(request, num):
+            return num + 1, num == 4, int(num), str(num)
+        self.assertEqual(myview(None, self.request), (5, True, 4, '4'))
+
+    def test_proxy_reflected_operators(self):
+        """ Lazy proxies work on the right side of operators """
+        proxy = LazyProxy(lambda: 4)
+        self.assertEqual(1 + proxy, 5)
+        self.assertEqual(10 - proxy, 6)
+        self.assertEqual(2 ** proxy, 16)
+        self.assertEqual(divmod(9, proxy), (2, 1))
+        self.assertEqual('a' + LazyProxy(lambda: 'b'), 'ab')
+
+    def test_proxy_arithmetic(self):
+        """ Lazy proxies forward arithmetic and unary operators """
+        proxy = LazyProxy(lambda: 7)
+        self.assertEqual((proxy / 2, proxy // 2, proxy % 4), (3.5, 3, 3))
+        self.assertEqual((-proxy, abs(LazyProxy(lambda: -2)), ~proxy),
+                         (-7, 2, -8))
+        self.assertEqual(round(LazyProxy(lambda: 1.26), 1), 1.3)
+        self.assertEqual('%.1f' % LazyProxy(lambda: 1.26), '1.3')
+        self.assertEqual(format(proxy, '03d'), '007')
+
+    def test_proxy_both_operands(self):
+        """ Operators resolve proxies on both sides """
+        left, right = LazyProxy(lambda: 3), LazyProxy(lambda: 4)
+        self.assertEqual(left + right, 7)
+        self.assertTrue(left < right)
+        self.assertEqual(hash(left), hash(3))
+
+    def test_proxy_inplace(self):
+        """ In-place operators update mutable values """
+        value = [1]
+        proxy = LazyProxy(lambda: value)
+        proxy += [2]
+        self.assertTrue(proxy is value)
+        self.assertEqual(value, [1, 2])
+        self.assertEqual(list(reversed(LazyProxy(lambda: 'ab'))), ['b', 'a'])
+
+    def test_missing(self):
+        """ Missing lazy arguments raise a 400 before the view is called """
+        @argify(other=Lazy(int))
+        def myview(request, other):  # pragma: no cover
+            pass
+        self.assertRaises(HTTPBadRequest, myview, None, self.request)
+
+    def test_default(self):
+        """ Missing optional lazy arguments use the default """
+        @argify(other=Lazy(int))
+        def myview(request, other=3):
+            return other
+        self.assertEqual(myview(None, self.request), 3)
+
+    def test_bad_format(self):
+        """ Conversion errors are raised on first access """
+        @argify(field=Lazy(int))
+        def myview(request, field):
+            return field + 1
+        self.assertRaises(HTTPBadRequest, myview, None, self.request)
+
+    def test_validate(self):
+        """ Lazy arguments are validated on first access """
+        @argify(num=(Lazy(int), lambda x: x > 10))
+        def myview(request, num):
+            return num + 1
+        self.assertRaises(HTTPBadRequest, myview, None, self.request)
+
+    def test_param(self):
+        """ request.param() accepts Lazy types """
+        num = param(self.request, 'num', type=Lazy(int))
+        self.assertEqual(resolve_lazy(num), 4)
+
+
+class CountingType(object):
+
+    """ Pure type that counts how many times it is converted """
+    __argify_pure__ = True
+    conversions = 0
+
+    @classmethod
+    def __from_json__(cls, data):
+        cls.conversions += 1
+        return data
+
+
+class TestCacheArgs(unittest.TestCase):
+
+    """ Tests for @argify(cache_args=True) """
+
+    def setUp(self):
+        CountingType.conversions = 0
+
+    def _request(self, query_string, method='GET', **params):
+        """ Create a request with a query string """
+        request = DummyRequest()
+        request.method = method
+        request.query_string = query_string
+        request.params = params
+        return request
+
+    def test_cache_hit(self):
+        """ Repeated query strings don't convert the arguments again """
+        @argify(cache_args=True, val=CountingType, num=int)
+        def myview(request, val, num=2):
+            return val, num
+        for _ in range(3):
+            request = self._request('val=1&num=4', val='1', num='4')
+            self.assertEqual(myview(None, request), (1, 4))
+        self.assertEqual(CountingType.conversions, 1)
+
+    def test_different_query(self):
+        """ Different query strings are converted separately """
+        @argify(cache_args=True, val=CountingType)
+        def myview(request, val):
+            return val
+        self.assertEqual(myview(None, self._request('val=1', val='1')), 1)
+        self.assertEqual(myview(None, self._request('val=2', val='2')), 2)
+        self.assertEqual(CountingType.conversions, 2)
+
+    def test_special_args(self):
+        """ The request is not cached with the arguments """
+        @argify(cache_args=True, val=CountingType)
+        def myview(request, val):
+            return request
+        first = self._request('val=1', val='1')
+        second = self._request('val=1', val='1')
+        self.assertTrue(myview(None, first) is first)
+        self.assertTrue(myview(None, second) is second)
+
+    def test_post_not_cached(self):
+        """ Requests with a body are never cached """
+        @argify(cache_args=True, val=CountingType)
+        def myview(request, val):
+            return val
+        for _ in range(2):
+            myview(None, self._request('', method='POST', val='1'))
+        self.assertEqual(CountingType.conversions, 2)
+
+    def test_impure_type(self):
+        """ Types that aren't pure can't be cached """
+        with self.assertRaises(TypeError):
+            @argify(cache_args=True, val=list)
+            def myview(request, val):  # pragma: no cover
+                pass
+
+    def test_max_size(self):
+        """ cache_args can set the size of the cache """
+        @argify(cache_args=1, val=CountingType)
+        def myview(request, val):
+            return val
+        for val in ('1', '2', '1'):
+            myview(None, self._request('val=' + val, val=val))
+        self.assertEqual(CountingType.conversions, 3)
+
+
+class UnhashableType(ParamType):
+
+    """ ParamType that can't be used as a dict key """
+    __hash__ = None
+
+    def convert(self, request, name, arg):
+        return int(arg)
+
+
+class TestParamsMany(unittest.TestCase):
+
+    """ Tests for request.params_many() """
+
+    def setUp(self):
+        self.request = DummyRequest()
+        self.request.params = {'num': '4', 'name': 'bob', 'tags': '["a"]'}
+
+    def test_convert(self):
+        """ All of the parameters are converted at once """
+        args = params_many(self.request, num=int, name=str, tags=list)
+        self.assertEqual(args, (4, 'bob', ['a']))
+        self.assertEqual(args.num, 4)
+        self.assertEqual(args.name, 'bob')
+        self.assertEqual(args.tags, ['a'])
+
+    def test_missing(self):
+        """ A missing required parameter raises a 400 """
+        with self.assertRaises(HTTPBadRequest):
+            params_many(self.request, num=int, other=str)
+
+    def test_default(self):
+        """ Default() is used for missing parameters """
+        args = params_many(self.request, num=Default(1, int),
+                           other=Default(None, str))
+        self.assertEqual(args, (4, None))
+
+    def test_validate(self):
+        """ (type, validate) tuples validate the parameter """
+        with self.assertRaises(HTTPBadRequest):
+            params_many(self.request, num=(int, lambda x: x > 10))
+
+    def test_default_validate(self):
+        """ Default() can validate the parameter """
+        with self.assertRaises(HTTPBadRequest):
+            params_many(self.request,
+                        num=Default(1, int, pyramid_duh.Range(max=3)))
+
+    def test_parse_once(self):
+        """ The request body is only decoded once """
+        request = CountingRequest()
+        request.headers = {'Content-Type': 'application/json'}
+        request.body_data = {'num': 1, 'name': 'bob'}
+        args = params_many(request, num=int, name=str)
+        self.assertEqual(args, (1, 'bob'))
+        self.assertEqual(request.decode_count, 1)
+
+    def test_reuse_plan(self):
+        """ The same set of types reuses the compiled plan """
+        first = params_many(self.request, num=int, name=Default(None, str))
+        second = params_many(self.request, num=int, name=Default(None, str))
+        self.assertTrue(type(first) is type(second))
+
+    def test_validator_list(self):
+        """ A list of validators checks every one """
+        args = params_many(self.request, num=(int, [lambda x: x > 1,
+                                                    pyramid_duh.Range(max=5)]))
+        self.assertEqual(args.num, 4)
+        with self.assertRaises(HTTPBadRequest):
+            params_many(self.request, num=(int, [lambda x: x > 1,
+                                                 pyramid_duh.Range(max=3)]))
+
+    def test_validators_reuse_plan(self):
+        """ Inline validators and defaults don't create new plans """
+        results = []
+        for limit in (5, 6):
+            results.append(params_many(
+                self.request, num=(int, lambda x, limit=limit: x < limit),
+                tags=Default([], [str], pyramid_duh.Length(max=limit))))
+        self.assertTrue(type(results[0]) is type(results[1]))
+        self.assertEqual(results[0], (4, ['a']))
+
+    def test_unhashable(self):
+        """ Unhashable types are still converted """
+        args = params_many(self.request, num=UnhashableType())
+        self.assertEqual(args.num, 4)
+
+    def test_bad_name(self):
+        """ Names that can't be namedtuple fields raise a TypeError """
+        self.request.params['_a'] = '1'
+        with self.assertRaises(TypeError):
+            params_many(self.request, num=int, _a=int)
+        with self.assertRaises(TypeError):
+            params_many(self.request, **{'class': int})
+
+
+class ViewClass(object):
+
+    """ View class for argify_class tests """
+
+    def __init__(self, request):
+        self.request = request
+
+    @argify(field='tests.test_params.ParamContainerFancy')
+    def myview(self, field):
+        return field
+
+    @argify
+    def other(self, field):
+        return field
+
+    def plain(self):
+        return self.request
+
+
+class TestArgifyClass(unittest.TestCase):
+
+    """ Tests for @argify_class """
+
+    def test_collect_views(self):
+        """ argify_class collects the @argify views of a class """
+        cls = argify_class(type('MyView', (ViewClass,), {}))
+        self.assertEqual(sorted(cls.__argify_views__), ['myview', 'other'])
+
+    def test_override(self):
+        """ Methods that override an @argify view are not collected """
+        cls = argify_class(type('MyView', (ViewClass,),
+                                {'other': lambda self: None}))
+        self.assertEqual(list(cls.__argify_views__), ['myview'])
+
+    def test_resolve_dotted_path(self):
+        """ Dotted path types are resolved, and checked for presence """
+        cls = argify_class(type('MyView', (ViewClass,), {}))
+        request = DummyRequest()
+        request.params = {'field': json.dumps({'alpha': 'a', 'beta': 'b'})}
+        ret = cls(request).myview()
+        self.assertTrue(isinstance(ret, ParamContainerFancy))
+        self.assertEqual(ret.alpha, 'a')
+
+    def test_missing_dotted_path(self):
+        """ A missing dotted path argument raises a 400 """
+        cls = argify_class(type('MyView', (ViewClass,), {}))
+        with self.assertRaises(HTTPBadRequest):
+            cls(DummyRequest()).myview()
+
+    def test_compile_twice(self):
+        """ Compiling a view twice is harmless """
+        @argify(field='tests.test_params.ParamContainerFancy')
+        def myview(request, field):
+            return field
+        compile_view(compile_view(myview))
+        request = DummyRequest()
+        request.params = {'field': json.dumps({'alpha': 'a', 'beta': 'b'})}
+        self.assertEqual(myview(object(), request).beta, 'b')
+
+    def test_compile_not_argify(self):
+        """ compile_view() requires an @argify view """
+        with self.assertRaises(TypeError):
+            compile_view(lambda request: None)
@@ -0,0 +1,136 @@
+""" Tests for precompiling views """
+import gc
+
+from mock import MagicMock, call, patch
+from pyramid.config import Configurator
+from pyramid.events import ApplicationCreated
+
+from pyramid_duh.params import argify
+from pyramid_duh.precompile import freeze_gc, includeme, precompile
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+@argify
+def plain_view(request, field):
+    return field
+
+
+class ViewClass(object):
+
+    """ View class with @argify methods """
+
+    def __init__(self, request):
+        self.request = request
+
+    @argify
+    def first(self, field):
+        return field
+
+    @argify
+    def second(self, field):
+        return field
+
+
+class TestPrecompile(unittest.TestCase):
+
+    """ Tests for precompile() """
+
+    def setUp(self):
+        self.config = Configurator()
+        self.config.include('pyramid_duh.view')
+
+    def test_compile_views(self):
+        """ Registered @argify views are compiled """
+        self.config.add_view(plain_view, name='a')
+        self.config.add_view(ViewClass, attr='first', name='b')
+        self.config.commit()
+        with patch('pyramid_duh.precompile.compile_view') as compile_view:
+            summary = precompile(self.config.registry)
+        self.assertEqual(summary.views, 2)
+        self.assertEqual(compile_view.call_count, 2)
+
+    def test_compile_once(self):
+        """ Views registered more than once are only compiled once """
+        self.config.add_view(plain_view, name='a')
+        self.config.add_view(plain_view, name='b')
+        self.config.commit()
+        self.assertEqual(precompile(self.config.registry).views, 1)
+
+    def test_compile_predicates(self):
+        """ Subpath predicates are compiled """
+        self.config.add_view(lambda request: None, name='a',
+                             subpath=('foo/*',))
+        self.config.commit()
+        summary = precompile(self.config.registry)
+        self.assertEqual(summary.predicates, 1)
+        self.assertEqual(summary.views, 0)
+
+    def test_summary(self):
+        """ The summary reports the counts """
+        summary = precompile(self.config.registry)
+        self.assertTrue(str(summary).startswith(
+            "Precompiled 0 argify views and 0 subpath predicates"))
+
+
+class TestIncludeme(unittest.TestCase):
+
+    """ Tests for the precompile config action """
+
+    def test_action(self):
+        """ Committing the config precompiles the views """
+        config = Configurator()
+        config.include('pyramid_duh')
+        config.add_view(plain_view, name='a')
+        with patch('pyramid_duh.precompile.precompile') as run:
+            config.commit()
+        run.assert_called_once_with(config.registry)
+
+    def test_disable(self):
+        """ The action can be disabled with a setting """
+        config = MagicMock()
+        config.get_settings.return_value = {'pyramid_duh.precompile': 'false'}
+        includeme(config)
+        self.assertFalse(config.action.called)
+
+    def test_gc_freeze(self):
+        """ The gc can be frozen once the app is created """
+        config = MagicMock()
+        config.get_settings.return_value = {'pyramid_duh.gc_freeze': 'true'}
+        includeme(config)
+        config.add_subscriber.assert_called_with(freeze_gc,
+                                                 ApplicationCreated)
+
+    def test_no_gc_freeze(self):
+        """ The gc is not frozen by default """
+        config = MagicMock()
+        config.get_settings.return_value = {}
+        includeme(config)
+        self.assertFalse(config.add_subscriber.called)
+
+
+@unittest.skipIf(not hasattr(gc, 'freeze'), "gc.freeze() requires py3.7+")
+class TestFreezeGC(unittest.TestCase):
+
+    """ Tests for freeze_gc() """
+
+    @patch('pyramid_duh.precompile.gc')
+    def test_freeze(self, mock_gc):
+        """ Garbage is collected before freezing """
+        mock_gc.get_freeze_count.return_value = 10
+        self.assertTrue(freeze_gc())
+        self.assertEqual(mock_gc.method_calls[:2], [call.collect(),
+                                                   call.freeze()])
+
+    def test_app_created(self):
+        """ Creating the app freezes the gc """
+        config = Configurator(settings={'pyramid_duh.gc_freeze': 'true'})
+        config.include('pyramid_duh')
+        with patch('pyramid_duh.precompile.gc') as mock_gc:
+            mock_gc.get_freeze_count.return_value = 10
+            config.make_wsgi_app()
+        self.assertTrue(mock_gc.freeze.called)
@@ -0,0 +1,109 @@
+""" Tests for view profiling """
+import os
+import shutil
+import tempfile
+
+import pstats
+from pyramid.config import Configurator
+from pyramid.testing import DummyRequest
+
+import pyramid_duh
+from pyramid_duh.params import argify
+from pyramid_duh.profiling import PROFILER, ViewProfiler, view_name
+from pyramid_duh.view import addslash
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+def add(a, b):
+    """ Function to profile """
+    return a + b
+
+
+class TestProfiler(unittest.TestCase):
+
+    """ Tests for the ViewProfiler """
+
+    def setUp(self):
+        super(TestProfiler, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestProfiler, self).tearDown()
+        shutil.rmtree(self.tempdir)
+        PROFILER.rate = 0.0
+        PROFILER.reset()
+
+    def test_no_sample(self):
+        """ With a rate of 0, nothing is profiled """
+        profiler = ViewProfiler()
+        self.assertEqual(profiler.call('add', add, 1, 2), 3)
+        self.assertEqual(profiler.stats, {})
+
+    def test_sample(self):
+        """ With a rate of 1, every call is profiled """
+        profiler = ViewProfiler(1.0)
+        self.assertEqual(profiler.call('add', add, 1, 2), 3)
+        profiler.call('add', add, 1, 2)
+        self.assertEqual(list(profiler.stats), ['add'])
+
+    def test_dump(self):
+        """ Stats are dumped to pstats files """
+        profiler = ViewProfiler(1.0, self.tempdir)
+        profiler.call('my.view', add, 1, 2)
+        filenames = profiler.dump()
+        self.assertEqual(filenames,
+                         [os.path.join(self.tempdir, 'my.view.pstats')])
+        pstats.Stats(filenames[0])
+
+    def test_dump_reset(self):
+        """ Stats can be reset when dumping """
+        profiler = ViewProfiler(1.0)
+        profiler.call('add', add, 1, 2)
+        profiler.dump(self.tempdir, reset=True)
+        self.assertEqual(profiler.stats, {})
+
+    def test_dump_no_dir(self):
+        """ Dumping with no directory raises an error """
+        profiler = ViewProfiler(1.0)
+        self.assertRaises(ValueError, profiler.dump)
+
+    def test_argify(self):
+        """ argify views are profiled """
+        PROFILER.rate = 1.0
+
+        @argify
+        def myview(request, field):
+            return field
+        request = DummyRequest()
+        request.params = {'field': 'foo'}
+        self.assertEqual(myview(None, request), 'foo')
+        self.assertEqual(list(PROFILER.stats), [view_name(myview)])
+
+    def test_addslash(self):
+        """ addslash views are profiled once, even if also argify'd """
+        PROFILER.rate = 1.0
+
+        @addslash
+        @argify
+        def myview(request, field):
+            return field
+        request = DummyRequest()
+        request.path_url = '/'
+        request.params = {'field': 'foo'}
+        self.assertEqual(myview(None, request), 'foo')
+        self.assertEqual(list(PROFILER.stats), [view_name(myview)])
+
+    def test_include(self):
+        """ Including pyramid_duh configures the profiler from settings """
+        config = Configurator(settings={
+            'pyramid_duh.profile.rate': '0.5',
+            'pyramid_duh.profile.dir': self.tempdir,
+        })
+        pyramid_duh.includeme(config)
+        self.assertEqual(PROFILER.rate, 0.5)
+        self.assertEqual(PROFILER.directory, self.tempdir)
@@ -0,0 +1,107 @@
+""" Tests for argify view schemas """
+import datetime
+
+from pyramid_duh.argtypes import IntArray, Set
+from pyramid_duh.params import Lazy, argify
+from pyramid_duh.schema import json_schema, type_schema
+from pyramid_duh.validators import Each, Length, OneOf, Range, Regex
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class Point(object):
+
+    """ Multi-param type """
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    @classmethod
+    @argify(x=int, y=int)
+    def __from_json__(cls, x, y=0):
+        return cls(x, y)
+
+
+class TestTypeSchema(unittest.TestCase):
+
+    """ Tests for converting types to JSON Schema """
+
+    def test_primitives(self):
+        """ Python primitives have JSON types """
+        self.assertEqual(type_schema(int), {'type': 'integer'})
+        self.assertEqual(type_schema(float), {'type': 'number'})
+        self.assertEqual(type_schema(bool), {'type': 'boolean'})
+        self.assertEqual(type_schema(dict), {'type': 'object'})
+        self.assertEqual(type_schema(None), {})
+
+    def test_date(self):
+        """ Dates have a format """
+        self.assertEqual(type_schema(datetime.date)['format'], 'date')
+
+    def test_validators(self):
+        """ Validators add constraints """
+        self.assertEqual(type_schema((int, Range(1, 5))),
+                         {'type': 'integer', 'minimum': 1, 'maximum': 5})
+        self.assertEqual(type_schema((str, [Length(2), Regex('a+')])),
+                         {'type': 'string', 'minLength': 2,
+                          'pattern': '^(?:a+)$'})
+        self.assertEqual(type_schema((str, OneOf(['a', 'b']))),
+                         {'type': 'string', 'enum': ['a', 'b']})
+
+    def test_lists(self):
+        """ List types describe their items """
+        self.assertEqual(type_schema(([int], [Length(max=3),
+                                              Each(Range(0))])),
+                         {'type': 'array', 'maxItems': 3,
+                          'items': {'type': 'integer', 'minimum': 0}})
+        self.assertEqual(type_schema(Set(str)),
+                         {'type': 'array', 'uniqueItems': True,
+                          'items': {'type': 'string'}})
+        self.assertEqual(type_schema(IntArray(min=1)),
+                         {'type': 'array',
+                          'items': {'type': 'integer', 'minimum': 1}})
+
+    def test_lazy(self):
+        """ Lazy types use the schema of the wrapped type """
+        self.assertEqual(type_schema(Lazy(int)), {'type': 'integer'})
+
+
+class TestViewSchema(unittest.TestCase):
+
+    """ Tests for the JSON Schema of argify views """
+
+    def test_view(self):
+        """ Views have a JSON Schema of their parameters """
+        @argify(limit=(int, Range(1)), tags=[str])
+        def search(request, query, tags, limit=10):  # pragma: no cover
+            pass
+        schema = json_schema(search)
+        self.assertEqual(schema['type'], 'object')
+        self.assertEqual(schema['required'], ['query', 'tags'])
+        self.assertEqual(schema['properties'], {
+            'query': {},
+            'tags': {'type': 'array', 'items': {'type': 'string'}},
+            'limit': {'type': 'integer', 'minimum': 1, 'default': 10},
+        })
+        self.assertFalse(schema['additionalProperties'])
+
+    def test_multi_param(self):
+        """ Multi-param types add their parameters to the schema """
+        @argify(point=Point)
+        def move(request, point, **kwargs):  # pragma: no cover
+            pass
+        schema = json_schema(move)
+        self.assertEqual(schema['properties'],
+                         {'x': {'type': 'integer'},
+                          'y': {'type': 'integer', 'default': 0}})
+        self.assertEqual(schema['required'], ['x'])
+        self.assertTrue(schema['additionalProperties'])
+
+    def test_not_argify(self):
+        """ Views without @argify raise a TypeError """
+        self.assertRaises(TypeError, json_schema, lambda request: None)
@@ -0,0 +1,150 @@
+""" Tests for timing utilities """
+from mock import MagicMock, patch
+from pyramid.config import Configurator
+from pyramid.response import Response
+from pyramid.testing import DummyRequest
+
+import pyramid_duh
+from pyramid_duh.auth import MixedAuthenticationPolicy
+from pyramid_duh.params import argify
+from pyramid_duh import timing
+from pyramid_duh.timing import (NOT_TIMED, Timings, timed,
+                                timing_tween_factory)
+from pyramid_duh.view import SubpathPredicate
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class TestTimings(unittest.TestCase):
+
+    """ Tests for recording timings """
+
+    def setUp(self):
+        super(TestTimings, self).setUp()
+        self.request = DummyRequest()
+        self.request.duh_timings = Timings()
+        patcher = patch.object(timing, 'ENABLED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled(self):
+        """ timed() is a no-op until the timing tween is installed """
+        with patch.object(timing, 'ENABLED', False):
+            self.assertTrue(timed(self.request, 'foo') is NOT_TIMED)
+            with timed(self.request, 'foo'):
+                pass
+        self.assertEqual(self.request.duh_timings.phases, {})
+
+    def test_record(self):
+        """ timed() records the phase on the request timings """
+        with timed(self.request, 'foo'):
+            pass
+        self.assertEqual(self.request.duh_timings.phases['foo'][1], 1)
+
+    def test_no_timings(self):
+        """ timed() does nothing if the tween is not active """
+        request = DummyRequest()
+        with timed(request, 'foo'):
+            pass
+        self.assertFalse(hasattr(request, 'duh_timings'))
+
+    def test_nested(self):
+        """ Nested blocks of the same phase are counted once """
+        with timed(self.request, 'foo'):
+            with timed(self.request, 'foo'):
+                pass
+        self.assertEqual(self.request.duh_timings.phases['foo'][1], 1)
+
+    def test_header_value(self):
+        """ Timings are formatted as a Server-Timing header """
+        timings = Timings()
+        timings.add('argify', 0.002)
+        timings.add('argify', 0.001)
+        self.assertEqual(timings.header_value(),
+                         'duh-argify;dur=3.000;desc="2 calls"')
+
+    def test_argify(self):
+        """ argify records the time spent binding arguments """
+        @argify
+        def myview(request, field):
+            return field
+        self.request.params = {'field': 'foo'}
+        myview(None, self.request)
+        self.assertTrue('argify' in self.request.duh_timings.phases)
+
+    def test_subpath(self):
+        """ Subpath predicate records the time spent matching """
+        self.request.subpath = ('foo',)
+        SubpathPredicate(('*',), None)(None, self.request)
+        self.assertTrue('subpath' in self.request.duh_timings.phases)
+
+    def test_auth(self):
+        """ Mixed auth policy records the time spent in policies """
+        policy = MixedAuthenticationPolicy(MagicMock())
+        policy.effective_principals(self.request)
+        self.assertTrue('auth' in self.request.duh_timings.phases)
+
+
+class TestTimingTween(unittest.TestCase):
+
+    """ Tests for the timing tween """
+
+    def setUp(self):
+        super(TestTimingTween, self).setUp()
+        self.registry = MagicMock()
+        self.registry.settings = {}
+        patcher = patch.object(timing, 'ENABLED', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enable(self):
+        """ Installing the tween turns on timed() """
+        timing_tween_factory(lambda r: Response(), self.registry)
+        self.assertTrue(timing.ENABLED)
+
+    def test_header(self):
+        """ Tween adds a Server-Timing header """
+        def handler(request):
+            with timed(request, 'argify'):
+                pass
+            return Response()
+        tween = timing_tween_factory(handler, self.registry)
+        response = tween(DummyRequest())
+        self.assertTrue(response.headers['Server-Timing']
+                        .startswith('duh-argify;dur='))
+
+    def test_no_header_if_empty(self):
+        """ Tween adds no header if nothing was timed """
+        tween = timing_tween_factory(lambda r: Response(), self.registry)
+        response = tween(DummyRequest())
+        self.assertFalse('Server-Timing' in response.headers)
+
+    def test_sink(self):
+        """ Tween passes timings to the metrics sink """
+        sink = MagicMock()
+        self.registry.settings['pyramid_duh.timing.sink'] = sink
+        tween = timing_tween_factory(lambda r: Response(), self.registry)
+        request = DummyRequest()
+        tween(request)
+        sink.assert_called_with(request, request.duh_timings)
+
+    @patch('pyramid.config.Configurator.add_tween')
+    def test_include_setting(self, add_tween):
+        """ Including pyramid_duh adds the tween if timing is enabled """
+        config = Configurator(settings={'pyramid_duh.timing': 'true'})
+        pyramid_duh.includeme(config)
+        add_tween.assert_called_with(
+            'pyramid_duh.timing.timing_tween_factory')
+
+    @patch('pyramid.config.Configurator.add_tween')
+    def test_no_include(self, add_tween):
+        """ Including pyramid_duh doesn't add the tween by default """
+        config = Configurator()
+        pyramid_duh.includeme(config)
+        for args, _ in add_tween.call_args_list:
+            self.assertNotEqual(args[0],
+                                'pyramid_duh.timing.timing_tween_factory')
@@ -0,0 +1,120 @@
+""" Tests for declarative validators """
+from pyramid.httpexceptions import HTTPBadRequest
+from pyramid.testing import DummyRequest
+
+from pyramid_duh.params import argify, param
+from pyramid_duh.validators import (Each, Length, OneOf, Range, Regex,
+                                    compile_validator)
+
+
+try:
+    import unittest2 as unittest  # pylint: disable=F0401
+except ImportError:
+    import unittest
+
+
+class TestCompile(unittest.TestCase):
+
+    """ Tests for compiling validators """
+
+    def assert_message(self, check, value, message):
+        """ Assert that a check fails with a message """
+        with self.assertRaises(HTTPBadRequest) as ctx:
+            check(value)
+        self.assertEqual(ctx.exception.detail, message)
+
+    def test_range(self):
+        """ Range checks min and max """
+        check = compile_validator(Range(1, 10), 'n')
+        self.assertTrue(check(1))
+        self.assertTrue(check(10))
+        self.assert_message(check, 0, "Argument 'n' must be at least 1")
+        self.assert_message(check, 11, "Argument 'n' must be at most 10")
+
+    def test_length(self):
+        """ Length checks the length """
+        check = compile_validator(Length(1, 3), 'n')
+        self.assertTrue(check('abc'))
+        self.assert_message(check, '',
+                            "Argument 'n' must have a length of at least 1")
+        self.assert_message(check, 'abcd',
+                            "Argument 'n' must have a length of at most 3")
+
+    def test_regex(self):
+        """ Regex must match the whole string """
+        check = compile_validator(Regex(r'[a-z]+'), 'n')
+        self.assertTrue(check('abc'))
+        self.assert_message(check, 'abc1', "Argument 'n' must match '[a-z]+'")
+
+    def test_one_of(self):
+        """ OneOf checks membership """
+        check = compile_validator(OneOf(['a', 'b']), 'n')
+        self.assertTrue(check('a'))
+        self.assert_message(check, 'c', "Argument 'n' must be one of 'a', 'b'")
+
+    def test_one_of_unhashable(self):
+        """ OneOf works with unhashable choices """
+        check = compile_validator(OneOf([[1], [2]]), 'n')
+        self.assertTrue(check([1]))
+        self.assertRaises(HTTPBadRequest, check, [3])
+
+    def test_each(self):
+        """ Each runs checks on every item """
+        check = compile_validator([Length(max=2), Each(Range(min=0))], 'n')
+        self.assertTrue(check([0, 1]))
+        self.assert_message(check, [0, -1],
+                            "Items in argument 'n' must be at least 0")
+        self.assertRaises(HTTPBadRequest, check, [0, 1, 2])
+
+    def test_callable(self):
+        """ Plain callables can be mixed with validators """
+        check = compile_validator([Range(0), lambda x: x % 2 == 0], 'n')
+        self.assertTrue(check(2))
+        self.assert_message(check, 3,
+                            "Validation check on argument 'n' failed")
+
+    def test_call(self):
+        """ Validators can be called directly as a boolean check """
+        self.assertTrue(Range(0)(1))
+        self.assertFalse(Range(0)(-1))
+
+
+class TestArgify(unittest.TestCase):
+
+    """ Tests for using validators with argify """
+
+    def test_argify(self):
+        """ argify compiles validators for each argument """
+        @argify(count=(int, [Range(1, 100)]), sort=(str, OneOf(['asc'])))
+        def myview(request, count, sort='asc'):
+            return count, sort
+        request = DummyRequest()
+        request.params = {'count': '5'}
+        self.assertEqual(myview(None, request), (5, 'asc'))
+        request.params = {'count': '500'}
+        with self.assertRaises(HTTPBadRequest) as ctx:
+            myview(None, request)
+        self.assertEqual(ctx.exception.detail,
+                         "Argument 'count' must be at most 100")
+
+    def test_list_type(self):
+        """ Validators work with list shorthand types """
+        @argify(ids=([int], Each(Range(1))))
+        def myview(request, ids):
+            return ids
+        request = DummyRequest()
+        request.params = {'ids': '1,2'}
+        self.assertEqual(myview(None, request), [1, 2])
+        request.params = {'ids': '1,0'}
+        self.assertRaises(HTTPBadRequest, myview, None, request)
+
+    def test_param(self):
+        """ request.param() accepts validators """
+        request = DummyRequest()
+        request.params = {'name': 'abc'}
+        self.assertEqual(param(request, 'name', validate=Length(max=3)),
+                         'abc')
+        with self.assertRaises(HTTPBadRequest) as ctx:
+            param(request, 'name', validate=[Length(max=2)])
+        self.assertEqual(ctx.exception.detail,
+                         "Argument 'name' must have a length of at most 2")
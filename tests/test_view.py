@@ -130,6 +130,27 @@ class TestSubpath(unittest.TestCase):
         result = matcher(None, self.request)
         self.assertFalse(result)
 
+    def test_compile(self):
+        """ Compiled predicates can match many requests """
+        matcher = SubpathPredicate(('name/foo*', '/(?P<x>b.)/r?'), None)
+        matcher.compile()
+        self.request.subpath = ('foobar', 'baz')
+        self.assertFalse(matcher(None, self.request))
+        self.request.subpath = ('foobar', 'ba')
+        self.assertTrue(matcher(None, self.request))
+        self.assertEqual(self.request.named_subpaths,
+                         {'name': 'foobar', 'x': 'ba'})
+        self.request.subpath = ('foo',)
+        self.assertTrue(matcher(None, self.request))
+        self.assertEqual(self.request.named_subpaths, {'name': 'foo'})
+
+    def test_glob_no_groups(self):
+        """ Globs don't add groups to the named subpaths """
+        matcher = SubpathPredicate(('*a*b*',), None)
+        self.request.subpath = ('xaybz',)
+        self.assertTrue(matcher(None, self.request))
+        self.assertEqual(self.request.named_subpaths, {})
+
     def test_format(self):
         """ String format should be readable """
         pred = SubpathPredicate(('*', '*'), None)